@@ -13,6 +13,8 @@ from app.service.trip import TripService
 from app.service.country import CountryService
 from app.service.city import CityService
 from app.service.comment import CommentService
+from app.service.counters import CounterService
+from app.service.jobs import JobService
 
 def get_user_service(db: Session = Depends(get_db)) -> UserService:
     return UserService(db)
@@ -28,3 +30,9 @@ def get_city_service(db: Session = Depends(get_db)) -> CityService:
 
 def get_comment_service(db: Session = Depends(get_db)) -> CommentService:
     return CommentService(db)
+
+def get_counter_service(db: Session = Depends(get_db)) -> CounterService:
+    return CounterService(db)
+
+def get_job_service(db: Session = Depends(get_db)) -> JobService:
+    return JobService(db)
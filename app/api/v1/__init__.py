@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from .endpoints import user, trip, country, city, comment, healthy
+from .endpoints import user, trip, country, city, comment, healthy, admin, jobs, timeline
 
 api_router = APIRouter()
 api_router.include_router(user.router)
@@ -8,3 +8,6 @@ api_router.include_router(country.router)
 api_router.include_router(city.router)
 api_router.include_router(comment.router)
 api_router.include_router(healthy.router)
+api_router.include_router(admin.router)
+api_router.include_router(jobs.router)
+api_router.include_router(timeline.router)
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, status
-from typing import List
+from fastapi import APIRouter, Depends, Response, status
+from typing import List, Optional
+from datetime import date
 from app.service.trip import TripService
 from app.schemas.trip import *
 from app.core.exceptions import AppError
+from app.core.rate_limit import write_user_limit
 from app.api.deps import get_trip_service
 from app.auth.deps import get_current_user, allow_admin, check_self_or_admin
 
@@ -16,6 +18,61 @@ def get_all_trips(
 ):
     return service.get_all(skip=skip, limit=limit)
 
+@router.get("/summary", response_model=List[TripSummaryOut], status_code=status.HTTP_200_OK)
+def get_trip_summaries(
+    skip: int = 0,
+    limit: int = 50,
+    service: TripService = Depends(get_trip_service)
+):
+    """
+    Listado ligero de viajes para tarjetas de feed.
+    No carga comentarios: usa el contador desnormalizado comment_count.
+    """
+    return service.get_all_summaries(skip=skip, limit=limit)
+
+@router.get("/search", response_model=TripSearchOut, status_code=status.HTTP_200_OK)
+def search_trips(
+    response: Response,
+    country_id: Optional[int] = None,
+    country: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    q: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: Optional[int] = None,
+    service: TripService = Depends(get_trip_service)
+):
+    """
+    Búsqueda de viajes, más recientes primero, con paginación keyset.
+    
+    - country_id o country (código ISO alpha-2/alpha-3)
+    - start_date / end_date: viajes que solapan ese rango
+    - q: texto libre en nombre y descripción (todas las palabras)
+    
+    La siguiente página se pide con ?before=<next_before de la respuesta>.
+    La cabecera X-Search-Plan indica el índice que recorrió la búsqueda.
+    """
+    items, next_before, plan = service.search(
+        country_id=country_id, country_code=country, start_date=start_date, end_date=end_date,
+        text=q, before=before, limit=limit
+    )
+    response.headers["X-Search-Plan"] = plan
+    return {"items": items, "next_before": next_before, "has_more": next_before is not None}
+
+@router.get("/user/{user_id}", response_model=List[TripBasic], status_code=status.HTTP_200_OK)
+def get_trips_by_user(
+    user_id: int,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    service: TripService = Depends(get_trip_service)
+):
+    """
+    Viajes de un usuario ordenados por id.
+    after_id + limit permiten seguir la paginación de UserOut.trips (trips_next).
+    limit: FEED_PAGE_SIZE por defecto, como máximo FEED_MAX_PAGE_SIZE.
+    """
+    return service.get_by_user_id(user_id, after_id=after_id, limit=limit)
+
 @router.get("/name/{name}", response_model=TripOut, status_code=status.HTTP_200_OK)
 def get_trip_by_name(name: str, service: TripService = Depends(get_trip_service)):
     trip = service.get_by_name(name)
@@ -25,12 +82,16 @@ def get_trip_by_name(name: str, service: TripService = Depends(get_trip_service)
 
 @router.get("/id/{trip_id}", response_model=TripOut, status_code=status.HTTP_200_OK)
 def get_trip_by_id(trip_id: int, service: TripService = Depends(get_trip_service)):
-    trip = service.get_by_id(trip_id)
-    if not trip:
+    """
+    Peticiones simultáneas del mismo viaje comparten una sola query y la
+    respuesta ya serializada (single-flight, ver app/core/singleflight.py).
+    """
+    body = service.get_by_id_json(trip_id)
+    if body is None:
         raise AppError(404, "TRIP_NOT_FOUND", "El viaje no existe")
-    return trip
+    return Response(content=body, media_type="application/json")
 
-@router.post("/", response_model=TripOut, status_code=status.HTTP_201_CREATED)
+@router.post("/", response_model=TripOut, status_code=status.HTTP_201_CREATED, dependencies=[Depends(write_user_limit)])
 def create_trip(
     payload: TripCreate, 
     service: TripService = Depends(get_trip_service),
@@ -42,7 +103,23 @@ def create_trip(
 
     return service.create(trip_in=payload)
 
-@router.put("/id/{trip_id}", response_model=TripOut, status_code=status.HTTP_200_OK)
+@router.post("/batch", response_model=TripBatchOut, status_code=status.HTTP_200_OK, dependencies=[Depends(write_user_limit)])
+def create_trips_batch(
+    payload: List[TripCreate],
+    service: TripService = Depends(get_trip_service),
+    current_user = Depends(get_current_user)
+):
+    """
+    Crea varios viajes en una sola petición y una sola transacción.
+    Devuelve el resultado de cada elemento (en el mismo orden de la petición).
+    """
+    # Forzar que todos los viajes pertenezcan al usuario del token
+    for trip_in in payload:
+        trip_in.user_id = current_user.user_id
+
+    return service.create_batch(trips_in=payload)
+
+@router.put("/id/{trip_id}", response_model=TripOut, status_code=status.HTTP_200_OK, dependencies=[Depends(write_user_limit)])
 def update_trip(
     trip_id: int, 
     payload: TripUpdate, 
@@ -58,7 +135,7 @@ def update_trip(
     
     return service.update(trip_id=trip_id, trip_in=payload)
 
-@router.delete("/{trip_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{trip_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(write_user_limit)])
 def delete_trip(
     trip_id: int, 
     service: TripService = Depends(get_trip_service),
@@ -0,0 +1,90 @@
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from app.service.counters import CounterService
+from app.core.config import settings
+from app.core.constants import ErrorCode
+from app.core.exceptions import AppError
+from app.core.profiling import profile_threads, format_collapsed
+from app.core.slow_requests import slow_requests
+from app.api.deps import get_counter_service
+from app.auth.deps import allow_admin
+
+# ============================================================================
+# ENDPOINTS DE ADMINISTRACIÓN / MANTENIMIENTO
+# Solo accesibles para administradores
+# ============================================================================
+
+router = APIRouter(prefix="/v1/admin", tags=["Admin"])
+
+@router.post("/counters/reconcile", status_code=status.HTTP_200_OK)
+def reconcile_counters(
+    service: CounterService = Depends(get_counter_service),
+    admin_user = Depends(allow_admin)
+):
+    """
+    Recalcula los contadores desnormalizados (Trip.comment_count,
+    User.trip_count, User.comment_count) y corrige las desviaciones.
+    """
+    return service.reconcile()
+
+@router.get("/slow-requests", status_code=status.HTTP_200_OK)
+def get_slow_requests(
+    limit: int = 20,
+    admin_user = Depends(allow_admin)
+):
+    """
+    Peticiones más lentas de este worker (las SLOW_REQUEST_KEEP más lentas
+    desde que arrancó), con sus queries SQL y las pilas muestreadas en formato
+    collapsed. El histórico completo de todos los workers está en
+    SLOW_REQUEST_LOG_FILE.
+    """
+    return {
+        "threshold_ms": settings.SLOW_REQUEST_THRESHOLD_MS,
+        "enabled": settings.SLOW_REQUEST_ENABLED,
+        "requests": slow_requests.slowest(limit)
+    }
+
+@router.get("/profile", response_class=PlainTextResponse, status_code=status.HTTP_200_OK)
+async def profile_worker(
+    seconds: float = 10,
+    interval_ms: float = 10,
+    idle: bool = False,
+    admin_user = Depends(allow_admin)
+):
+    """
+    Perfila el worker que atiende la petición durante `seconds` segundos
+    muestreando la pila de todos sus hilos cada `interval_ms` ms.
+    
+    Devuelve las pilas en formato collapsed ("marco;marco;... muestras"),
+    listo para flamegraph.pl, speedscope o inferno:
+    
+        curl -H "Authorization: Bearer ..." \\
+            "http://localhost:8000/api/v1/admin/profile?seconds=30" > worker.folded
+        flamegraph.pl worker.folded > worker.svg
+    
+    Los hilos en reposo (threadpool sin trabajo, event loop esperando) se
+    omiten salvo con ?idle=true. Con varios workers solo se perfila uno:
+    conviene generar la carga durante el perfilado.
+    """
+    if not 0 < seconds <= settings.PROFILE_MAX_SECONDS or not 1 <= interval_ms <= 1000:
+        raise AppError(
+            400,
+            ErrorCode.VALIDATION_ERROR,
+            f"seconds debe estar entre 0 y {settings.PROFILE_MAX_SECONDS}, interval_ms entre 1 y 1000",
+            {"seconds": seconds, "interval_ms": interval_ms}
+        )
+
+    # El muestreo corre en un hilo del threadpool: el event loop sigue atendiendo peticiones
+    result = await run_in_threadpool(profile_threads, seconds, interval_ms / 1000, idle)
+    if result is None:
+        raise AppError(409, ErrorCode.PROFILE_IN_PROGRESS, "Ya hay un perfilado en curso en este worker")
+
+    return PlainTextResponse(
+        format_collapsed(result["samples"]),
+        headers={
+            "X-Profile-Seconds": f"{result['seconds']:.2f}",
+            "X-Profile-Ticks": str(result["ticks"]),
+            "X-Profile-Samples": str(sum(result["samples"].values()))
+        }
+    )
@@ -1,9 +1,13 @@
 from fastapi import APIRouter, Depends, status
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
 from app.service.city import CityService
 from app.schemas.city import *
 from app.core.exceptions import AppError
-from app.api.deps import get_city_service
+from app.service.jobs import JobService
+from app.schemas.job import JobAccepted
+from app.api.deps import get_city_service, get_job_service
 from app.auth.deps import get_current_user, allow_admin
 
 router = APIRouter(prefix="/v1/city", tags=["City"])
@@ -36,19 +40,34 @@ def get_cities_by_country(country_code: str, service: CityService = Depends(get_
 async def populate_cities(
     country_code: Optional[str] = None, 
     limit: Optional[int] = None,
+    force_refresh: bool = False,
+    resume: bool = True,
     service: CityService = Depends(get_city_service),
+    job_service: JobService = Depends(get_job_service),
     admin_user = Depends(allow_admin)
 ):
     """
     Puebla ciudades desde GeoNames API.
-    Si se especifica country_code (ej: 'ES'), solo para ese país.
-    Si no, intenta poblar para TODOS los países (puede tardar).
+    Si se especifica country_code (ej: 'ES'), solo para ese país (síncrono).
+    Si no, encola un trabajo en segundo plano para TODOS los países y responde
+    202 con el job_id. El progreso se consulta en GET /v1/jobs/{job_id}.
+    Con ?force_refresh=true ignora la caché HTTP en disco.
+    El trabajo para todos los países retoma, salvo con ?resume=false, la última
+    ejecución interrumpida con los mismos parámetros (salta los países terminados).
     Solo accesible para administradores.
     """
     if country_code:
-        return await service.populate_from_api(country_code, limit=limit)
-    else:
-        return await service.populate_all_countries_cities(limit_per_country=limit)
+        return await service.populate_from_api(country_code, limit=limit, force_refresh=force_refresh)
+
+    # enqueue hace INSERT + commit (síncrono): fuera del event loop
+    job = await run_in_threadpool(
+        job_service.enqueue,
+        "populate_cities",
+        params={"limit_per_country": limit, "force_refresh": force_refresh, "resume": resume},
+        created_by=admin_user.user_id
+    )
+    accepted = JobAccepted(job_id=job.id, status=job.status, status_url=f"/api/v1/jobs/{job.id}")
+    return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=accepted.model_dump())
 
 @router.post("/", response_model=CityOut, status_code=status.HTTP_201_CREATED)
 def create_city(
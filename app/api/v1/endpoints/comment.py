@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, status
-from typing import List
+from typing import List, Optional
 from app.service.comment import CommentService
 from app.schemas.comment import *
 from app.core.exceptions import AppError
+from app.core.rate_limit import write_user_limit
 from app.api.deps import get_comment_service
 from app.auth.deps import get_current_user, check_self_or_admin
 
@@ -24,14 +25,48 @@ def get_comment_by_id(id: int, service: CommentService = Depends(get_comment_ser
     return comment
 
 @router.get("/trip/{trip_id}", response_model=List[CommentOut], status_code=status.HTTP_200_OK)
-def get_comments_by_trip(trip_id: int, service: CommentService = Depends(get_comment_service)):
-    return service.get_by_trip_id(trip_id)
+def get_comments_by_trip(
+    trip_id: int,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    service: CommentService = Depends(get_comment_service)
+):
+    """
+    Comentarios de un viaje ordenados por id.
+    after_id + limit permiten seguir la paginación de TripOut.comments (comments_next).
+    limit: FEED_PAGE_SIZE por defecto, como máximo FEED_MAX_PAGE_SIZE.
+    """
+    return service.get_by_trip_id(trip_id, after_id=after_id, limit=limit)
+
+@router.get("/trip/{trip_id}/feed", response_model=CommentFeedOut, status_code=status.HTTP_200_OK)
+def get_trip_comment_feed(
+    trip_id: int,
+    before: Optional[str] = None,
+    limit: Optional[int] = None,
+    service: CommentService = Depends(get_comment_service)
+):
+    """
+    Comentarios de un viaje, más recientes primero, con paginación keyset.
+    La siguiente página se pide con ?before=<next_before de la respuesta>.
+    limit: FEED_PAGE_SIZE por defecto, como máximo FEED_MAX_PAGE_SIZE.
+    """
+    items, next_before = service.get_trip_feed(trip_id, before=before, limit=limit)
+    return {"items": items, "next_before": next_before, "has_more": next_before is not None}
 
 @router.get("/user/{user_id}", response_model=List[CommentOut], status_code=status.HTTP_200_OK)
-def get_comments_by_user(user_id: int, service: CommentService = Depends(get_comment_service)):
-    return service.get_by_user_id(user_id)
+def get_comments_by_user(
+    user_id: int,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    service: CommentService = Depends(get_comment_service)
+):
+    """
+    Comentarios de un usuario ordenados por id, paginados con after_id + limit.
+    limit: FEED_PAGE_SIZE por defecto, como máximo FEED_MAX_PAGE_SIZE.
+    """
+    return service.get_by_user_id(user_id, after_id=after_id, limit=limit)
 
-@router.post("/", response_model=CommentOut, status_code=status.HTTP_201_CREATED)
+@router.post("/", response_model=CommentOut, status_code=status.HTTP_201_CREATED, dependencies=[Depends(write_user_limit)])
 def create_comment(
     payload: CommentCreate, 
     service: CommentService = Depends(get_comment_service),
@@ -44,7 +79,23 @@ def create_comment(
 
     return service.create(comment_in=payload)
 
-@router.put("/{id}", response_model=CommentOut, status_code=status.HTTP_200_OK)
+@router.post("/batch", response_model=CommentBatchOut, status_code=status.HTTP_200_OK, dependencies=[Depends(write_user_limit)])
+def create_comments_batch(
+    payload: List[CommentCreate],
+    service: CommentService = Depends(get_comment_service),
+    current_user = Depends(get_current_user)
+):
+    """
+    Crea varios comentarios en una sola petición y una sola transacción.
+    Devuelve el resultado de cada elemento (en el mismo orden de la petición).
+    """
+    # Forzar que todos los comentarios pertenezcan al usuario del token
+    for comment_in in payload:
+        comment_in.user_id = current_user.user_id
+
+    return service.create_batch(comments_in=payload)
+
+@router.put("/{id}", response_model=CommentOut, status_code=status.HTTP_200_OK, dependencies=[Depends(write_user_limit)])
 def update_comment(
     id: int, 
     payload: CommentUpdate, 
@@ -60,7 +111,7 @@ def update_comment(
     
     return service.update(comment_id=id, comment_in=payload)
 
-@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(write_user_limit)])
 def delete_comment(
     id: int, 
     service: CommentService = Depends(get_comment_service),
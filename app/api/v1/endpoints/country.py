@@ -25,15 +25,17 @@ def get_country_by_name(name: str, service: CountryService = Depends(get_country
 
 @router.post("/populate", status_code=status.HTTP_200_OK)
 async def populate_countries(
+    force_refresh: bool = False,
     service: CountryService = Depends(get_country_service),
     admin_user = Depends(allow_admin)
 ):
     """
     Puebla la base de datos de países desde REST Countries API.
     Actualiza los existentes y crea los nuevos.
+    Con ?force_refresh=true ignora la caché HTTP en disco.
     Solo accesible para administradores.
     """
-    return await service.populate_from_api()
+    return await service.populate_from_api(force_refresh=force_refresh)
 
 @router.post("/", response_model=CountryOut, status_code=status.HTTP_201_CREATED)
 def create_country(
@@ -3,11 +3,16 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 from app.auth.deps import get_db
 from app.core.config import settings
+from app.service.resilience import breaker_snapshots
+from app.db.session import replicas
+from app.core.middleware import admission_snapshots
 
 # ============================================================================
 # ENDPOINTS DE SALUD
 # - /health: Check de salud general
-# - /health/db: Check de salud de la base de datos
+# - /health/db: Check de salud de la base de datos (y estado de las réplicas)
+# - /health/external: Estado de los circuit breakers de APIs externas
+# - /health/admission: Ocupación y rechazos del control de admisión
 # ============================================================================
 
 router = APIRouter(tags=["Health"])
@@ -25,10 +30,32 @@ def health_check():
 def health_check_db(db: Session = Depends(get_db)):
     try:
         db.execute(text("SELECT 1"))
-        return {"status": "healthy", "database": "connected"}
+        return {"status": "healthy", "database": "connected", "replicas": replicas.snapshots()}
     except Exception as e:
         return {
             "status": "unhealthy",
             "database": "disconnected",
-            "error": str(e)
+            "error": str(e),
+            "replicas": replicas.snapshots()
         }
+
+@router.get("/health/external") # http://localhost:8000/api/health/external
+def health_check_external():
+    """
+    Estado de los circuit breakers por host (solo los hosts ya contactados
+    por este proceso). "degraded" si alguno está abierto o en prueba.
+    """
+    breakers = breaker_snapshots()
+    degraded = any(b["state"] != "closed" for b in breakers)
+    return {"status": "degraded" if degraded else "healthy", "breakers": breakers}
+
+@router.get("/health/admission") # http://localhost:8000/api/health/admission
+async def health_check_admission():
+    """
+    Presupuestos del control de admisión de este proceso: peticiones en curso,
+    en cola y rechazadas por grupo. "degraded" si algún grupo tiene cola.
+    Es async para no depender del threadpool cuando está saturado.
+    """
+    groups = admission_snapshots()
+    degraded = any(g["waiting"] > 0 for g in groups)
+    return {"status": "degraded" if degraded else "healthy", "groups": groups}
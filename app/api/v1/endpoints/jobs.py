@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import List
+from app.service.jobs import JobService, load_job_snapshot, stream_job_events
+from app.schemas.job import JobOut
+from app.core.exceptions import AppError
+from app.core.constants import ErrorCode
+from app.api.deps import get_job_service
+from app.auth.deps import allow_admin
+
+# ============================================================================
+# TRABAJOS EN SEGUNDO PLANO
+# - GET /v1/jobs/            : últimos trabajos
+# - GET /v1/jobs/{id}        : estado (JSON) o progreso en streaming (?stream=true, SSE)
+# - POST /v1/jobs/{id}/cancel: solicitar cancelación
+# ============================================================================
+
+router = APIRouter(prefix="/v1/jobs", tags=["Jobs"])
+
+@router.get("/", response_model=List[JobOut], status_code=status.HTTP_200_OK)
+def get_all_jobs(
+    skip: int = 0,
+    limit: int = 50,
+    service: JobService = Depends(get_job_service),
+    admin_user = Depends(allow_admin)
+):
+    return service.get_all(skip=skip, limit=limit)
+
+@router.get("/{job_id}", response_model=JobOut, status_code=status.HTTP_200_OK)
+async def get_job(
+    job_id: str,
+    stream: bool = False,
+    admin_user = Depends(allow_admin)
+):
+    """
+    Estado de un trabajo.
+    Con ?stream=true devuelve Server-Sent Events (text/event-stream) con cada
+    cambio de progreso hasta que el trabajo termina.
+    """
+    snapshot = await run_in_threadpool(load_job_snapshot, job_id)
+    if snapshot is None:
+        raise AppError(404, ErrorCode.JOB_NOT_FOUND, "El trabajo no existe")
+
+    if stream:
+        return StreamingResponse(
+            stream_job_events(job_id),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    return snapshot
+
+@router.post("/{job_id}/cancel", response_model=JobOut, status_code=status.HTTP_200_OK)
+def cancel_job(
+    job_id: str,
+    service: JobService = Depends(get_job_service),
+    admin_user = Depends(allow_admin)
+):
+    """
+    Solicita la cancelación. Un trabajo pendiente se cancela al momento;
+    uno en ejecución se detiene en su siguiente reporte de progreso.
+    """
+    return service.cancel(job_id)
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, status
+from typing import Optional
+from app.service.user import UserService
+from app.schemas.user import TimelineOut
+from app.api.deps import get_user_service
+
+router = APIRouter(prefix="/v1/users", tags=["Timeline"])
+
+@router.get("/{user_id}/timeline", response_model=TimelineOut, status_code=status.HTTP_200_OK)
+def get_user_timeline(
+    user_id: int,
+    before: Optional[str] = None,
+    limit: Optional[int] = None,
+    service: UserService = Depends(get_user_service)
+):
+    """
+    Actividad del usuario (viajes publicados y comentarios) mezclada por fecha,
+    más recientes primero, con paginación keyset.
+    La siguiente página se pide con ?before=<next_before de la respuesta>.
+    limit: FEED_PAGE_SIZE por defecto, como máximo FEED_MAX_PAGE_SIZE.
+    """
+    items, next_before = service.get_timeline(user_id, before=before, limit=limit)
+    return {"items": items, "next_before": next_before, "has_more": next_before is not None}
@@ -2,10 +2,12 @@ from typing import List
 from fastapi import APIRouter, Depends, status
 
 from fastapi import APIRouter, Depends, status, UploadFile, File, HTTPException
+from starlette.concurrency import run_in_threadpool
 from app.service.image import image_service
 from app.service.user import UserService
 from app.schemas.user import UserCreate, UserUpdate, UserOut, UserLogin, Token, RoleUpdate, TokenRefresh
 from app.core.exceptions import AppError
+from app.core.rate_limit import login_email_limit, login_ip_limit, register_ip_limit, write_user_limit
 from app.api.deps import get_user_service
 from app.auth.deps import get_current_user, allow_admin, check_self_or_admin
 
@@ -63,7 +65,7 @@ def get_user_by_id(
     check_self_or_admin(current_user, user.id)
     return user
 
-@router.post("/register", response_model=UserOut, status_code=status.HTTP_201_CREATED)
+@router.post("/register", response_model=UserOut, status_code=status.HTTP_201_CREATED, dependencies=[Depends(register_ip_limit)])
 def register(payload: UserCreate, service: UserService = Depends(get_user_service)):
     '''
     Registra un nuevo usuario.
@@ -80,7 +82,7 @@ def register(payload: UserCreate, service: UserService = Depends(get_user_servic
         role="user"  # SIEMPRE crear como user, ignorar el role del payload
     )
 
-@router.post("/login", response_model=Token, status_code=status.HTTP_200_OK)
+@router.post("/login", response_model=Token, status_code=status.HTTP_200_OK, dependencies=[Depends(login_ip_limit), Depends(login_email_limit)])
 def login(payload: UserLogin, service: UserService = Depends(get_user_service)):
     '''
     Autentica un usuario y genera un token JWT.
@@ -114,7 +116,7 @@ def change_user_role(
     '''
     return service.update(user_id=user_id, user_data={"role": payload.role})
 
-@router.put("/{user_id}", response_model=UserOut, status_code=status.HTTP_200_OK)
+@router.put("/{user_id}", response_model=UserOut, status_code=status.HTTP_200_OK, dependencies=[Depends(write_user_limit)])
 def update_user(
     user_id: int, 
     payload: UserUpdate, 
@@ -141,18 +143,24 @@ def delete_user(
     check_self_or_admin(current_user, user_id)
     service.delete(user_id=user_id)
 
-@router.post("/update-image", response_model=UserOut, status_code=status.HTTP_200_OK)
-def upload_profile_image(
+@router.post("/update-image", response_model=UserOut, status_code=status.HTTP_200_OK, dependencies=[Depends(write_user_limit)])
+async def upload_profile_image(
     file: UploadFile = File(...), 
     service: UserService = Depends(get_user_service),
     current_user = Depends(get_current_user)
 ):
     """
     Sube una imagen de perfil para el usuario actual.
-    La imagen se aloja en Cloudinary.
+    La imagen se aloja en el backend configurado (Cloudinary por defecto).
+    Tamaño máximo: IMAGE_MAX_BYTES (413 si se supera).
+    La subida corre en un executor dedicado: el endpoint no bloquea el event loop
+    ni ocupa el threadpool de peticiones mientras espera. Si la misma imagen ya
+    se subió antes, se reutiliza su URL sin volver a subirla.
     """
-    image_url = image_service.upload_image(file)
+    image_url = await image_service.upload_image(file, db=service.db)
     
     # Actualizar usuario con la nueva URL
     # current_user es TokenData, tiene user_id
-    return service.update(user_id=current_user.user_id, user_data={"image_url": image_url})
+    return await run_in_threadpool(
+        service.update, user_id=current_user.user_id, user_data={"image_url": image_url}
+    )
@@ -12,6 +12,7 @@ Incluye:
 '''
 
 import os
+from typing import Optional, Tuple
 from dotenv import load_dotenv
 
 # Cargar variables de entorno desde .env
@@ -29,15 +30,24 @@ class Settings:
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))
     REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
     
-    # RSA Keys (Loaded dynamically)
-    PRIVATE_KEY: str = ""
-    PUBLIC_KEY: str = ""
+    # RSA Keys (Loaded lazily)
+    # Se cargan (o generan) la primera vez que se firma/verifica un token,
+    # no al importar la configuración: el arranque no toca el disco ni cryptography.
+    _rsa_keys: Optional[Tuple[str, str]] = None
     
-    def __init__(self):
-        """Cargar claves RSA al iniciar configuración"""
-        from app.core.security_keys import get_rsa_keys
-        self.PRIVATE_KEY, self.PUBLIC_KEY = get_rsa_keys()
-
+    def _load_rsa_keys(self) -> Tuple[str, str]:
+        if self._rsa_keys is None:
+            from app.core.security_keys import get_rsa_keys
+            self._rsa_keys = get_rsa_keys()
+        return self._rsa_keys
+    
+    @property
+    def PRIVATE_KEY(self) -> str:
+        return self._load_rsa_keys()[0]
+    
+    @property
+    def PUBLIC_KEY(self) -> str:
+        return self._load_rsa_keys()[1]
     
     # Database
     MYSQL_USER: str = os.getenv("MYSQL_USER", "root")
@@ -46,6 +56,30 @@ class Settings:
     MYSQL_PORT: str = os.getenv("MYSQL_PORT", "3306")
     MYSQL_DB: str = os.getenv("MYSQL_DB", "aurevia")
     
+    # Crear las tablas que falten al arrancar (Base.metadata.create_all).
+    # Opt-in: en producción el esquema se gestiona aparte y el arranque no abre conexiones.
+    DB_CREATE_ALL: bool = os.getenv("DB_CREATE_ALL", "False").lower() in ("true", "1", "yes")
+    
+    # Réplicas de lectura (app/db/replicas.py): URLs SQLAlchemy separadas por comas.
+    # Vacío = todas las lecturas al primario
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    REPLICA_HEALTH_INTERVAL: float = float(os.getenv("REPLICA_HEALTH_INTERVAL", "5.0"))
+    REPLICA_CONNECT_TIMEOUT: int = int(os.getenv("REPLICA_CONNECT_TIMEOUT", "2"))
+    
+    @property
+    def replica_urls(self) -> list[str]:
+        return [url.strip() for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+    
+    # Pool de conexiones (por proceso: con N workers hay N pools)
+    DB_ECHO: bool = os.getenv("DB_ECHO", "True").lower() in ("true", "1", "yes")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    
+    # Calentamiento al arrancar cada worker (app/core/warmup.py): abre
+    # DB_POOL_SIZE conexiones antes de aceptar tráfico
+    WARMUP_ON_STARTUP: bool = os.getenv("WARMUP_ON_STARTUP", "True").lower() in ("true", "1", "yes")
+    
     @property
     def database_url(self) -> str:
         '''
@@ -70,9 +104,125 @@ class Settings:
     GEONAMES_URL: str = os.getenv("GEONAMES_URL", "http://api.geonames.org")
     GEONAMES_USERNAME: str = os.getenv("GEONAMES_USERNAME", "")
     
+    # Resiliencia de APIs externas (app/service/resilience.py)
+    EXTERNAL_API_CONNECT_TIMEOUT: float = float(os.getenv("EXTERNAL_API_CONNECT_TIMEOUT", "5.0"))
+    EXTERNAL_API_READ_TIMEOUT: float = float(os.getenv("EXTERNAL_API_READ_TIMEOUT", "30.0"))
+    EXTERNAL_API_MAX_RETRIES: int = int(os.getenv("EXTERNAL_API_MAX_RETRIES", "3"))
+    EXTERNAL_API_BACKOFF_BASE: float = float(os.getenv("EXTERNAL_API_BACKOFF_BASE", "0.5"))
+    EXTERNAL_API_BACKOFF_MAX: float = float(os.getenv("EXTERNAL_API_BACKOFF_MAX", "30.0"))
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_BREAKER_RESET_TIMEOUT: float = float(os.getenv("CIRCUIT_BREAKER_RESET_TIMEOUT", "60.0"))
+    
+    # Caché HTTP en disco para las APIs externas (app/service/http_cache.py)
+    HTTP_CACHE_ENABLED: bool = os.getenv("HTTP_CACHE_ENABLED", "True").lower() in ("true", "1", "yes")
+    HTTP_CACHE_DIR: str = os.getenv("HTTP_CACHE_DIR", ".cache/http")
+    HTTP_CACHE_TTL: int = int(os.getenv("HTTP_CACHE_TTL", "86400"))
+    
     # Image Upload (Cloudinary)
     CLOUDINARY_CLOUD_NAME: str = os.getenv("CLOUDINARY_CLOUD_NAME", "")
     CLOUDINARY_API_KEY: str = os.getenv("CLOUDINARY_API_KEY", "")
     CLOUDINARY_API_SECRET: str = os.getenv("CLOUDINARY_API_SECRET", "")
+    
+    # Subida de imágenes (app/service/image.py, app/service/storage.py)
+    # IMAGE_STORAGE_BACKEND: "cloudinary" o "local" (ficheros en IMAGE_LOCAL_DIR, útil en tests)
+    IMAGE_STORAGE_BACKEND: str = os.getenv("IMAGE_STORAGE_BACKEND", "cloudinary")
+    IMAGE_LOCAL_DIR: str = os.getenv("IMAGE_LOCAL_DIR", "media")
+    IMAGE_LOCAL_BASE_URL: str = os.getenv("IMAGE_LOCAL_BASE_URL", "/media")
+    IMAGE_MAX_BYTES: int = int(os.getenv("IMAGE_MAX_BYTES", str(5 * 1024 * 1024)))
+    IMAGE_UPLOAD_WORKERS: int = int(os.getenv("IMAGE_UPLOAD_WORKERS", "2"))
+    IMAGE_UPLOAD_MAX_PENDING: int = int(os.getenv("IMAGE_UPLOAD_MAX_PENDING", "8"))
+    
+    # Procesado previo a la subida (app/service/image_processing.py)
+    IMAGE_PROCESSING_ENABLED: bool = os.getenv("IMAGE_PROCESSING_ENABLED", "True").lower() in ("true", "1", "yes")
+    IMAGE_MAX_WIDTH: int = int(os.getenv("IMAGE_MAX_WIDTH", "1024"))
+    IMAGE_MAX_HEIGHT: int = int(os.getenv("IMAGE_MAX_HEIGHT", "1024"))
+    IMAGE_WEBP_QUALITY: int = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+    IMAGE_PROCESS_WORKERS: int = int(os.getenv("IMAGE_PROCESS_WORKERS", "2"))
+    
+    # Colecciones anidadas (UserOut.trips, UserOut.comments, TripOut.comments)
+    NESTED_COLLECTION_LIMIT: int = int(os.getenv("NESTED_COLLECTION_LIMIT", "20"))
+    
+    # Feeds con paginación keyset (?before=&limit=): tamaño de página por defecto y máximo
+    FEED_PAGE_SIZE: int = int(os.getenv("FEED_PAGE_SIZE", "20"))
+    FEED_MAX_PAGE_SIZE: int = int(os.getenv("FEED_MAX_PAGE_SIZE", "100"))
+    
+    # Búsqueda de viajes (GET /v1/trip/search): el planificador cuenta hasta
+    # TRIP_SEARCH_PROBE_LIMIT filas por filtro para elegir el más selectivo y
+    # guarda la decisión TRIP_SEARCH_PLAN_TTL segundos (0 = sin caché)
+    TRIP_SEARCH_PROBE_LIMIT: int = int(os.getenv("TRIP_SEARCH_PROBE_LIMIT", "1000"))
+    TRIP_SEARCH_PLAN_TTL: float = float(os.getenv("TRIP_SEARCH_PLAN_TTL", "300"))
+    TRIP_SEARCH_PLAN_CACHE_SIZE: int = int(os.getenv("TRIP_SEARCH_PLAN_CACHE_SIZE", "1024"))
+    
+    # Single-flight de lecturas calientes (app/core/singleflight.py).
+    # SINGLEFLIGHT_TTL > 0 reutiliza además el resultado durante esos segundos
+    SINGLEFLIGHT_ENABLED: bool = os.getenv("SINGLEFLIGHT_ENABLED", "True").lower() in ("true", "1", "yes")
+    SINGLEFLIGHT_TTL: float = float(os.getenv("SINGLEFLIGHT_TTL", "0"))
+    
+    # Control de admisión (app/core/middleware.py): peticiones en curso por
+    # grupo, cola máxima y segundos de espera antes de responder 503.
+    # READ + WRITE + ADMIN no debería superar DB_POOL_SIZE + DB_MAX_OVERFLOW
+    # ni el threadpool de Starlette (40 hilos).
+    ADMISSION_CONTROL_ENABLED: bool = os.getenv("ADMISSION_CONTROL_ENABLED", "True").lower() in ("true", "1", "yes")
+    ADMISSION_READ_LIMIT: int = int(os.getenv("ADMISSION_READ_LIMIT", "10"))
+    ADMISSION_READ_QUEUE: int = int(os.getenv("ADMISSION_READ_QUEUE", "50"))
+    ADMISSION_READ_MAX_WAIT: float = float(os.getenv("ADMISSION_READ_MAX_WAIT", "2.0"))
+    ADMISSION_WRITE_LIMIT: int = int(os.getenv("ADMISSION_WRITE_LIMIT", "4"))
+    ADMISSION_WRITE_QUEUE: int = int(os.getenv("ADMISSION_WRITE_QUEUE", "20"))
+    ADMISSION_WRITE_MAX_WAIT: float = float(os.getenv("ADMISSION_WRITE_MAX_WAIT", "5.0"))
+    ADMISSION_ADMIN_LIMIT: int = int(os.getenv("ADMISSION_ADMIN_LIMIT", "1"))
+    ADMISSION_ADMIN_QUEUE: int = int(os.getenv("ADMISSION_ADMIN_QUEUE", "0"))
+    ADMISSION_ADMIN_MAX_WAIT: float = float(os.getenv("ADMISSION_ADMIN_MAX_WAIT", "0"))
+    ADMISSION_RETRY_AFTER: int = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+    
+    # Rate limiting (app/core/rate_limit.py): peticiones por RATE_LIMIT_PERIOD segundos
+    # (token bucket: permite ráfagas de ese tamaño). 0 = sin límite
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "True").lower() in ("true", "1", "yes")
+    RATE_LIMIT_PERIOD: float = float(os.getenv("RATE_LIMIT_PERIOD", "60"))
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+    RATE_LIMIT_TRUST_PROXY: bool = os.getenv("RATE_LIMIT_TRUST_PROXY", "False").lower() in ("true", "1", "yes")
+    RATE_LIMIT_LOGIN_PER_IP: int = int(os.getenv("RATE_LIMIT_LOGIN_PER_IP", "20"))
+    RATE_LIMIT_LOGIN_PER_EMAIL: int = int(os.getenv("RATE_LIMIT_LOGIN_PER_EMAIL", "5"))
+    RATE_LIMIT_REGISTER_PER_IP: int = int(os.getenv("RATE_LIMIT_REGISTER_PER_IP", "5"))
+    RATE_LIMIT_WRITES_PER_USER: int = int(os.getenv("RATE_LIMIT_WRITES_PER_USER", "60"))
+    
+    # Peticiones lentas (app/core/slow_requests.py): umbral, queries y pilas por
+    # registro, fichero rotativo ("{pid}" = pid del worker) y nº en memoria
+    SLOW_REQUEST_ENABLED: bool = os.getenv("SLOW_REQUEST_ENABLED", "True").lower() in ("true", "1", "yes")
+    SLOW_REQUEST_THRESHOLD_MS: float = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "500"))
+    SLOW_REQUEST_PROFILE_AFTER_MS: float = float(os.getenv("SLOW_REQUEST_PROFILE_AFTER_MS", "250"))
+    SLOW_REQUEST_SAMPLE_INTERVAL_MS: float = float(os.getenv("SLOW_REQUEST_SAMPLE_INTERVAL_MS", "5"))
+    SLOW_REQUEST_MAX_QUERIES: int = int(os.getenv("SLOW_REQUEST_MAX_QUERIES", "50"))
+    SLOW_REQUEST_KEEP: int = int(os.getenv("SLOW_REQUEST_KEEP", "100"))
+    SLOW_REQUEST_LOG_FILE: str = os.getenv("SLOW_REQUEST_LOG_FILE", "logs/slow_requests.{pid}.log")
+    SLOW_REQUEST_LOG_MAX_BYTES: int = int(os.getenv("SLOW_REQUEST_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+    SLOW_REQUEST_LOG_BACKUPS: int = int(os.getenv("SLOW_REQUEST_LOG_BACKUPS", "5"))
+    
+    # Logs de errores 4xx repetidos (app/core/exceptions.py): por código, los
+    # ERROR_LOG_BURST primeros de cada ventana y después 1 de cada ERROR_LOG_SAMPLE_EVERY
+    ERROR_LOG_BURST: int = int(os.getenv("ERROR_LOG_BURST", "20"))
+    ERROR_LOG_WINDOW: float = float(os.getenv("ERROR_LOG_WINDOW", "60"))
+    ERROR_LOG_SAMPLE_EVERY: int = int(os.getenv("ERROR_LOG_SAMPLE_EVERY", "100"))
+    
+    # Perfilado bajo demanda (GET /api/v1/admin/profile)
+    PROFILE_MAX_SECONDS: float = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+    
+    # Background Jobs (app/service/jobs.py)
+    JOB_MAX_WORKERS: int = int(os.getenv("JOB_MAX_WORKERS", "1"))
+    JOB_PROGRESS_INTERVAL: float = float(os.getenv("JOB_PROGRESS_INTERVAL", "1.0"))
+    JOB_STREAM_POLL_INTERVAL: float = float(os.getenv("JOB_STREAM_POLL_INTERVAL", "1.0"))
+    # Cada worker marca sus trabajos (en cola o en curso) cada JOB_HEARTBEAT_INTERVAL
+    # segundos. Al arrancar, los pending/running sin latido en JOB_STALE_AFTER
+    # segundos (su worker murió) pasan a failed
+    JOB_HEARTBEAT_INTERVAL: float = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "15"))
+    JOB_STALE_AFTER: float = float(os.getenv("JOB_STALE_AFTER", "120"))
+    
+    # Ingesta desde APIs externas: registros por flush y por commit a la BD
+    INGEST_BATCH_SIZE: int = int(os.getenv("INGEST_BATCH_SIZE", "500"))
+    INGEST_COMMIT_SIZE: int = int(os.getenv("INGEST_COMMIT_SIZE", "5000"))
+    # Una ingesta masiva interrumpida se retoma desde sus checkpoints si avanzó hace menos de esto
+    INGEST_RESUME_MAX_AGE_HOURS: float = float(os.getenv("INGEST_RESUME_MAX_AGE_HOURS", "24"))
+    
+    # Batch Operations
+    BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "100"))
 
 settings = Settings()
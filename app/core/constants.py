@@ -4,6 +4,24 @@ class ErrorCode(str, Enum):
     # General
     INTERNAL_SERVER_ERROR = "INTERNAL_SERVER_ERROR"
     VALIDATION_ERROR = "VALIDATION_ERROR"
+    INVALID_CURSOR = "INVALID_CURSOR"
+    SERVER_OVERLOADED = "SERVER_OVERLOADED"
+    RATE_LIMITED = "RATE_LIMITED"
+    PROFILE_IN_PROGRESS = "PROFILE_IN_PROGRESS"
+    
+    # Request / Upload
+    PAYLOAD_TOO_LARGE = "PAYLOAD_TOO_LARGE"
+    IMAGE_TYPE_NOT_SUPPORTED = "IMAGE_TYPE_NOT_SUPPORTED"
+    IMAGE_INVALID = "IMAGE_INVALID"
+    IMAGE_UPLOAD_FAILED = "IMAGE_UPLOAD_FAILED"
+    UPLOAD_QUEUE_FULL = "UPLOAD_QUEUE_FULL"
+    
+    # External APIs
+    EXTERNAL_API_UNAVAILABLE = "EXTERNAL_API_UNAVAILABLE"
+    
+    # Batch
+    BATCH_EMPTY = "BATCH_EMPTY"
+    BATCH_TOO_LARGE = "BATCH_TOO_LARGE"
     
     # User
     USER_NOT_FOUND = "USER_NOT_FOUND"
@@ -23,6 +41,11 @@ class ErrorCode(str, Enum):
     CITY_NOT_FOUND = "CITY_NOT_FOUND"
     CITY_ALREADY_EXISTS = "CITY_ALREADY_EXISTS"
     
+    # Jobs
+    JOB_NOT_FOUND = "JOB_NOT_FOUND"
+    JOB_TYPE_UNKNOWN = "JOB_TYPE_UNKNOWN"
+    JOB_CANCELLED = "JOB_CANCELLED"
+    
     # Comment
     COMMENT_NOT_FOUND = "COMMENT_NOT_FOUND"
     COMMENT_TOO_SHORT = "COMMENT_TOO_SHORT"
@@ -1,88 +1,247 @@
+import inspect
+import logging
 from functools import wraps
-from sqlalchemy.orm import Session
+from typing import Callable, Optional
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, SessionTransaction
 from app.core.exceptions import AppError
 from app.core.constants import ErrorCode
+from app.db.session import replicas, pin_primary, is_pinned, replica_reads, current_replica, forget_replica
 
-def transactional(func):
+logger = logging.getLogger(__name__)
+
+def get_db_session(*args, **kwargs):
+    '''Busca el objeto Session (db) en los argumentos de la función decorada'''
+    # 1. Buscar directamente Session en args
+    for arg in args:
+        if isinstance(arg, Session):
+            return arg
+
+    # 2. Buscar en kwargs
+    if 'db' in kwargs:
+        return kwargs['db']
+
+    # 3. Buscar en el primer argumento (self) si tiene atributo .db
+    # Esto es necesario para los métodos de servicios (Service.method)
+    # RELAXED CHECK: No usamos isinstance por si hay problemas de importación
+    if args and hasattr(args[0], 'db'):
+        return args[0].db
+
+    return None
+
+def session_resolver(func) -> Callable[[tuple, dict], Optional[Session]]:
+    '''
+    Decide al decorar (una sola vez, no en cada llamada) dónde buscar la sesión,
+    en este orden:
+    1. Métodos de servicio (primer parámetro self): self.db, si existe
+    2. Un parámetro db (p. ej. ImageService._remember(self, db, ...))
+    3. Búsqueda en los argumentos (get_db_session)
+    '''
+    params = list(inspect.signature(func).parameters)
+    is_method = bool(params) and params[0] == "self"
+    db_index = params.index("db") if "db" in params else None
+
+    def resolve(args, kwargs) -> Optional[Session]:
+        if is_method and args:
+            db = getattr(args[0], "db", None)
+            if db is not None:
+                return db
+        if db_index is not None:
+            db = kwargs["db"] if "db" in kwargs else (args[db_index] if len(args) > db_index else None)
+            if db is not None:
+                return db
+        return get_db_session(*args, **kwargs)
+
+    return resolve
+
+def _missing_session(func) -> RuntimeError:
+    # Sin sesión no hay commit ni rollback: la transacción quedaría abierta
+    message = f"@transactional: no se encontró la sesión de BD (db) en {func.__qualname__}"
+    logger.error(message)
+    return RuntimeError(message)
+
+# ============================================================================
+# TRANSACCIONES
+# ============================================================================
+
+# Clave en Session.info: número de @transactional anidados en curso
+_TX_DEPTH = "transactional_depth"
+
+def _begin(db: Session) -> Optional[SessionTransaction]:
+    """Entra en un @transactional. Retorna el savepoint si está anidado en otro"""
+    pin_primary(db)
+    depth = db.info.get(_TX_DEPTH, 0)
+    savepoint = db.begin_nested() if depth else None
+    db.info[_TX_DEPTH] = depth + 1
+    return savepoint
+
+def _commit(db: Session, savepoint: Optional[SessionTransaction], result, refresh: bool):
+    if savepoint is not None:
+        # Anidado: se libera el savepoint; el commit lo hace el @transactional externo
+        savepoint.commit()
+        return result
+    db.commit()
+    if refresh and result is not None:
+        db.refresh(result)
+    return result
+
+def _rollback(db: Session, savepoint: Optional[SessionTransaction]) -> None:
+    if savepoint is None:
+        db.rollback()
+    elif savepoint.is_active:
+        # Anidado: solo se deshace lo hecho dentro de esta llamada
+        savepoint.rollback()
+
+def _end(db: Session) -> None:
+    db.info[_TX_DEPTH] -= 1
+
+def commit_chunk(db: Session) -> bool:
+    '''
+    Confirma lo escrito hasta ahora dentro de un @transactional de larga
+    duración (ingestas): si después falla, solo se deshace el último tramo.
+
+    Solo hace commit en el @transactional más externo; anidado (dentro de un
+    SAVEPOINT de otro) se limita a un flush y el commit sigue siendo del
+    externo. Retorna True si hizo commit.
+    '''
+    if db.info.get(_TX_DEPTH, 0) > 1:
+        db.flush()
+        return False
+    db.commit()
+    return True
+
+def transactional(func=None, *, refresh: bool = False):
     '''
     Decorador para manejar transacciones de base de datos automáticamente.
     
     Funcionalidad:
-    1. Busca automáticamente el objeto Session (db) en los argumentos de la función
+    1. Obtiene la sesión (db) de la función decorada (self.db en los servicios,
+       o su parámetro db). Sin sesión lanza RuntimeError: nunca se ejecuta fuera
+       de una transacción
     2. Ejecuta la función decorada
-    3. Si todo va bien: hace commit y refresh del resultado
+    3. Si todo va bien: hace commit
     4. Si hay error: hace rollback y re-lanza la excepción
     
+    Sin refresh tras el commit: SessionLocal usa expire_on_commit=False, así que
+    el objeto devuelto conserva los valores que se acaban de escribir (y los
+    defaults de Python, que se asignan en el flush) sin otro SELECT. Solo si
+    la BD genera valores que no se conocen en Python (server_default sin
+    default, triggers) hace falta @transactional(refresh=True).
+    
+    Anidamiento: un @transactional llamado dentro de otro (misma sesión) se
+    ejecuta en un SAVEPOINT. Si falla solo se deshace su parte y el externo
+    decide si continúa; el commit real lo hace únicamente el más externo.
+    
+    La sesión queda fijada al primario (ver app/db/session.py): las lecturas
+    dentro del método y las posteriores de la misma petición no van a réplicas.
+    
     Uso:
         @transactional
         def create_user(self, user_data):
             # código que modifica la BD
             return user
     '''
-    import inspect
-    import logging
-
-    logger = logging.getLogger(__name__)
+    if func is None:
+        return lambda f: transactional(f, refresh=refresh)
 
-    def get_db_session(*args, **kwargs):
-        # 1. Buscar directamente Session en args
-        for arg in args:
-            if isinstance(arg, Session):
-                return arg
-        
-        # 2. Buscar en kwargs
-        if 'db' in kwargs:
-            return kwargs['db']
-            
-        # 3. Buscar en el primer argumento (self) si tiene atributo .db
-        # Esto es necesario para los métodos de servicios (Service.method)
-        # RELAXED CHECK: No usamos isinstance por si hay problemas de importación
-        if args and hasattr(args[0], 'db'):
-            return args[0].db
-            
-        return None
+    get_session = session_resolver(func)
 
     @wraps(func)
     async def async_wrapper(*args, **kwargs):
-        db = get_db_session(*args, **kwargs)
+        db = get_session(args, kwargs)
         
-        if not db:
-            logger.warning(f"TRANSACTION SKIPPED: No DB session found for {func.__name__}")
-            return await func(*args, **kwargs)
+        if db is None:
+            raise _missing_session(func)
             
+        savepoint = _begin(db)
         try:
             result = await func(*args, **kwargs)
-            db.commit()
-            if hasattr(result, "__dict__"):
-                db.refresh(result)
-            return result
+            return _commit(db, savepoint, result, refresh)
         except AppError:
-            db.rollback()
+            _rollback(db, savepoint)
             raise
         except Exception as e:
-            db.rollback()
+            _rollback(db, savepoint)
             logger.error(f"Transaction failed in {func.__name__}: {str(e)}")
             raise AppError(500, ErrorCode.INTERNAL_SERVER_ERROR, str(e))
+        finally:
+            _end(db)
 
     @wraps(func)
     def sync_wrapper(*args, **kwargs):
-        db = get_db_session(*args, **kwargs)
+        db = get_session(args, kwargs)
         
-        if not db:
-            return func(*args, **kwargs)
+        if db is None:
+            raise _missing_session(func)
             
+        savepoint = _begin(db)
         try:
             result = func(*args, **kwargs)
-            db.commit()
-            if hasattr(result, "__dict__"):
-                db.refresh(result)
-            return result
+            return _commit(db, savepoint, result, refresh)
         except AppError:
-            db.rollback()
+            _rollback(db, savepoint)
             raise
         except Exception as e:
-            db.rollback()
+            _rollback(db, savepoint)
             raise AppError(500, ErrorCode.INTERNAL_SERVER_ERROR, str(e))
+        finally:
+            _end(db)
+
+    if inspect.iscoroutinefunction(func):
+        return async_wrapper
+    else:
+        return sync_wrapper
+
+def read_only(func):
+    '''
+    Decorador para métodos de solo lectura (get_all, get_by_*): sus queries
+    van a una réplica sana (DATABASE_REPLICA_URLS).
+    
+    - Sin réplicas configuradas, o si la sesión ya escribió / está dentro de un
+      @transactional, no cambia nada: se lee del primario.
+    - Failover: si la réplica falla con un error operacional (conexión,
+      timeout), se marca caída y la llamada se repite una vez en otra réplica
+      sana o, si no queda ninguna, en el primario.
+    
+    Las cargas perezosas posteriores (al serializar la respuesta) van al primario.
+    '''
+    get_session = session_resolver(func)
+
+    def use_replica(db) -> bool:
+        return bool(replicas) and isinstance(db, Session) and not is_pinned(db)
+
+    def on_replica_error(db: Session, e: OperationalError) -> None:
+        replica = current_replica(db)
+        if replica is None:
+            raise e
+        replicas.mark_down(replica, str(e))
+        db.rollback()
+        forget_replica(db)
+        logger.warning(f"Lectura en réplica fallida en {func.__name__}, se repite en otra réplica o en el primario")
+
+    @wraps(func)
+    async def async_wrapper(*args, **kwargs):
+        db = get_session(args, kwargs)
+        if not use_replica(db):
+            return await func(*args, **kwargs)
+        with replica_reads(db):
+            try:
+                return await func(*args, **kwargs)
+            except OperationalError as e:
+                on_replica_error(db, e)
+            return await func(*args, **kwargs)
+
+    @wraps(func)
+    def sync_wrapper(*args, **kwargs):
+        db = get_session(args, kwargs)
+        if not use_replica(db):
+            return func(*args, **kwargs)
+        with replica_reads(db):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                on_replica_error(db, e)
+            return func(*args, **kwargs)
 
     if inspect.iscoroutinefunction(func):
         return async_wrapper
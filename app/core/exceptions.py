@@ -1,9 +1,14 @@
 from fastapi import Request, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.exceptions import RequestValidationError
 from sqlalchemy.exc import IntegrityError, OperationalError, DataError
 from pydantic import ValidationError
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+import json
 import logging
+import time
+from app.core.config import settings
 
 # Configurar logger
 logger = logging.getLogger(__name__)
@@ -11,32 +16,126 @@ logger = logging.getLogger(__name__)
 class AppError(Exception):
     """Excepción personalizada para errores de la aplicación"""
     
-    def __init__(self, status_code: int, code: str, message: str, details: dict = None) -> None:
+    def __init__(self, status_code: int, code: str, message: str, details: dict = None, headers: dict = None) -> None:
         self.status_code = status_code
         self.code = code
         self.message = message
         self.details = details or {}
+        self.headers = headers  # Cabeceras extra de la respuesta (p. ej. Retry-After)
         super().__init__(self.message)
 
+# ============================================================================
+# RUTA RÁPIDA DE RESPUESTAS DE ERROR
+# Los 4xx (404, 401, 403) son la mayoría de las respuestas cuando hay
+# escáneres o bots: el cuerpo se arma con fragmentos ya serializados y los
+# logs repetidos se muestrean.
+# ============================================================================
+
+def _dumps(value: Any) -> bytes:
+    """Misma serialización que JSONResponse"""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+@lru_cache(maxsize=512)
+def _error_prefix(code: str, message: str, error_type: str) -> bytes:
+    """'{"error":{...},"details":' de cada (código, mensaje, tipo), serializado una sola vez"""
+    return b'{"error":' + _dumps({"code": code, "message": message, "type": error_type}) + b',"details":'
+
+def error_json(
+    code: str,
+    message: str,
+    error_type: str,
+    path: str,
+    details: Optional[Dict[str, Any]] = None
+) -> bytes:
+    """Cuerpo de error con el formato estándar ({error, details, path})"""
+    return (
+        _error_prefix(code, message, error_type)
+        + (_dumps(details) if details else b"null")
+        + b',"path":' + _dumps(path) + b"}"
+    )
+
+def error_response(
+    status_code: int,
+    code: str,
+    message: str,
+    error_type: str,
+    path: str,
+    details: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """Respuesta de error con el formato estándar ({error, details, path})"""
+    body = error_json(code, message, error_type, path, details)
+    return Response(body, status_code=status_code, headers=headers, media_type="application/json")
+
+def request_path(request: Request) -> str:
+    """Igual que request.url.path, sin construir el objeto URL"""
+    return request.scope["path"]
+
+class LogSampler:
+    '''
+    Muestreo de logs de errores repetidos, por clave (código de error).
+    
+    En cada ventana de `window` segundos se registran los `burst` primeros;
+    después, solo 1 de cada `every`, indicando cuántos se omitieron. Un
+    escáner que genera miles de 404 por segundo no llena los logs ni gasta
+    CPU formateándolos.
+    
+    Solo se usa desde los manejadores de excepciones (event loop): sin locks.
+    '''
+    def __init__(self, burst: int, window: float, every: int):
+        self.burst = burst
+        self.window = window
+        self.every = max(1, every)
+        self._state: Dict[str, list] = {}  # clave -> [inicio ventana, vistos, omitidos]
+
+    def check(self, key: str) -> Tuple[bool, int]:
+        """(registrar?, omitidos desde el último registro)"""
+        now = time.monotonic()
+        state = self._state.get(key)
+        if state is None or now - state[0] >= self.window:
+            suppressed = state[2] if state is not None else 0
+            self._state[key] = [now, 1, 0]
+            return True, suppressed
+        state[1] += 1
+        if state[1] <= self.burst or state[1] % self.every == 0:
+            suppressed, state[2] = state[2], 0
+            return True, suppressed
+        state[2] += 1
+        return False, 0
+
+error_log_sampler = LogSampler(settings.ERROR_LOG_BURST, settings.ERROR_LOG_WINDOW, settings.ERROR_LOG_SAMPLE_EVERY)
+
+def _log_sampled(key: str, msg: str, *args: Any) -> None:
+    if not logger.isEnabledFor(logging.WARNING):
+        return
+    log, suppressed = error_log_sampler.check(key)
+    if log:
+        if suppressed:
+            logger.warning(msg + " (+%d omitidos)", *args, suppressed)
+        else:
+            logger.warning(msg, *args)
+
 # ============================================================================
 # MANEJADORES DE ERRORES PERSONALIZADOS
 # ============================================================================
 
 async def app_error_handler(request: Request, exc: AppError):
     """Maneja errores personalizados de AppError"""
-    logger.warning(f"AppError: {exc.code} - {exc.message} | Path: {request.url.path}")
+    code = getattr(exc.code, "value", exc.code)
+    path = request_path(request)
+    if exc.status_code >= 500:
+        logger.warning("AppError: %s - %s | Path: %s", code, exc.message, path)
+    else:
+        _log_sampled(code, "AppError: %s - %s | Path: %s", code, exc.message, path)
     
-    return JSONResponse(
-        status_code=exc.status_code,
-        content={
-            "error": {
-                "code": exc.code,
-                "message": exc.message,
-                "type": "application_error"
-            },
-            "details": exc.details if exc.details else None,
-            "path": str(request.url.path)
-        }
+    return error_response(
+        exc.status_code,
+        code,
+        exc.message,
+        "application_error",
+        path,
+        exc.details,
+        exc.headers
     )
 
 # ============================================================================
@@ -177,25 +276,22 @@ async def data_error_handler(request: Request, exc: DataError):
 # ERROR 404 - NOT FOUND
 # ============================================================================
 
+_NOT_FOUND_HEAD = b'{"error":{"code":"ROUTE_NOT_FOUND","message":"La ruta \''
+_NOT_FOUND_MIDDLE = (
+    "\' no existe en esta API. Verifica la URL.\",\"type\":\"not_found_error\"},"
+    "\"details\":{\"available_docs\":\"/docs\",\"requested_path\":"
+).encode("utf-8")
+
 async def not_found_handler(request: Request, exc: Exception):
     """Maneja rutas no encontradas (404)"""
-    logger.warning(f"NotFound: {request.url.path}")
+    path = request_path(request)
+    _log_sampled("ROUTE_NOT_FOUND", "NotFound: %s", path)
     
-    return JSONResponse(
-        status_code=status.HTTP_404_NOT_FOUND,
-        content={
-            "error": {
-                "code": "ROUTE_NOT_FOUND",
-                "message": f"La ruta '{request.url.path}' no existe en esta API. Verifica la URL.",
-                "type": "not_found_error"
-            },
-            "details": {
-                "available_docs": "/docs",
-                "requested_path": str(request.url.path)
-            },
-            "path": str(request.url.path)
-        }
-    )
+    # El mensaje incluye la ruta (distinta en cada petición): se insertan sus
+    # versiones serializadas entre fragmentos fijos del cuerpo
+    path_json = _dumps(path)
+    body = _NOT_FOUND_HEAD + path_json[1:-1] + _NOT_FOUND_MIDDLE + path_json + b'},"path":' + path_json + b"}"
+    return Response(body, status_code=status.HTTP_404_NOT_FOUND, media_type="application/json")
 
 # ============================================================================
 # ERROR 405 - METHOD NOT ALLOWED
@@ -203,22 +299,16 @@ async def not_found_handler(request: Request, exc: Exception):
 
 async def method_not_allowed_handler(request: Request, exc: Exception):
     """Maneja métodos HTTP no permitidos (405)"""
-    logger.warning(f"MethodNotAllowed: {request.method} on {request.url.path}")
+    path = request_path(request)
+    _log_sampled("METHOD_NOT_ALLOWED", "MethodNotAllowed: %s on %s", request.method, path)
     
-    return JSONResponse(
-        status_code=status.HTTP_405_METHOD_NOT_ALLOWED,
-        content={
-            "error": {
-                "code": "METHOD_NOT_ALLOWED",
-                "message": f"El método HTTP '{request.method}' no está permitido para esta ruta. Verifica la documentación.",
-                "type": "method_not_allowed_error"
-            },
-            "details": {
-                "method_used": request.method,
-                "available_docs": "/docs"
-            },
-            "path": str(request.url.path)
-        }
+    return error_response(
+        status.HTTP_405_METHOD_NOT_ALLOWED,
+        "METHOD_NOT_ALLOWED",
+        f"El método HTTP '{request.method}' no está permitido para esta ruta. Verifica la documentación.",
+        "method_not_allowed_error",
+        path,
+        {"method_used": request.method, "available_docs": "/docs"}
     )
 
 # ============================================================================
@@ -0,0 +1,47 @@
+import hashlib
+import json
+from typing import Any, Dict, Iterable
+
+# ============================================================================
+# HASH DE CONTENIDO
+# Huella estable de un registro normalizado de una API externa.
+# Se guarda por fila (content_hash) para saltar en cada refresco los
+# registros que no han cambiado sin comparar campo a campo.
+# ============================================================================
+
+# Precisión de coordenadas: ~1 cm, evita falsos cambios por redondeo float
+FLOAT_PRECISION = 6
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    if isinstance(value, float):
+        return round(value, FLOAT_PRECISION)
+    return value
+
+def normalize_record(record: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    """Devuelve solo `fields` del registro, con strings recortados y floats redondeados"""
+    return {field: _normalize(record.get(field)) for field in fields}
+
+def content_hash(record: Dict[str, Any], fields: Iterable[str]) -> str:
+    """SHA-256 (hex, 64 chars) del registro normalizado, independiente del orden de claves"""
+    payload = json.dumps(
+        normalize_record(record, fields),
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def changed_fields(entity: Any, record: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    """
+    Campos de `record` cuyo valor (no None) difiere del de la entidad.
+    Se usa cuando el hash no coincide (o no existe aún) para escribir solo el diff.
+    """
+    return {
+        field: record[field]
+        for field in fields
+        if record.get(field) is not None and getattr(entity, field) != record[field]
+    }
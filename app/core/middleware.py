@@ -0,0 +1,307 @@
+'''
+Middlewares ASGI propios de la aplicación.
+
+Son middlewares ASGI "puros" (no BaseHTTPMiddleware) para poder vigilar el
+cuerpo de la petición mientras llega, sin cargarlo entero en memoria, y
+rechazar peticiones antes de que lleguen al threadpool.
+
+- BodySizeLimitMiddleware: límite de tamaño de subida (413)
+- AdmissionControlMiddleware: concurrencia por grupo de rutas (503 + Retry-After)
+- SlowRequestMiddleware: registro de peticiones lentas (app/core/slow_requests.py)
+'''
+
+import asyncio
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, FrozenSet, Iterable, List, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.constants import ErrorCode
+from app.core.exceptions import error_json
+from app.core.slow_requests import SlowRequestRecorder
+
+def error_body(status_code: int, code: str, message: str, path: str, details: dict = None) -> bytes:
+    """Mismo cuerpo, byte a byte, que app_error_handler (app/core/exceptions.py)"""
+    return error_json(code, message, "application_error", path, details)
+
+class BodySizeLimitMiddleware:
+    '''
+    Limita el tamaño del cuerpo de las peticiones a las rutas indicadas.
+    
+    - Si Content-Length ya supera el límite, responde 413 sin leer nada.
+    - Si no (p. ej. multipart chunked), cuenta los bytes según se reciben y en
+      cuanto se supera el límite deja de entregar el cuerpo a la aplicación.
+      La respuesta que genere la aplicación (normalmente un error de parseo)
+      se sustituye por el 413.
+    '''
+    def __init__(self, app: ASGIApp, max_bytes: int, paths: Iterable[str]):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = tuple(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        for name, value in scope.get("headers", []):
+            if name == b"content-length" and value.isdigit() and int(value) > self.max_bytes:
+                await self._send_413(send, path)
+                return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, exceeded
+            if exceeded:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    exceeded = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            nonlocal response_started
+            if exceeded:
+                # Se descarta la respuesta de la aplicación y se envía el 413 (una sola vez)
+                if message["type"] == "http.response.start" and not response_started:
+                    response_started = True
+                    await self._send_413(send, path)
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not exceeded:
+                raise
+        if exceeded and not response_started:
+            await self._send_413(send, path)
+
+    async def _send_413(self, send: Send, path: str) -> None:
+        body = error_body(
+            413,
+            ErrorCode.PAYLOAD_TOO_LARGE.value,
+            f"El cuerpo de la petición supera el máximo permitido ({self.max_bytes} bytes)",
+            path,
+            {"max_bytes": self.max_bytes}
+        )
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close")
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+# ============================================================================
+# CONTROL DE ADMISIÓN
+# ============================================================================
+
+@dataclass(frozen=True)
+class AdmissionGroup:
+    '''
+    Presupuesto de concurrencia para un grupo de rutas.
+    
+    - pattern: regex sobre el path; methods: métodos HTTP (None = todos)
+    - limit: peticiones en curso a la vez
+    - queue: peticiones que pueden esperar un hueco (0 = rechazar si está lleno)
+    - max_wait: segundos máximos de espera en la cola
+    '''
+    name: str
+    pattern: str
+    limit: int
+    queue: int
+    max_wait: float
+    methods: Optional[FrozenSet[str]] = None
+
+    def matches(self, method: str, path: str) -> bool:
+        return (self.methods is None or method in self.methods) and re.match(self.pattern, path) is not None
+
+class _Budget:
+    '''Semáforo con cola acotada (FIFO) y espera máxima. Solo se usa desde el event loop.'''
+    def __init__(self, group: AdmissionGroup):
+        self.group = group
+        self.active = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.stats = {"admitted": 0, "queued": 0, "rejected_queue_full": 0, "rejected_timeout": 0}
+
+    async def acquire(self) -> Optional[str]:
+        """None si se admite; si no, el motivo del rechazo"""
+        if self.active < self.group.limit and not self.waiters:
+            self.active += 1
+            self.stats["admitted"] += 1
+            return None
+        if len(self.waiters) >= self.group.queue:
+            self.stats["rejected_queue_full"] += 1
+            return "queue_full"
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        self.stats["queued"] += 1
+        try:
+            await asyncio.wait({waiter}, timeout=self.group.max_wait)
+        except asyncio.CancelledError:
+            # El cliente se fue mientras esperaba: si ya tenía hueco, se libera
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._discard(waiter)
+            raise
+        if waiter.done():
+            # release() transfirió el hueco a esta petición (active no cambia)
+            self.stats["admitted"] += 1
+            return None
+        self._discard(waiter)
+        self.stats["rejected_timeout"] += 1
+        return "queue_timeout"
+
+    def release(self) -> None:
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def _discard(self, waiter: asyncio.Future) -> None:
+        waiter.cancel()
+        try:
+            self.waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "group": self.group.name,
+            "limit": self.group.limit,
+            "queue": self.group.queue,
+            "max_wait": self.group.max_wait,
+            "active": self.active,
+            "waiting": len(self.waiters),
+            **self.stats
+        }
+
+_budgets: Dict[str, _Budget] = {}
+
+def admission_snapshots() -> List[Dict[str, Any]]:
+    return [budget.snapshot() for budget in _budgets.values()]
+
+class AdmissionControlMiddleware:
+    '''
+    Control de admisión y descarte de carga por grupos de rutas.
+    
+    Cada petición se asigna al primer grupo cuyo patrón coincide y solo pasa a
+    la aplicación si hay hueco en su presupuesto. Si no lo hay, espera en una
+    cola acotada como mucho max_wait segundos. Si la cola está llena o vence el
+    plazo, responde 503 con Retry-After sin tocar la BD ni el threadpool: la
+    petición se rechaza antes de hacer trabajo, en lugar de fallar tarde con el
+    pool de conexiones agotado.
+    
+    Las rutas que no coinciden con ningún grupo (health, docs) no se limitan.
+    El estado es por proceso y se expone en GET /api/health/admission.
+    '''
+    def __init__(self, app: ASGIApp, groups: Iterable[AdmissionGroup], retry_after: int = 1):
+        self.app = app
+        self.budgets = []
+        for group in groups:
+            budget = _Budget(group)
+            _budgets[group.name] = budget
+            self.budgets.append(budget)
+        self.retry_after = retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        budget = next((b for b in self.budgets if b.group.matches(scope["method"], scope["path"])), None)
+        if budget is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.monotonic()
+        reason = await budget.acquire()
+        if reason is not None:
+            await self._send_503(send, scope["path"], budget.group, reason, time.monotonic() - start)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            budget.release()
+
+    async def _send_503(self, send: Send, path: str, group: AdmissionGroup, reason: str, waited: float) -> None:
+        body = error_body(
+            503,
+            ErrorCode.SERVER_OVERLOADED.value,
+            "El servidor está saturado. Intenta nuevamente en unos momentos.",
+            path,
+            {"group": group.name, "reason": reason, "waited_seconds": round(waited, 3)}
+        )
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.retry_after).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+# ============================================================================
+# PETICIONES LENTAS
+# ============================================================================
+
+class SlowRequestMiddleware:
+    '''
+    Mide cada petición HTTP y entrega a SlowRequestRecorder las que superan el
+    umbral, con sus queries SQL y pilas muestreadas.
+    
+    Se coloca por fuera del resto de middlewares: el tiempo medido incluye la
+    espera en el control de admisión, que también forma parte de la latencia
+    que ve el cliente. Las respuestas en streaming (SSE) no se registran.
+    '''
+    def __init__(self, app: ASGIApp, recorder: SlowRequestRecorder):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        streaming = False
+
+        async def recording_send(message: Message) -> None:
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                streaming = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", [])
+                )
+            await send(message)
+
+        trace = self.recorder.begin(scope["method"], scope["path"])
+        try:
+            await self.app(scope, receive, recording_send)
+        finally:
+            # El router de Starlette deja la ruta encontrada en el scope
+            route = getattr(scope.get("route"), "path", None)
+            self.recorder.finish(trace, status_code, route, record=not streaming)
@@ -0,0 +1,149 @@
+'''
+Profiler estadístico de pilas (muestreo) para los workers en producción.
+
+En lugar de instrumentar cada llamada (cProfile), un hilo toma cada
+`interval` segundos la pila de los hilos que interesan con
+sys._current_frames(). El coste depende de la frecuencia de muestreo y no
+del código perfilado, y los hilos observados no se ralentizan.
+
+Las pilas se guardan en formato "collapsed" (el que usan flamegraph.pl,
+speedscope o inferno): marcos de la raíz a la hoja separados por ";" y el
+número de muestras.
+
+- collapse_stack(frame): pila de un marco como cadena collapsed
+- StackSampler: muestrea bajo demanda los hilos de las peticiones lentas
+  en curso (ver app/core/slow_requests.py)
+- profile_threads(seconds): muestrea todos los hilos del proceso durante un
+  tiempo (GET /api/v1/admin/profile)
+'''
+
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, Optional, Protocol, Set
+
+MAX_STACK_DEPTH = 128
+
+# Funciones en las que un hilo está esperando trabajo (no consumiendo CPU):
+# threadpool de anyio y executors en reposo, event loop sin eventos
+IDLE_FRAMES = frozenset({
+    "threading.Condition.wait",
+    "threading.Event.wait",
+    "threading.Thread._wait_for_tstate_lock",
+    "queue.Queue.get",
+    "concurrent.futures.thread._worker",
+    "selectors.EpollSelector.select",
+    "selectors.KqueueSelector.select",
+    "selectors.PollSelector.select",
+    "selectors.SelectSelector.select",
+    "app.core.profiling.StackSampler._run",
+})
+
+def frame_label(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_qualname}"
+
+def collapse_stack(frame, max_depth: int = MAX_STACK_DEPTH) -> str:
+    labels = []
+    while frame is not None and len(labels) < max_depth:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+def format_collapsed(samples: Counter) -> str:
+    """Líneas "pila muestras" ordenadas de mayor a menor"""
+    return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+def is_idle(frame) -> bool:
+    return frame_label(frame) in IDLE_FRAMES
+
+_profile_lock = threading.Lock()
+
+def profile_threads(seconds: float, interval: float, include_idle: bool = False) -> Optional[Dict]:
+    '''
+    Muestrea la pila de todos los hilos del proceso (salvo el propio) cada
+    `interval` segundos durante `seconds` segundos. Los hilos en reposo se
+    descartan salvo con include_idle. Cada pila lleva como raíz el nombre
+    del hilo ("thread:MainThread;...").
+    
+    Retorna {"samples": Counter, "ticks": n, "seconds": s}, o None si ya hay
+    otro perfilado en curso en el proceso (solo uno a la vez).
+    '''
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        own = threading.get_ident()
+        samples: Counter = Counter()
+        ticks = 0
+        start = time.perf_counter()
+        deadline = start + seconds
+        while time.perf_counter() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or (not include_idle and is_idle(frame)):
+                    continue
+                samples[f"thread:{names.get(thread_id, thread_id)};{collapse_stack(frame)}"] += 1
+            ticks += 1
+            time.sleep(interval)
+        return {"samples": samples, "ticks": ticks, "seconds": time.perf_counter() - start}
+    finally:
+        _profile_lock.release()
+
+class Sampled(Protocol):
+    '''Lo que StackSampler necesita de cada objetivo (p. ej. una petición en curso)'''
+    start: float
+    samples: Counter
+
+    def sample_threads(self) -> Iterable[int]: ...
+
+class StackSampler:
+    '''
+    Muestrea las pilas de los objetivos registrados con add().
+
+    Un objetivo solo se muestrea cuando lleva más de `delay` segundos en
+    curso: las peticiones rápidas no generan ninguna muestra y, mientras
+    ninguna petición supera ese umbral, el hilo del sampler está dormido.
+    '''
+    def __init__(self, interval: float, delay: float):
+        self.interval = interval
+        self.delay = delay
+        self._targets: Set[Sampled] = set()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, target: Sampled) -> None:
+        with self._cond:
+            self._targets.add(target)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+
+    def remove(self, target: Sampled) -> None:
+        with self._cond:
+            self._targets.discard(target)
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while True:
+            with self._cond:
+                if not self._targets:
+                    # Sin notify() en add(): despertar al hilo en cada petición
+                    # cuesta más que revisar cada `delay` segundos. Un objetivo
+                    # nuevo se ve como tarde a los `delay` segundos, justo
+                    # cuando empieza a tocar muestrearlo.
+                    self._cond.wait(self.delay)
+                    continue
+                now = time.perf_counter()
+                due = [t for t in self._targets if now - t.start >= self.delay]
+                if not due:
+                    self._cond.wait(min(t.start for t in self._targets) + self.delay - now)
+                    continue
+
+            frames = sys._current_frames()
+            for target in due:
+                for thread_id in target.sample_threads():
+                    frame = frames.get(thread_id)
+                    if frame is not None and thread_id != own:
+                        target.samples[collapse_stack(frame)] += 1
+            del frames
+            time.sleep(self.interval)
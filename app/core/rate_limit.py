@@ -0,0 +1,161 @@
+'''
+Limitación de frecuencia (rate limiting) con token bucket.
+
+Cada clave (IP, email o usuario, por límite) tiene un cubo de `capacity`
+tokens que se rellena a `capacity / period` tokens por segundo. Cada petición
+gasta un token; sin tokens se responde 429 con Retry-After (segundos hasta el
+siguiente token). Permite ráfagas de hasta `capacity` y limita el ritmo
+sostenido.
+
+- RateLimitBackend: interfaz de almacenamiento de los cubos.
+- MemoryRateLimitBackend: en memoria del proceso, O(1) por petición, con una
+  tabla acotada (RATE_LIMIT_MAX_KEYS) que expulsa la clave usada hace más
+  tiempo (LRU). Con varios workers cada uno limita por separado; un backend
+  compartido (p. ej. Redis) se conecta con set_backend() sin tocar los
+  endpoints.
+- IPRateLimit / EmailRateLimit / UserRateLimit: dependencias de FastAPI.
+  Se aplican antes de ejecutar el endpoint (antes del bcrypt de login/registro).
+'''
+
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Tuple
+from fastapi import Depends, Request, status
+from app.core.config import settings
+from app.core.constants import ErrorCode
+from app.core.exceptions import AppError
+from app.auth.deps import get_current_user
+from app.schemas.user import TokenData
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+class RateLimitBackend(ABC):
+    '''
+    Interfaz: consume `cost` tokens del cubo `key`.
+    Retorna (permitido, segundos hasta poder reintentar).
+    
+    Las dependencias la llaman desde el event loop (son async para no pasar
+    por el threadpool): hit() no debe bloquear más de lo que tarda una
+    operación en memoria o un round-trip rápido a un almacén compartido.
+    '''
+    @abstractmethod
+    def hit(self, key: str, capacity: int, period: float, cost: int = 1) -> Tuple[bool, float]:
+        ...
+
+    @abstractmethod
+    def reset(self) -> None:
+        ...
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, capacity: int, period: float, cost: int = 1) -> Tuple[bool, float]:
+        now = time.monotonic()
+        refill_rate = capacity / period
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * refill_rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                # La clave expulsada vuelve con el cubo lleno: solo afecta a
+                # clientes inactivos desde hace más que el resto
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (cost - tokens) / refill_rate
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+_backend: Optional[RateLimitBackend] = None
+
+def get_backend() -> RateLimitBackend:
+    """Backend del proceso (en memoria por defecto)"""
+    global _backend
+    if _backend is None:
+        _backend = MemoryRateLimitBackend(settings.RATE_LIMIT_MAX_KEYS)
+    return _backend
+
+def set_backend(backend: Optional[RateLimitBackend]) -> None:
+    """Sustituye el backend (p. ej. uno compartido entre workers). None vuelve al de memoria."""
+    global _backend
+    _backend = backend
+
+# ============================================================================
+# DEPENDENCIAS
+# ============================================================================
+
+def client_ip(request: Request) -> str:
+    '''
+    IP del cliente. X-Forwarded-For solo se usa con RATE_LIMIT_TRUST_PROXY
+    (detrás de un proxy propio); si no, cualquiera podría falsearla.
+    '''
+    if settings.RATE_LIMIT_TRUST_PROXY:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+class _RateLimit:
+    def __init__(self, name: str, capacity: int, period: Optional[float] = None):
+        self.name = name
+        self.capacity = capacity
+        self.period = period or settings.RATE_LIMIT_PERIOD
+
+    def check(self, key: str) -> None:
+        if not settings.RATE_LIMIT_ENABLED or self.capacity <= 0:
+            return
+        allowed, retry_after = get_backend().hit(f"{self.name}:{key}", self.capacity, self.period)
+        if not allowed:
+            retry_seconds = max(1, math.ceil(retry_after))
+            raise AppError(
+                status.HTTP_429_TOO_MANY_REQUESTS,
+                ErrorCode.RATE_LIMITED,
+                "Demasiadas peticiones. Intenta nuevamente más tarde.",
+                {"limit": self.name, "retry_after_seconds": retry_seconds},
+                headers={"Retry-After": str(retry_seconds)}
+            )
+
+class IPRateLimit(_RateLimit):
+    """Límite por IP del cliente"""
+    async def __call__(self, request: Request) -> None:
+        self.check(client_ip(request))
+
+class EmailRateLimit(_RateLimit):
+    '''
+    Límite por el campo "email" del cuerpo JSON (login/registro), para frenar
+    ataques a una cuenta desde muchas IPs. FastAPI ya ha leído el cuerpo: se
+    reutiliza el que Request guarda en caché.
+    '''
+    async def __call__(self, request: Request) -> None:
+        try:
+            body = await request.json()
+        except ValueError:
+            return  # Cuerpo inválido: lo rechaza la validación del endpoint
+        email = body.get("email") if isinstance(body, dict) else None
+        if isinstance(email, str) and email.strip():
+            self.check(email.strip().lower())
+
+class UserRateLimit(_RateLimit):
+    """Límite por usuario autenticado (operaciones de escritura)"""
+    async def __call__(self, user: TokenData = Depends(get_current_user)) -> None:
+        self.check(str(user.user_id))
+
+# Límites de la aplicación (RATE_LIMIT_* en app/core/config.py)
+login_ip_limit = IPRateLimit("login_ip", settings.RATE_LIMIT_LOGIN_PER_IP)
+login_email_limit = EmailRateLimit("login_email", settings.RATE_LIMIT_LOGIN_PER_EMAIL)
+register_ip_limit = IPRateLimit("register_ip", settings.RATE_LIMIT_REGISTER_PER_IP)
+write_user_limit = UserRateLimit("write_user", settings.RATE_LIMIT_WRITES_PER_USER)
@@ -1,7 +1,5 @@
 from pathlib import Path
 from typing import Tuple
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
 
 def get_rsa_keys(certs_dir: str = "certs") -> Tuple[str, str]:
     """
@@ -25,6 +23,10 @@ def get_rsa_keys(certs_dir: str = "certs") -> Tuple[str, str]:
             public_key_path.read_text(encoding="utf-8")
         )
     
+    # cryptography solo hace falta para generar claves nuevas (import diferido)
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    
     # Crear directorio si no existe
     certs_path.mkdir(exist_ok=True)
     
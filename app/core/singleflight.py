@@ -0,0 +1,130 @@
+'''
+Coalescencia de lecturas idénticas concurrentes ("single-flight").
+
+Cuando muchas peticiones piden a la vez el mismo recurso (un viaje compartido
+que se hace popular), solo la primera ejecuta la lectura; las demás esperan
+su resultado y lo reutilizan. El resultado compartido debe ser inmutable y
+no depender de la sesión: se comparte la respuesta ya serializada (bytes),
+nunca objetos ORM.
+
+- do(key, fn): ejecuta fn() o se une a la ejecución en curso de la misma clave.
+  Si fn() lanza una excepción, todas las peticiones unidas la reciben.
+- ttl > 0: el resultado se reutiliza además durante ttl segundos (caché de
+  respuesta de vida corta delante de la BD). Con ttl = 0 solo se comparten las
+  ejecuciones simultáneas y no hay datos obsoletos más allá de ellas.
+- forget_on_commit(db, key): descarta la entrada cuando la transacción que
+  modifica el recurso hace commit (no antes, para que una lectura concurrente
+  no vuelva a guardar el dato antiguo).
+
+Es por proceso y thread-safe (los endpoints síncronos corren en el threadpool).
+'''
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+class SingleFlight:
+    def __init__(self, name: str, ttl: float = 0.0, max_entries: int = 1024, enabled: bool = True):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._results: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.stats = {"calls": 0, "executions": 0, "shared": 0, "cache_hits": 0}
+        _registry.append(self)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        if not self.enabled:
+            return fn()
+
+        with self._lock:
+            self.stats["calls"] += 1
+            cached = self._results.get(key)
+            if cached is not None:
+                if time.monotonic() < cached[0]:
+                    self.stats["cache_hits"] += 1
+                    return cached[1]
+                del self._results[key]
+
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats["executions"] += 1
+            else:
+                call.waiters += 1
+                self.stats["shared"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is None and self.ttl > 0:
+                    self._results[key] = (time.monotonic() + self.ttl, call.result)
+                    self._results.move_to_end(key)
+                    while len(self._results) > self.max_entries:
+                        self._results.popitem(last=False)
+            call.done.set()
+        return call.result
+
+    def forget(self, key: Hashable) -> None:
+        with self._lock:
+            self._results.pop(key, None)
+
+    def forget_on_commit(self, db: Session, key: Hashable) -> None:
+        db.info.setdefault(_PENDING_FORGETS, []).append((self, key))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "ttl": self.ttl,
+                "in_flight": len(self._calls),
+                "cached": len(self._results),
+                **self.stats
+            }
+
+_registry: List[SingleFlight] = []
+
+# Clave en Session.info: entradas a descartar cuando la transacción haga commit
+_PENDING_FORGETS = "singleflight_forget"
+
+@event.listens_for(Session, "after_commit")
+def _forget_committed(session: Session) -> None:
+    # after_commit también se emite al liberar un SAVEPOINT (@transactional
+    # anidado): los cambios aún no son visibles para otras conexiones
+    if session.in_nested_transaction():
+        return
+    for singleflight, key in session.info.pop(_PENDING_FORGETS, ()):
+        singleflight.forget(key)
+
+def singleflight_snapshots() -> List[Dict[str, Any]]:
+    return [sf.snapshot() for sf in _registry]
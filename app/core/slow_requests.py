@@ -0,0 +1,205 @@
+'''
+Registro de peticiones lentas con sus queries SQL y una muestra de pilas.
+
+SlowRequestMiddleware (app/core/middleware.py) abre una traza por petición;
+las queries SQL de cualquier engine (primario o réplica) que se ejecutan
+dentro de la petición se anotan en ella (before/after_cursor_execute). Los
+endpoints síncronos corren en el threadpool, pero anyio copia el contexto al
+hilo, así que la traza (ContextVar) también es visible allí.
+
+Si la petición tarda SLOW_REQUEST_THRESHOLD_MS o más:
+- se escribe una línea JSON en SLOW_REQUEST_LOG_FILE (rotativo, un fichero
+  por proceso: "{pid}" se sustituye por el pid del worker)
+- se guarda entre las SLOW_REQUEST_KEEP más lentas del proceso
+  (GET /api/v1/admin/slow-requests)
+
+Las pilas las toma StackSampler (app/core/profiling.py) solo de las
+peticiones que llevan más de SLOW_REQUEST_PROFILE_AFTER_MS en curso, y solo
+de sus hilos: los del threadpool que ejecutaron sus queries o, si no hay
+ninguno (endpoint async), el del event loop.
+
+Con peticiones rápidas el coste es crear la traza y anotar las queries: el
+sampler está dormido y no se escribe nada.
+'''
+
+import heapq
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar, Token
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+from app.core.profiling import StackSampler
+
+MAX_STATEMENT_CHARS = 2000
+MAX_STACKS_PER_RECORD = 20
+
+class RequestTrace:
+    __slots__ = (
+        "method", "path", "start", "started_at", "loop_thread", "worker_threads",
+        "queries", "query_count", "sql_seconds", "samples", "token", "__weakref__"
+    )
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.start = time.perf_counter()
+        self.started_at = time.time()
+        self.loop_thread = threading.get_ident()
+        self.worker_threads: Set[int] = set()
+        self.queries: List[Dict[str, Any]] = []
+        self.query_count = 0
+        self.sql_seconds = 0.0
+        self.samples: Counter = Counter()
+        self.token: Optional[Token] = None
+
+    def sample_threads(self) -> Iterable[int]:
+        return tuple(self.worker_threads) or (self.loop_thread,)
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("slow_request_trace", default=None)
+
+# ============================================================================
+# QUERIES SQL
+# ============================================================================
+
+# Inicio de la sentencia, guardado en su contexto de ejecución (no en
+# conn.info: after_cursor_execute no se llama si la sentencia falla y la
+# entrada quedaría en la conexión del pool para siempre)
+_QUERY_START = "_slow_request_query_start"
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current_trace.get() is not None:
+        setattr(context, _QUERY_START, time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    started = getattr(context, _QUERY_START, None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    thread_id = threading.get_ident()
+    if thread_id != trace.loop_thread:
+        trace.worker_threads.add(thread_id)
+    trace.query_count += 1
+    trace.sql_seconds += elapsed
+    if len(trace.queries) < settings.SLOW_REQUEST_MAX_QUERIES:
+        # Solo la sentencia, nunca los parámetros (pueden contener datos personales)
+        trace.queries.append({
+            "statement": statement[:MAX_STATEMENT_CHARS],
+            "duration_ms": round(elapsed * 1000, 2),
+            "executemany": executemany
+        })
+
+_sql_hooks_installed = False
+
+def install_sql_hooks() -> None:
+    """Escucha las queries de todos los engines (una sola vez por proceso)"""
+    global _sql_hooks_installed
+    if not _sql_hooks_installed:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _sql_hooks_installed = True
+
+# ============================================================================
+# REGISTRO
+# ============================================================================
+
+class SlowRequestRecorder:
+    def __init__(self, threshold_ms: float, keep: int, log_file: str, sampler: StackSampler):
+        self.threshold = threshold_ms / 1000
+        self.keep = keep
+        self.log_file = log_file
+        self.sampler = sampler
+        self._slowest: List[tuple] = []  # min-heap (duración, secuencia, registro)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._logger: Optional[logging.Logger] = None
+
+    def begin(self, method: str, path: str) -> RequestTrace:
+        trace = RequestTrace(method, path)
+        trace.token = _current_trace.set(trace)
+        self.sampler.add(trace)
+        return trace
+
+    def finish(self, trace: RequestTrace, status_code: int, route: Optional[str] = None, record: bool = True) -> None:
+        self.sampler.remove(trace)
+        _current_trace.reset(trace.token)
+        duration = time.perf_counter() - trace.start
+        if record and duration >= self.threshold:
+            self._record(trace, duration, status_code, route)
+
+    def _record(self, trace: RequestTrace, duration: float, status_code: int, route: Optional[str]) -> None:
+        entry = {
+            "timestamp": datetime.fromtimestamp(trace.started_at, timezone.utc).isoformat(),
+            "pid": os.getpid(),
+            "method": trace.method,
+            "path": trace.path,
+            "route": route,
+            "status": status_code,
+            "duration_ms": round(duration * 1000, 1),
+            "query_count": trace.query_count,
+            "sql_ms": round(trace.sql_seconds * 1000, 1),
+            "queries": trace.queries,
+            "stack_samples": sum(trace.samples.values()),
+            "stacks": [
+                {"stack": stack, "samples": count}
+                for stack, count in trace.samples.most_common(MAX_STACKS_PER_RECORD)
+            ]
+        }
+        with self._lock:
+            item = (duration, next(self._seq), entry)
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, item)
+            elif duration > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+        try:
+            self._get_logger().info(json.dumps(entry, ensure_ascii=False))
+        except OSError as e:
+            logging.getLogger(__name__).warning(f"No se pudo escribir el registro de peticiones lentas: {str(e)}")
+
+    def _get_logger(self) -> logging.Logger:
+        # Se crea al registrar la primera petición lenta (después del fork: un fichero por worker)
+        if self._logger is None:
+            path = self.log_file.format(pid=os.getpid())
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                path,
+                maxBytes=settings.SLOW_REQUEST_LOG_MAX_BYTES,
+                backupCount=settings.SLOW_REQUEST_LOG_BACKUPS,
+                encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger = logging.getLogger(f"{__name__}.file")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            logger.addHandler(handler)
+            self._logger = logger
+        return self._logger
+
+    def slowest(self, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [entry for _, _, entry in heapq.nlargest(limit, self._slowest)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._slowest.clear()
+
+slow_requests = SlowRequestRecorder(
+    settings.SLOW_REQUEST_THRESHOLD_MS,
+    settings.SLOW_REQUEST_KEEP,
+    settings.SLOW_REQUEST_LOG_FILE,
+    StackSampler(
+        settings.SLOW_REQUEST_SAMPLE_INTERVAL_MS / 1000,
+        settings.SLOW_REQUEST_PROFILE_AFTER_MS / 1000
+    )
+)
@@ -0,0 +1,71 @@
+'''
+Calentamiento de la aplicación antes de aceptar tráfico.
+
+Dos fases (ver gunicorn.conf.py):
+
+- preload(app): en el proceso maestro, una vez, antes de crear los workers.
+  Carga lo que es de solo lectura y se comparte entre procesos tras el fork
+  (copy-on-write): claves RSA y esquema OpenAPI. Al final congela el GC
+  (gc.freeze) para que las pasadas del recolector en los workers no toquen
+  esos objetos y no se copien las páginas de memoria compartidas.
+- warm_up(): en cada worker, dentro del lifespan (uvicorn no acepta
+  conexiones hasta que termina). Abre DB_POOL_SIZE conexiones del pool del
+  primario y de cada réplica para que las primeras peticiones no paguen el
+  connect a MySQL (y de paso comprueba la salud de las réplicas).
+
+Los fallos del calentamiento se registran pero no impiden arrancar: la
+disponibilidad de la BD la reporta GET /api/health/db.
+'''
+
+import gc
+import logging
+import time
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+def preload(app: FastAPI) -> None:
+    """Carga recursos compartidos de solo lectura (proceso maestro, antes del fork)"""
+    start = time.perf_counter()
+    settings.PRIVATE_KEY  # Lee (o genera) las claves RSA una sola vez
+    app.openapi()         # FastAPI guarda el esquema en app.openapi_schema
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Preload completado en {(time.perf_counter() - start) * 1000:.0f} ms")
+
+def warm_db_pool(engine: Engine, connections: int) -> int:
+    """
+    Abre `connections` conexiones a la vez y las devuelve al pool.
+    Retorna el número de conexiones abiertas con éxito.
+    """
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            opened.append(conn)
+            conn.execute(text("SELECT 1"))
+    except Exception as e:
+        logger.warning(f"Calentamiento del pool incompleto ({len(opened)}/{connections}): {str(e)}")
+    finally:
+        for conn in opened:
+            conn.close()
+    return len(opened)
+
+def warm_up() -> None:
+    """Calentamiento por worker (después del fork)"""
+    if not settings.WARMUP_ON_STARTUP:
+        return
+    from app.db.session import engine, replicas
+
+    start = time.perf_counter()
+    opened = warm_db_pool(engine, settings.DB_POOL_SIZE)
+    if replicas:
+        replicas.check()
+        for replica in replicas.replicas:
+            if replica.healthy:
+                opened += warm_db_pool(replica.engine, settings.DB_POOL_SIZE)
+    settings.PUBLIC_KEY  # Sin preload (uvicorn directo) las claves se cargan aquí
+    logger.info(f"Worker calentado en {(time.perf_counter() - start) * 1000:.0f} ms ({opened} conexiones)")
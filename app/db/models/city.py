@@ -15,6 +15,9 @@ class City(Base):
     population: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     geoname_id: Mapped[Optional[int]] = mapped_column(Integer, unique=True, nullable=True, index=True)
 
+    # Hash del último registro recibido de la API externa (ver app/core/hashing.py)
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+
     country_id: Mapped[int] = mapped_column(ForeignKey("country.id"), nullable=True)
 
     # Relaciones
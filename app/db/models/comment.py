@@ -1,4 +1,4 @@
-from sqlalchemy import ForeignKey, String
+from sqlalchemy import ForeignKey, String, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
 from datetime import datetime
@@ -17,3 +17,10 @@ class Comment(Base):
     user = relationship("User", back_populates="comments")
     trip = relationship("Trip", back_populates="comments")
 
+    __table_args__ = (
+        # Feed de un viaje por recencia (GET /v1/comment/trip/{id}/feed):
+        # igualdad en trip_id y rango/orden en (created_at, id) con el mismo índice
+        Index("idx_comment_trip_created", "trip_id", "created_at", "id"),
+        # Timeline del usuario (GET /v1/users/{id}/timeline)
+        Index("idx_comment_user_created", "user_id", "created_at", "id"),
+    )
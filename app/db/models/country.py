@@ -18,6 +18,9 @@ class Country(Base):
     population: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     flag_url: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
 
+    # Hash del último registro recibido de la API externa (ver app/core/hashing.py)
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+
     # Relaciones
     trips = relationship("Trip", back_populates="country")
     cities = relationship("City", back_populates="country")
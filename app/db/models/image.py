@@ -0,0 +1,27 @@
+from sqlalchemy import String, Integer, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+from datetime import datetime
+
+class ImageBlob(Base):
+    '''
+    Imagen ya subida al almacenamiento, direccionada por contenido.
+    
+    content_hash es el SHA-256 del fichero original recibido y variant describe
+    el procesado aplicado (p. ej. "webp-1024x1024-q80"): la misma imagen con
+    otra configuración de procesado es otra variante. Si un usuario vuelve a
+    subir una imagen ya conocida se reutiliza la URL sin procesar ni subir nada.
+    '''
+    __tablename__ = "image_blobs"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    variant: Mapped[str] = mapped_column(String(64), nullable=False)
+    url: Mapped[str] = mapped_column(String(500), nullable=False)
+    content_type: Mapped[str] = mapped_column(String(50), nullable=False)
+    size_bytes: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(nullable=False, default=datetime.now)
+
+    __table_args__ = (
+        Index("idx_image_blob_hash_variant", "content_hash", "variant", unique=True),
+    )
@@ -0,0 +1,72 @@
+from sqlalchemy import ForeignKey, String, Integer, Enum, JSON, Index
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from app.db.base import Base
+from datetime import datetime
+from typing import Any, List, Optional
+
+class IngestionRun(Base):
+    '''
+    Ejecución de una ingesta masiva (ej: ciudades de todos los países).
+
+    Cada unidad terminada (un país) deja un IngestionCheckpoint confirmado en
+    la BD. Si la ejecución se interrumpe (fallo, cancelación, caída del
+    worker), la siguiente con los mismos parámetros (params_key) la retoma y
+    salta las unidades que ya tienen checkpoint "done".
+    '''
+    __tablename__ = "ingestion_runs"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    kind: Mapped[str] = mapped_column(String(50), nullable=False)
+    status: Mapped[str] = mapped_column(
+        Enum("running", "completed", "failed", "cancelled", name="ingestion_run_status_enum"),
+        nullable=False,
+        default="running",
+        server_default="running"
+    )
+    params: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    # Hash de los parámetros que determinan el resultado: solo se retoma una
+    # ejecución con los mismos (ver app/core/hashing.py)
+    params_key: Mapped[str] = mapped_column(String(64), nullable=False)
+
+    job_id: Mapped[Optional[str]] = mapped_column(String(36), nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    stats: Mapped[Optional[Any]] = mapped_column(JSON, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+
+    started_at: Mapped[datetime] = mapped_column(nullable=False, default=datetime.now)
+    updated_at: Mapped[datetime] = mapped_column(nullable=False, default=datetime.now, onupdate=datetime.now)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+
+    checkpoints: Mapped[List["IngestionCheckpoint"]] = relationship(
+        back_populates="run", cascade="all, delete-orphan", passive_deletes=True
+    )
+
+    __table_args__ = (
+        # Búsqueda de la última ejecución retomable de un tipo y parámetros
+        Index("idx_ingestion_run_resume", "kind", "params_key", "status"),
+    )
+
+class IngestionCheckpoint(Base):
+    '''
+    Unidad terminada de una IngestionRun (ej: key = código alpha-2 del país).
+    "done": sus datos ya están confirmados y no se vuelve a procesar al retomar.
+    "failed": se reintenta al retomar.
+    '''
+    __tablename__ = "ingestion_checkpoints"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    run_id: Mapped[int] = mapped_column(ForeignKey("ingestion_runs.id", ondelete="CASCADE"), nullable=False)
+    key: Mapped[str] = mapped_column(String(64), nullable=False)
+    status: Mapped[str] = mapped_column(
+        Enum("done", "failed", name="ingestion_checkpoint_status_enum"),
+        nullable=False
+    )
+    stats: Mapped[Optional[Any]] = mapped_column(JSON, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(nullable=False, default=datetime.now, onupdate=datetime.now)
+
+    run = relationship("IngestionRun", back_populates="checkpoints")
+
+    __table_args__ = (
+        Index("idx_ingestion_checkpoint_run_key", "run_id", "key", unique=True),
+    )
@@ -0,0 +1,42 @@
+from sqlalchemy import String, Integer, Enum, Text, JSON, Boolean
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+from datetime import datetime
+from typing import Any, Optional
+
+class Job(Base):
+    '''
+    Trabajo en segundo plano (ej: poblar ciudades de todos los países).
+    
+    Lo ejecuta JobRunner (app/service/jobs.py) fuera del event loop principal;
+    el estado y el progreso se persisten para poder consultarlos desde
+    cualquier worker con GET /v1/jobs/{id}.
+    '''
+    __tablename__ = "jobs"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True)  # UUID4
+    type: Mapped[str] = mapped_column(String(100), nullable=False)
+    status: Mapped[str] = mapped_column(
+        Enum("pending", "running", "succeeded", "failed", "cancelled", name="job_status_enum"),
+        nullable=False,
+        default="pending",
+        server_default="pending",
+        index=True
+    )
+    params: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+
+    # Progreso reportado por el propio trabajo (ej: países procesados / total)
+    progress_current: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    progress_total: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    message: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+
+    result: Mapped[Optional[Any]] = mapped_column(JSON, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    cancel_requested: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+
+    created_by: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(nullable=False, default=datetime.now)
+    started_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    # Último latido del worker que tiene el trabajo (ver JobRunner y recover_stale_jobs)
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(nullable=True, default=datetime.now)
@@ -1,6 +1,7 @@
-from sqlalchemy import ForeignKey, String, Date
+from sqlalchemy import ForeignKey, String, Date, Integer, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
+from datetime import datetime
 
 class Trip(Base):
     __tablename__ = "trips"
@@ -10,10 +11,36 @@ class Trip(Base):
     description: Mapped[str] = mapped_column(String(255), nullable=False)
     start_date: Mapped[str] = mapped_column(Date, nullable=False)
     end_date: Mapped[str] = mapped_column(Date, nullable=False)
+    # Fecha de publicación (timeline del usuario). server_default para las filas ya existentes
+    created_at: Mapped[datetime] = mapped_column(nullable=False, default=datetime.now, server_default=func.now())
 
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
     country_id: Mapped[int] = mapped_column(ForeignKey("country.id"), nullable=False)
 
+    # Contador desnormalizado (lo mantiene CommentService, ver CounterService.reconcile)
+    comment_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
     user = relationship("User", back_populates="trips")
     country = relationship("Country", back_populates="trips")
-    comments = relationship("Comment", back_populates="trip", cascade="all, delete-orphan")
\ No newline at end of file
+    comments = relationship("Comment", back_populates="trip", cascade="all, delete-orphan")
+
+    # Atributos NO mapeados: vista acotada de comments que rellena TripRepository.
+    # No se usa la relación para no dejar colecciones parciales en la sesión
+    # (el cascade delete-orphan solo borraría los comentarios cargados)
+    comments_preview = ()
+    comments_has_more = False
+
+    __table_args__ = (
+        # Timeline del usuario (GET /v1/users/{id}/timeline), más recientes primero
+        Index("idx_trip_user_created", "user_id", "created_at", "id"),
+        # Búsqueda (GET /v1/trip/search, ver app/repository/trip_search.py).
+        # Cada índice es un camino de acceso que el planificador puede elegir
+        Index("idx_trip_country_created", "country_id", "created_at", "id"),
+        Index("idx_trip_start_end", "start_date", "end_date"),
+        Index("idx_trip_end_start", "end_date", "start_date"),
+        Index("idx_trip_created", "created_at", "id"),
+        # Texto libre: FULLTEXT solo en MySQL (en otros motores se usa LIKE)
+        Index(
+            "ft_trip_name_description", "name", "description", mysql_prefix="FULLTEXT"
+        ).ddl_if(dialect="mysql"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import String, Enum
+from sqlalchemy import String, Enum, Integer
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
 
@@ -19,5 +19,15 @@ class User(Base):
         server_default="user"
     )
 
+    # Contadores desnormalizados (los mantienen TripService y CommentService)
+    trip_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    comment_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
     trips = relationship("Trip", back_populates="user", cascade="all, delete-orphan")
-    comments = relationship("Comment", back_populates="user", cascade="all, delete-orphan")
\ No newline at end of file
+    comments = relationship("Comment", back_populates="user", cascade="all, delete-orphan")
+
+    # Atributos NO mapeados: vistas acotadas que rellena UserRepository
+    trips_preview = ()
+    trips_has_more = False
+    comments_preview = ()
+    comments_has_more = False
\ No newline at end of file
@@ -0,0 +1,125 @@
+'''
+Réplicas de lectura de la base de datos (DATABASE_REPLICA_URLS).
+
+ReplicaSet mantiene un engine por réplica y su estado de salud:
+
+- choose() reparte las lecturas entre las réplicas sanas (round robin).
+  Si no queda ninguna, retorna None y la lectura va al primario.
+- Comprobación activa: un hilo en segundo plano ejecuta SELECT 1 en cada
+  réplica cada REPLICA_HEALTH_INTERVAL segundos. Se arranca en la primera
+  lectura (así cada worker de gunicorn tiene el suyo después del fork).
+- Detección pasiva: un error de desconexión en una réplica (evento
+  handle_error) la marca caída al instante, sin esperar a la siguiente
+  comprobación. Solo vuelve a usarse cuando una comprobación tiene éxito.
+
+El estado es por proceso y se expone en GET /api/health/db.
+'''
+
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+class Replica:
+    def __init__(self, name: str, engine: Engine):
+        self.name = name
+        self.engine = engine
+        self.healthy = True
+        self.last_error: Optional[str] = None
+        self.checked_at: Optional[float] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "last_error": self.last_error,
+            "checked_seconds_ago": round(time.time() - self.checked_at, 1) if self.checked_at else None
+        }
+
+class ReplicaSet:
+    def __init__(self, urls: List[str], engine_factory: Callable[[str], Engine], health_interval: float):
+        self.replicas = [
+            Replica(f"replica-{i}", engine_factory(url)) for i, url in enumerate(urls, start=1)
+        ]
+        self.health_interval = health_interval
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        for replica in self.replicas:
+            self._watch_disconnects(replica)
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def _watch_disconnects(self, replica: Replica) -> None:
+        @event.listens_for(replica.engine, "handle_error")
+        def _on_error(context):
+            if context.is_disconnect:
+                self.mark_down(replica, str(context.original_exception))
+
+    def choose(self) -> Optional[Engine]:
+        """Engine de una réplica sana o None (leer del primario)"""
+        self._ensure_checker()
+        healthy = [r for r in self.replicas if r.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)].engine
+
+    def is_replica(self, engine: Engine) -> bool:
+        return any(r.engine is engine for r in self.replicas)
+
+    def mark_down(self, replica_or_engine, error: str) -> None:
+        replica = replica_or_engine if isinstance(replica_or_engine, Replica) else next(
+            (r for r in self.replicas if r.engine is replica_or_engine), None
+        )
+        if replica is None:
+            return
+        with self._lock:
+            if replica.healthy:
+                logger.warning(f"Réplica {replica.name} marcada como caída: {error}")
+            replica.healthy = False
+            replica.last_error = error
+
+    def check(self) -> None:
+        """Comprueba todas las réplicas (SELECT 1) y actualiza su estado"""
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+            except Exception as e:
+                self.mark_down(replica, str(e))
+            else:
+                with self._lock:
+                    if not replica.healthy:
+                        logger.info(f"Réplica {replica.name} disponible de nuevo")
+                    replica.healthy = True
+                    replica.last_error = None
+            replica.checked_at = time.time()
+
+    def _ensure_checker(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="replica-health", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.health_interval):
+            self.check()
+
+    def snapshots(self) -> List[Dict[str, Any]]:
+        return [r.snapshot() for r in self.replicas]
+
+    def dispose(self) -> None:
+        self._stop.set()
+        for replica in self.replicas:
+            replica.engine.dispose()
@@ -2,17 +2,122 @@
 Configuración de la sesión de base de datos SQLAlchemy
 
 Crea el engine y el sessionmaker para interactuar con MySQL.
-- engine: Conexión a la base de datos con echo=True para debug
-- SessionLocal: Factoría para crear sesiones de BD
+- engine: Conexión al primario (DB_ECHO=True muestra las queries, útil para debug)
+- replicas: Réplicas de lectura opcionales (DATABASE_REPLICA_URLS, ver app/db/replicas.py)
+- SessionLocal: Factoría de RoutingSession (expire_on_commit=False: los objetos
+  siguen siendo legibles tras el commit sin volver a consultarlos, ver
+  @transactional en app/core/decorators.py)
+
+El pool es por proceso. Con varios workers (gunicorn.conf.py) cada uno tiene
+el suyo: el máximo de conexiones a MySQL es
+workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW), por servidor.
+
+Enrutado de lecturas (RoutingSession):
+- Por defecto todo va al primario.
+- Los métodos marcados con @read_only (app/core/decorators.py) leen de una
+  réplica sana mientras se ejecutan.
+- En cuanto la sesión escribe (flush) o entra en un método @transactional
+  queda fijada al primario hasta que se cierra: las lecturas posteriores de la
+  misma petición ven lo que se acaba de escribir.
 '''
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from contextlib import contextmanager
+from typing import Iterator
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import settings
+from app.db.replicas import ReplicaSet
 
 # Usar DATABASE_URL desde la configuración
 DATABASE_URL = settings.database_url
 
-# Echo=True muestra las queries SQL en consola (útil para debug)
-engine = create_engine(DATABASE_URL, echo=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+def _create_engine(url: str, **options) -> Engine:
+    # SQLite (tests/desarrollo) no admite los parámetros de QueuePool
+    if not url.startswith("sqlite"):
+        options = {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+            "pool_pre_ping": True,
+            **options,
+        }
+    return create_engine(url, echo=settings.DB_ECHO, **options)
+
+engine = _create_engine(DATABASE_URL)
+
+replicas = ReplicaSet(
+    settings.replica_urls,
+    lambda url: _create_engine(
+        url,
+        # Una réplica caída debe fallar rápido para pasar a otra (o al primario)
+        **({} if url.startswith("sqlite") else {"connect_args": {"connection_timeout": settings.REPLICA_CONNECT_TIMEOUT}})
+    ),
+    settings.REPLICA_HEALTH_INTERVAL
+)
+
+# Claves en Session.info
+_PINNED = "route_primary"
+_READ_ONLY = "route_replica"
+_REPLICA_ENGINE = "replica_engine"
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if clause is not None and getattr(clause, "is_dml", False):
+            # INSERT/UPDATE/DELETE sin flush (query.update, execute): siempre al primario
+            pin_primary(self)
+            return engine
+        if (
+            replicas
+            and self.info.get(_READ_ONLY)
+            and not self.info.get(_PINNED)
+            and not self._flushing
+        ):
+            # Misma réplica durante todo el bloque read_only (lecturas consistentes)
+            replica = self.info.get(_REPLICA_ENGINE)
+            if replica is None:
+                replica = replicas.choose()
+                self.info[_REPLICA_ENGINE] = replica
+            if replica is not None:
+                return replica
+        return engine
+
+@event.listens_for(RoutingSession, "after_flush")
+def _pin_after_write(session, flush_context):
+    pin_primary(session)
+
+def pin_primary(db: Session) -> None:
+    """Todas las lecturas siguientes de la sesión van al primario"""
+    db.info[_PINNED] = True
+
+def is_pinned(db: Session) -> bool:
+    return bool(db.info.get(_PINNED))
+
+@contextmanager
+def replica_reads(db: Session) -> Iterator[None]:
+    """Lecturas del bloque a una réplica (si hay alguna sana y la sesión no está fijada)"""
+    if db.info.get(_READ_ONLY):
+        yield
+        return
+    db.info[_READ_ONLY] = True
+    try:
+        yield
+    finally:
+        db.info.pop(_READ_ONLY, None)
+        db.info.pop(_REPLICA_ENGINE, None)
+
+def current_replica(db: Session):
+    """Engine de réplica usado en el bloque read_only actual (None = primario)"""
+    return db.info.get(_REPLICA_ENGINE)
+
+def forget_replica(db: Session) -> None:
+    """La siguiente lectura del bloque read_only vuelve a elegir réplica (tras un fallo)"""
+    db.info.pop(_REPLICA_ENGINE, None)
+
+def dispose_engines(close: bool = True) -> None:
+    """Vacía los pools del primario y de las réplicas (close=False tras un fork)"""
+    engine.dispose(close=close)
+    for replica in replicas.replicas:
+        replica.engine.dispose(close=close)
+
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
@@ -1,23 +1,33 @@
 '''
 Aurevia API - Aplicación Principal
 
-Configuración de la aplicación FastAPI:
-- Creación de tablas en base de datos
-- Seeding de datos iniciales (solo si la BD está vacía)
+Configuración de la aplicación FastAPI (factoría create_app):
+- Ciclo de vida (lifespan): creación opcional de tablas, calentamiento del
+  pool y recuperación de trabajos huérfanos al arrancar, liberación de
+  pools/executors al parar
 - Registro de routers de API
 - Configuración de exception handlers (orden importante)
-- Configuración de CORS
+- Configuración de CORS y límites de tamaño de subida
+
+El import de este módulo no abre conexiones a la BD ni carga las claves RSA:
+las tablas solo se crean con DB_CREATE_ALL=true y las claves se cargan al
+firmar/verificar el primer token.
 '''
 
+import logging
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.exc import IntegrityError, OperationalError, DataError
 
 from app.api.v1 import api_router
-from app.db.session import engine
-from app.db.base import Base
 from app.core.config import settings
-from fastapi.middleware.cors import CORSMiddleware
+from app.core.middleware import BodySizeLimitMiddleware, AdmissionControlMiddleware, AdmissionGroup, SlowRequestMiddleware
+from app.core.slow_requests import slow_requests, install_sql_hooks
 
 from app.core.exceptions import (
     AppError, 
@@ -31,62 +41,169 @@ from app.core.exceptions import (
     method_not_allowed_handler
 )
 
-app = FastAPI(
-    title="Aurevia API",
-    description="API para gestión de viajes y comentarios",
-    version="1.0.0"
-)
-
-# Crear tablas automáticamente
-Base.metadata.create_all(bind=engine)
-
-# ============================================================================
-# SEED DATABASE (Development/Testing)
-# Solo se ejecuta si la base de datos está vacía
-# ============================================================================
-# from app.db.seed import seed_db
-# from app.db.session import SessionLocal
-
-# try:
-#     db = SessionLocal()
-#     seed_db(db)
-# finally:
-#     db.close()  # Siempre cerrar la sesión
-
-# Incluir routers de API
-app.include_router(api_router, prefix="/api")
-
-# ============================================================================
-# MANEJADORES DE EXCEPCIONES
-# IMPORTANTE: El orden importa - los más específicos primero
-# ============================================================================
-
-# Errores personalizados de la aplicación
-app.add_exception_handler(AppError, app_error_handler)
-
-# Errores de validación de Pydantic
-app.add_exception_handler(RequestValidationError, validation_error_handler)
-
-# Errores de base de datos SQLAlchemy
-app.add_exception_handler(IntegrityError, integrity_error_handler)
-app.add_exception_handler(OperationalError, operational_error_handler)
-app.add_exception_handler(DataError, data_error_handler)
-
-# Errores HTTP de Starlette (404, 405, etc.)
-app.add_exception_handler(404, not_found_handler)
-app.add_exception_handler(405, method_not_allowed_handler)
-
-# Error genérico para cualquier otra excepción
-app.add_exception_handler(Exception, unhandled_error_handler)
-
-# ============================================================================
-# CORS - Configurado desde variables de entorno
-# ============================================================================
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.allowed_origins,  # Usar configuración desde .env
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"], 
-    allow_headers=["Content-Type", "Authorization"],
-)
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from app.db.session import engine, replicas
+
+    # Crear tablas solo si se pide explícitamente (DB_CREATE_ALL=true).
+    # Los modelos ya están registrados en Base.metadata al importar los routers.
+    if settings.DB_CREATE_ALL:
+        from app.db.base import Base
+        Base.metadata.create_all(bind=engine)
+        logger.info("Tablas verificadas/creadas (DB_CREATE_ALL)")
+
+    # ========================================================================
+    # SEED DATABASE (Development/Testing)
+    # Solo se ejecuta si la base de datos está vacía
+    # ========================================================================
+    # from app.db.seed import seed_db
+    # from app.db.session import SessionLocal
+
+    # try:
+    #     db = SessionLocal()
+    #     seed_db(db)
+    # finally:
+    #     db.close()  # Siempre cerrar la sesión
+
+    # Pool de conexiones y claves listos antes de aceptar tráfico (app/core/warmup.py)
+    from app.core.warmup import warm_up
+    await run_in_threadpool(warm_up)
+
+    # Trabajos que quedaron pending/running porque su worker murió (app/service/jobs.py)
+    from app.service.jobs import recover_stale_jobs
+    try:
+        await run_in_threadpool(recover_stale_jobs)
+    except Exception:
+        logger.exception("No se pudieron recuperar los trabajos sin latido")
+
+    yield
+
+    from app.service.jobs import job_runner
+    from app.service.image import image_service
+    job_runner.shutdown()
+    image_service.shutdown()
+    replicas.dispose()
+    engine.dispose()
+
+def admission_groups() -> list[AdmissionGroup]:
+    return [
+        # Operaciones caras de administración: presupuesto propio, no compiten con los usuarios.
+        # admin/profile queda fuera de todos los grupos: ocupa un hilo hasta
+        # PROFILE_MAX_SECONDS y ya se limita a uno por worker (409 PROFILE_IN_PROGRESS)
+        AdmissionGroup(
+            "admin",
+            r"^/api/v1/(admin/(?!profile\b)|jobs/[^/]+/cancel|country/populate|city/populate)",
+            settings.ADMISSION_ADMIN_LIMIT,
+            settings.ADMISSION_ADMIN_QUEUE,
+            settings.ADMISSION_ADMIN_MAX_WAIT,
+        ),
+        AdmissionGroup(
+            "write",
+            r"^/api/v1/",
+            settings.ADMISSION_WRITE_LIMIT,
+            settings.ADMISSION_WRITE_QUEUE,
+            settings.ADMISSION_WRITE_MAX_WAIT,
+            methods=frozenset({"POST", "PUT", "PATCH", "DELETE"}),
+        ),
+        AdmissionGroup(
+            "read",
+            r"^/api/v1/(?!jobs/|admin/profile\b)",
+            settings.ADMISSION_READ_LIMIT,
+            settings.ADMISSION_READ_QUEUE,
+            settings.ADMISSION_READ_MAX_WAIT,
+            methods=frozenset({"GET", "HEAD"}),
+        ),
+    ]
+
+def create_app() -> FastAPI:
+    app = FastAPI(
+        title="Aurevia API",
+        description="API para gestión de viajes y comentarios",
+        version="1.0.0",
+        lifespan=lifespan
+    )
+
+    # Incluir routers de API
+    app.include_router(api_router, prefix="/api")
+
+    # Imágenes guardadas en disco (solo con IMAGE_STORAGE_BACKEND=local)
+    if settings.IMAGE_STORAGE_BACKEND == "local":
+        from fastapi.staticfiles import StaticFiles
+        os.makedirs(settings.IMAGE_LOCAL_DIR, exist_ok=True)
+        app.mount(settings.IMAGE_LOCAL_BASE_URL, StaticFiles(directory=settings.IMAGE_LOCAL_DIR), name="media")
+
+    # ========================================================================
+    # MANEJADORES DE EXCEPCIONES
+    # IMPORTANTE: El orden importa - los más específicos primero
+    # ========================================================================
+
+    # Errores personalizados de la aplicación
+    app.add_exception_handler(AppError, app_error_handler)
+
+    # Errores de validación de Pydantic
+    app.add_exception_handler(RequestValidationError, validation_error_handler)
+
+    # Errores de base de datos SQLAlchemy
+    app.add_exception_handler(IntegrityError, integrity_error_handler)
+    app.add_exception_handler(OperationalError, operational_error_handler)
+    app.add_exception_handler(DataError, data_error_handler)
+
+    # Errores HTTP de Starlette (404, 405, etc.)
+    app.add_exception_handler(404, not_found_handler)
+    app.add_exception_handler(405, method_not_allowed_handler)
+
+    # Error genérico para cualquier otra excepción
+    app.add_exception_handler(Exception, unhandled_error_handler)
+
+    # ========================================================================
+    # CONTROL DE ADMISIÓN
+    # Rechaza con 503 antes de que la petición llegue al threadpool o a la BD.
+    # Se añade antes que CORS (CORS queda por fuera) para que los 503 lleven
+    # las cabeceras CORS. Health, docs y /v1/jobs (SSE) no se limitan.
+    # ========================================================================
+
+    if settings.ADMISSION_CONTROL_ENABLED:
+        app.add_middleware(
+            AdmissionControlMiddleware,
+            groups=admission_groups(),
+            retry_after=settings.ADMISSION_RETRY_AFTER,
+        )
+
+    # ========================================================================
+    # CORS - Configurado desde variables de entorno
+    # ========================================================================
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.allowed_origins,  # Usar configuración desde .env
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"], 
+        allow_headers=["Content-Type", "Authorization"],
+    )
+
+    # ========================================================================
+    # LÍMITE DE TAMAÑO DE SUBIDAS
+    # Se aplica mientras llega el cuerpo (multipart incluido). Margen de 64 KB
+    # para las cabeceras y delimitadores del multipart.
+    # ========================================================================
+
+    app.add_middleware(
+        BodySizeLimitMiddleware,
+        max_bytes=settings.IMAGE_MAX_BYTES + 64 * 1024,
+        paths=["/api/v1/auth/update-image"],
+    )
+
+    # ========================================================================
+    # PETICIONES LENTAS
+    # El más externo: mide también la espera en el control de admisión.
+    # ========================================================================
+
+    if settings.SLOW_REQUEST_ENABLED:
+        install_sql_hooks()
+        app.add_middleware(SlowRequestMiddleware, recorder=slow_requests)
+
+    return app
+
+app = create_app()
@@ -60,8 +60,10 @@ class CityRepository:
         return cities
 
     def update(self, city: City, city_data: dict) -> City:
+        # Solo se asignan los valores que cambian: así la fila no queda "dirty"
+        # y no se emite un UPDATE si no hay diferencias reales
         for key, value in city_data.items():
-            if value is not None:
+            if value is not None and getattr(city, key) != value:
                 setattr(city, key, value)
         return city
 
@@ -1,6 +1,9 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.db.models.comment import Comment
-from typing import List, Optional
+from app.repository.pagination import newest_first_page
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
 
 class CommentRepository:
     def __init__(self, db: Session):
@@ -12,17 +15,77 @@ class CommentRepository:
     def get_by_id(self, comment_id: int) -> Optional[Comment]:
         return self.db.query(Comment).filter(Comment.id == comment_id).first()
 
-    def get_by_trip_id(self, trip_id: int) -> List[Comment]:
-        return self.db.query(Comment).filter(Comment.trip_id == trip_id).all()
+    def get_by_ids(self, comment_ids: Iterable[int]) -> List[Comment]:
+        ids = list(comment_ids)
+        if not ids:
+            return []
+        return self.db.query(Comment).filter(Comment.id.in_(ids)).all()
 
-    def get_by_user_id(self, user_id: int) -> List[Comment]:
-        return self.db.query(Comment).filter(Comment.user_id == user_id).all()
+    def get_by_trip_id(
+        self, trip_id: int, after_id: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[Comment]:
+        return self._paginate(
+            self.db.query(Comment).filter(Comment.trip_id == trip_id), after_id, limit
+        )
+
+    def get_trip_feed(
+        self, trip_id: int, before: Optional[Tuple[datetime, int]], limit: int
+    ) -> Tuple[List[Comment], Optional[str]]:
+        """Comentarios de un viaje, más recientes primero (índice idx_comment_trip_created)"""
+        return newest_first_page(
+            self.db.query(Comment).filter(Comment.trip_id == trip_id),
+            Comment.created_at, Comment.id, before, limit
+        )
+
+    def get_by_user_id(
+        self, user_id: int, after_id: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[Comment]:
+        return self._paginate(
+            self.db.query(Comment).filter(Comment.user_id == user_id), after_id, limit
+        )
+
+    def _paginate(self, query, after_id: Optional[int], limit: Optional[int]) -> List[Comment]:
+        """Paginación keyset por id (after_id = último id de la página anterior)"""
+        if after_id is not None:
+            query = query.filter(Comment.id > after_id)
+        query = query.order_by(Comment.id)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    def count_by_user_for_trips(self, trip_ids: Iterable[int]) -> Dict[int, int]:
+        """Número de comentarios por autor (user_id) en los viajes indicados"""
+        ids = set(trip_ids)
+        if not ids:
+            return {}
+        rows = (
+            self.db.query(Comment.user_id, func.count(Comment.id))
+            .filter(Comment.trip_id.in_(ids))
+            .group_by(Comment.user_id)
+            .all()
+        )
+        return {user_id: total for user_id, total in rows}
+
+    def count_by_trip_for_user(self, user_id: int) -> Dict[int, int]:
+        """Número de comentarios de un usuario agrupados por viaje"""
+        rows = (
+            self.db.query(Comment.trip_id, func.count(Comment.id))
+            .filter(Comment.user_id == user_id)
+            .group_by(Comment.trip_id)
+            .all()
+        )
+        return {trip_id: total for trip_id, total in rows}
 
     def create(self, comment: Comment) -> Comment:
         # Nota: No hacemos commit aquí, lo maneja el servicio con el decorador @transactional
         self.db.add(comment)
         return comment
 
+    def bulk_create(self, comments: List[Comment]) -> List[Comment]:
+        """Inserción masiva de comentarios (el commit lo hace el servicio)"""
+        self.db.add_all(comments)
+        return comments
+
     def update(self, comment: Comment, comment_data: dict) -> Comment:
         for key, value in comment_data.items():
             if value is not None:
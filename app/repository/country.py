@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Session
 from app.db.models.country import Country
-from typing import List, Optional
+from typing import Iterable, List, Optional, Set
 
 class CountryRepository:
     def __init__(self, db: Session):
@@ -30,6 +30,14 @@ class CountryRepository:
             return None
         return self.db.query(Country).filter(Country.code_alpha3 == code.upper()).first()
 
+    def get_existing_ids(self, country_ids: Iterable[int]) -> Set[int]:
+        """Devuelve el subconjunto de IDs de país que existen (una única query IN)"""
+        ids = set(country_ids)
+        if not ids:
+            return set()
+        rows = self.db.query(Country.id).filter(Country.id.in_(ids)).all()
+        return {row.id for row in rows}
+
     def create(self, country: Country) -> Country:
         # Nota: No hacemos commit aquí, lo maneja el servicio con el decorador @transactional
         self.db.add(country)
@@ -41,8 +49,10 @@ class CountryRepository:
         return countries
 
     def update(self, country: Country, country_data: dict) -> Country:
+        # Solo se asignan los valores que cambian: así la fila no queda "dirty"
+        # y no se emite un UPDATE si no hay diferencias reales
         for key, value in country_data.items():
-            if value is not None:
+            if value is not None and getattr(country, key) != value:
                 setattr(country, key, value)
         return country
 
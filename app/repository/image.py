@@ -0,0 +1,19 @@
+from sqlalchemy.orm import Session
+from app.db.models.image import ImageBlob
+from typing import Optional
+
+class ImageBlobRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_by_hash(self, content_hash: str, variant: str) -> Optional[ImageBlob]:
+        return (
+            self.db.query(ImageBlob)
+            .filter(ImageBlob.content_hash == content_hash, ImageBlob.variant == variant)
+            .first()
+        )
+
+    def create(self, blob: ImageBlob) -> ImageBlob:
+        # Nota: No hacemos commit aquí, lo maneja el servicio con el decorador @transactional
+        self.db.add(blob)
+        return blob
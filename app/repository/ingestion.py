@@ -0,0 +1,115 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.db.models.ingestion import IngestionRun, IngestionCheckpoint
+from app.db.models.job import Job
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+# Estados desde los que se puede retomar una ejecución: "running" pertenece a
+# un trabajo vivo (o a uno caído, que recover_stale_jobs pasa a failed)
+RESUMABLE_STATUSES = ("failed", "cancelled")
+
+class IngestionRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_by_id(self, run_id: int) -> Optional[IngestionRun]:
+        return self.db.query(IngestionRun).filter(IngestionRun.id == run_id).first()
+
+    def get_resumable(self, kind: str, params_key: str, since: datetime) -> Optional[IngestionRun]:
+        """Última ejecución interrumpida con el mismo tipo y parámetros, activa después de `since`"""
+        return (
+            self.db.query(IngestionRun)
+            .filter(
+                IngestionRun.kind == kind,
+                IngestionRun.params_key == params_key,
+                IngestionRun.status.in_(RESUMABLE_STATUSES),
+                IngestionRun.updated_at >= since
+            )
+            .order_by(IngestionRun.id.desc())
+            .first()
+        )
+
+    def claim(self, run_id: int, job_id: Optional[str]) -> bool:
+        '''
+        Retoma la ejecución para `job_id` con un solo UPDATE condicionado al
+        estado: si dos trabajos la eligen a la vez, solo uno la reclama.
+        Retorna False si otro trabajo la reclamó antes.
+        '''
+        claimed = (
+            self.db.query(IngestionRun)
+            .filter(IngestionRun.id == run_id, IngestionRun.status.in_(RESUMABLE_STATUSES))
+            .update(
+                {
+                    IngestionRun.status: "running",
+                    IngestionRun.attempts: IngestionRun.attempts + 1,
+                    IngestionRun.job_id: job_id,
+                    IngestionRun.error: None,
+                    IngestionRun.finished_at: None,
+                    IngestionRun.updated_at: datetime.now()
+                },
+                synchronize_session=False
+            )
+        )
+        return claimed == 1
+
+    def fail_orphaned(self, error: str) -> int:
+        '''
+        Pasa a failed las ejecuciones "running" cuyo trabajo ya no está
+        pending/running (su worker se detuvo), para que se puedan retomar.
+        Retorna el número de ejecuciones afectadas.
+        '''
+        active_jobs = select(Job.id).where(Job.status.in_(("pending", "running")))
+        return (
+            self.db.query(IngestionRun)
+            .filter(
+                IngestionRun.status == "running",
+                IngestionRun.job_id.is_not(None),
+                IngestionRun.job_id.not_in(active_jobs)
+            )
+            .update(
+                {IngestionRun.status: "failed", IngestionRun.error: error, IngestionRun.finished_at: datetime.now()},
+                synchronize_session=False
+            )
+        )
+
+    def create(self, run: IngestionRun) -> IngestionRun:
+        # Nota: No hacemos commit aquí, lo maneja el servicio con el decorador @transactional
+        self.db.add(run)
+        self.db.flush()  # Asigna run.id
+        return run
+
+    def get_checkpoints(self, run_id: int) -> Dict[str, IngestionCheckpoint]:
+        checkpoints = self.db.query(IngestionCheckpoint).filter(IngestionCheckpoint.run_id == run_id).all()
+        return {c.key: c for c in checkpoints}
+
+    def save_checkpoint(
+        self, run_id: int, key: str, status: str, stats: Any = None, error: Optional[str] = None
+    ) -> IngestionCheckpoint:
+        checkpoint = (
+            self.db.query(IngestionCheckpoint)
+            .filter(IngestionCheckpoint.run_id == run_id, IngestionCheckpoint.key == key)
+            .first()
+        )
+        if checkpoint is None:
+            checkpoint = IngestionCheckpoint(run_id=run_id, key=key)
+            self.db.add(checkpoint)
+        checkpoint.status = status
+        checkpoint.stats = stats
+        checkpoint.error = error[:255] if error else None
+        return checkpoint
+
+    def touch(self, run_id: int) -> None:
+        """Marca actividad en la ejecución (la antigüedad para retomarla cuenta desde aquí)"""
+        self.db.query(IngestionRun).filter(IngestionRun.id == run_id).update(
+            {IngestionRun.updated_at: datetime.now()}, synchronize_session=False
+        )
+
+    def mark_finished(
+        self, run: IngestionRun, status: str, stats: Any = None, error: Optional[str] = None
+    ) -> IngestionRun:
+        run.status = status
+        run.stats = stats
+        run.error = error[:255] if error else None
+        run.finished_at = datetime.now()
+        return run
@@ -0,0 +1,98 @@
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from app.db.models.job import Job
+from datetime import datetime
+from typing import Any, Iterable, List, Optional
+
+class JobRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_all(self, skip: int = 0, limit: int = 50) -> List[Job]:
+        return (
+            self.db.query(Job)
+            .order_by(Job.created_at.desc())
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    def get_by_id(self, job_id: str) -> Optional[Job]:
+        return self.db.query(Job).filter(Job.id == job_id).first()
+
+    def create(self, job: Job) -> Job:
+        # Nota: No hacemos commit aquí, lo maneja el servicio con el decorador @transactional
+        self.db.add(job)
+        return job
+
+    def mark_running(self, job_id: str) -> bool:
+        """Pasa el trabajo de pending a running. Retorna False si ya no estaba pendiente (ej: cancelado)"""
+        updated = (
+            self.db.query(Job)
+            .filter(Job.id == job_id, Job.status == "pending")
+            .update(
+                {Job.status: "running", Job.started_at: datetime.now(), Job.heartbeat_at: datetime.now()},
+                synchronize_session=False
+            )
+        )
+        return updated > 0
+
+    def update_progress(
+        self, job_id: str, current: int, total: Optional[int], message: Optional[str]
+    ) -> None:
+        values = {Job.progress_current: current}
+        if total is not None:
+            values[Job.progress_total] = total
+        if message is not None:
+            values[Job.message] = message[:255]
+        self.db.query(Job).filter(Job.id == job_id).update(values, synchronize_session=False)
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        row = self.db.query(Job.cancel_requested).filter(Job.id == job_id).first()
+        return bool(row and row.cancel_requested)
+
+    def mark_finished(
+        self, job_id: str, status: str, result: Any = None, error: Optional[str] = None
+    ) -> None:
+        self.db.query(Job).filter(Job.id == job_id).update(
+            {
+                Job.status: status,
+                Job.result: result,
+                Job.error: error,
+                Job.finished_at: datetime.now()
+            },
+            synchronize_session=False
+        )
+
+    def touch(self, job_ids: Iterable[str]) -> None:
+        """Latido: los trabajos siguen en cola o en curso en este worker"""
+        ids = list(job_ids)
+        if ids:
+            self.db.query(Job).filter(Job.id.in_(ids)).update(
+                {Job.heartbeat_at: datetime.now()}, synchronize_session=False
+            )
+
+    def fail_stale(self, since: datetime, error: str) -> int:
+        """
+        Pasa a failed los trabajos pending/running sin latido desde `since`.
+        Retorna el número de trabajos afectados.
+        """
+        return (
+            self.db.query(Job)
+            .filter(
+                Job.status.in_(("pending", "running")),
+                or_(Job.heartbeat_at.is_(None), Job.heartbeat_at < since)
+            )
+            .update(
+                {Job.status: "failed", Job.error: error, Job.finished_at: datetime.now()},
+                synchronize_session=False
+            )
+        )
+
+    def request_cancel(self, job: Job) -> Job:
+        job.cancel_requested = True
+        if job.status == "pending":
+            # Aún no ha empezado: se cancela directamente
+            job.status = "cancelled"
+            job.finished_at = datetime.now()
+        return job
@@ -0,0 +1,141 @@
+'''
+Utilidades de paginación compartidas por los repositorios.
+
+- first_n_per_parent: primeras N filas hijas por cada padre (ROW_NUMBER() OVER PARTITION BY)
+- attach_preview: asigna la vista acotada a atributos NO mapeados del padre
+- newest_first_page: página keyset "más recientes primero" por (fecha, id)
+- encode_cursor / decode_cursor / decode_kind_cursor: cursor opaco de esa paginación
+'''
+
+import base64
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+def first_n_per_parent(
+    db: Session,
+    model: Any,
+    parent_column: Any,
+    parent_ids: Iterable[int],
+    n: int,
+    *options: Any
+) -> Dict[int, List[Any]]:
+    """
+    Obtiene las primeras `n` filas de `model` (ordenadas por id) para cada padre.
+    
+    Con un solo padre basta un LIMIT; con varios se usa una función de ventana
+    para no cargar colecciones completas (ni hacer una query por padre).
+    """
+    ids = list(set(parent_ids))
+    if not ids or n <= 0:
+        return {}
+
+    if len(ids) == 1:
+        rows = (
+            db.query(model)
+            .options(*options)
+            .filter(parent_column == ids[0])
+            .order_by(model.id)
+            .limit(n)
+            .all()
+        )
+    else:
+        row_number = func.row_number().over(partition_by=parent_column, order_by=model.id).label("rn")
+        ranked = select(model.id.label("id"), row_number).where(parent_column.in_(ids)).subquery()
+        rows = (
+            db.query(model)
+            .options(*options)
+            .join(ranked, model.id == ranked.c.id)
+            .filter(ranked.c.rn <= n)
+            .order_by(parent_column, model.id)
+            .all()
+        )
+
+    grouped: Dict[int, List[Any]] = defaultdict(list)
+    for row in rows:
+        grouped[getattr(row, parent_column.key)].append(row)
+    return grouped
+
+def attach_preview(parents: Iterable[Any], name: str, children: Dict[int, List[Any]], limit: int) -> None:
+    """
+    Asigna `<name>_preview` y `<name>_has_more` a cada padre.
+    `children` debe contener hasta limit + 1 filas por padre (la extra indica que hay más).
+    """
+    for parent in parents:
+        rows = children.get(parent.id, [])
+        setattr(parent, f"{name}_preview", rows[:limit])
+        setattr(parent, f"{name}_has_more", len(rows) > limit)
+
+# ============================================================================
+# KEYSET "MÁS RECIENTES PRIMERO"
+# ============================================================================
+
+def encode_cursor(created_at: datetime, row_id: int, kind: Optional[str] = None) -> str:
+    """
+    Cursor opaco (base64 url-safe) con la posición de la última fila de una página.
+    `kind` distingue filas de varias tablas en un mismo listado (ids repetidos).
+    """
+    parts = [created_at.isoformat(), str(row_id)] if kind is None else [created_at.isoformat(), kind, str(row_id)]
+    raw = "|".join(parts).encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def _cursor_parts(cursor: str, count: int) -> List[str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
+    parts = raw.split("|")
+    if len(parts) != count:
+        raise ValueError(f"Cursor inválido: {cursor}")
+    return parts
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inversa de encode_cursor (sin kind). Lanza ValueError si el cursor no es válido"""
+    created_at, row_id = _cursor_parts(cursor, 2)
+    return datetime.fromisoformat(created_at), int(row_id)
+
+def decode_kind_cursor(cursor: str) -> Tuple[datetime, str, int]:
+    """Inversa de encode_cursor con kind. Lanza ValueError si el cursor no es válido"""
+    created_at, kind, row_id = _cursor_parts(cursor, 3)
+    return datetime.fromisoformat(created_at), kind, int(row_id)
+
+def newest_first_page(
+    query: Any,
+    created_column: Any,
+    id_column: Any,
+    before: Optional[Tuple[datetime, int]],
+    limit: int,
+    position_column: Optional[Any] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Página de `query` ordenada por (created_column, id_column) descendente,
+    empezando justo después de `before` (la última fila de la página anterior).
+    
+    El id desempata filas con la misma fecha (DATETIME de MySQL guarda
+    segundos). La condición se escribe como
+        created <= :c AND (created < :c OR id < :id)
+    y no como (created, id) < (:c, :id): así el optimizador la usa como rango
+    sobre un índice (..., created, id) en cualquier motor.
+    
+    `position_column` sustituye a created_column en esa condición y en el
+    ORDER BY: una expresión con el mismo valor que no deba hacer que el
+    optimizador elija un índice por fecha (ver app/repository/trip_search.py).
+    
+    Lee limit + 1 filas para saber si hay más sin un COUNT. Retorna
+    (filas, cursor de la siguiente página o None).
+    """
+    position = created_column if position_column is None else position_column
+    if before is not None:
+        created_at, row_id = before
+        query = query.filter(
+            position <= created_at,
+            or_(position < created_at, id_column < row_id)
+        )
+    rows = query.order_by(position.desc(), id_column.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, created_column.key), getattr(last, id_column.key))
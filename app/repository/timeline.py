@@ -0,0 +1,82 @@
+'''
+Timeline de actividad de un usuario: sus viajes y comentarios por fecha.
+
+Una sola query UNION ALL con una proyección mínima (tipo, id, fecha, texto,
+viaje), sin cargar objetos ORM ni relaciones. Cada rama lee como mucho
+limit + 1 filas de su índice (user_id, created_at, id) y la query externa
+las mezcla por fecha.
+'''
+
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from sqlalchemy import String, literal, or_, select, union_all
+from sqlalchemy.orm import Session
+from app.db.models.comment import Comment
+from app.db.models.trip import Trip
+from app.repository.pagination import encode_cursor
+
+# Tipos de elemento. Orden total del timeline: created_at, tipo e id
+# descendentes (a igual fecha, "trip" va antes que "comment")
+TIMELINE_KINDS = ("trip", "comment")
+
+class TimelineRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_user_timeline(
+        self, user_id: int, before: Optional[Tuple[datetime, str, int]], limit: int
+    ) -> Tuple[List[Any], Optional[str]]:
+        '''
+        Página del timeline empezando justo después de `before` (fecha, tipo e
+        id del último elemento de la página anterior).
+        Retorna (filas con kind/id/created_at/text/trip_id, cursor siguiente o None).
+        '''
+        trips = self._branch("trip", Trip, Trip.name, Trip.id, user_id, before, limit + 1)
+        comments = self._branch("comment", Comment, Comment.content, Comment.trip_id, user_id, before, limit + 1)
+        merged = union_all(select(trips), select(comments)).subquery()
+        rows = self.db.execute(
+            select(merged)
+            .order_by(merged.c.created_at.desc(), merged.c.kind.desc(), merged.c.id.desc())
+            .limit(limit + 1)
+        ).all()
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, encode_cursor(last.created_at, last.id, last.kind)
+
+    def _branch(
+        self,
+        kind: str,
+        model: Any,
+        text_column: Any,
+        trip_id_column: Any,
+        user_id: int,
+        before: Optional[Tuple[datetime, str, int]],
+        limit: int
+    ):
+        query = select(
+            literal(kind, String(10)).label("kind"),
+            model.id.label("id"),
+            model.created_at.label("created_at"),
+            text_column.label("text"),
+            trip_id_column.label("trip_id")
+        ).where(model.user_id == user_id)
+
+        if before is not None:
+            created_at, cursor_kind, row_id = before
+            # En cada rama el tipo es fijo: la condición de keyset sobre
+            # (fecha, tipo, id) se reduce a un rango sobre (fecha, id)
+            if kind > cursor_kind:
+                query = query.where(model.created_at < created_at)
+            elif kind == cursor_kind:
+                query = query.where(
+                    model.created_at <= created_at,
+                    or_(model.created_at < created_at, model.id < row_id)
+                )
+            else:
+                query = query.where(model.created_at <= created_at)
+
+        # ORDER BY + LIMIT por rama (en una subconsulta: no todos los motores
+        # lo admiten directamente en un miembro de UNION)
+        return query.order_by(model.created_at.desc(), model.id.desc()).limit(limit).subquery()
@@ -1,14 +1,21 @@
+from sqlalchemy import select, func
 from sqlalchemy.orm import Session, joinedload
 from app.db.models.trip import Trip
+from app.db.models.comment import Comment
 from app.schemas.trip import TripCreate, TripUpdate
-from typing import List, Optional
+from app.repository.pagination import first_n_per_parent, attach_preview
+from datetime import date
+from typing import Iterable, List, Optional, Set, Tuple
 
 class TripRepository:
     '''
     Repositorio de Trips - Capa de acceso a datos.
     
-    Todas las consultas usan joinedload para cargar country y comments
-    de forma eficiente (eager loading) y evitar el problema N+1.
+    Todas las consultas usan joinedload para cargar country de forma
+    eficiente (eager loading) y evitar el problema N+1.
+    
+    Los comentarios NO se cargan completos: attach_comment_previews añade
+    solo los primeros N por viaje (ver app/repository/pagination.py).
     '''
     def __init__(self, db: Session):
         self.db = db
@@ -16,7 +23,7 @@ class TripRepository:
     def get_all(self, skip: int = 0, limit: int = 100) -> List[Trip]:
         return (
             self.db.query(Trip)
-            .options(joinedload(Trip.country), joinedload(Trip.comments))
+            .options(joinedload(Trip.country))
             .offset(skip)
             .limit(limit)
             .all()
@@ -25,7 +32,7 @@ class TripRepository:
     def get_by_id(self, trip_id: int) -> Optional[Trip]:
         return (
             self.db.query(Trip)
-            .options(joinedload(Trip.country), joinedload(Trip.comments))
+            .options(joinedload(Trip.country))
             .filter(Trip.id == trip_id)
             .first()
         )
@@ -33,11 +40,87 @@ class TripRepository:
     def get_by_name(self, name: str) -> Optional[Trip]:
         return (
             self.db.query(Trip)
-            .options(joinedload(Trip.country), joinedload(Trip.comments))
+            .options(joinedload(Trip.country))
             .filter(Trip.name == name)
             .first()
         )
 
+    def get_all_summaries(self, skip: int = 0, limit: int = 100) -> List[Trip]:
+        """Listado ligero: solo carga country (los comentarios se sustituyen por comment_count)"""
+        return (
+            self.db.query(Trip)
+            .options(joinedload(Trip.country))
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    def get_by_user_id(
+        self, user_id: int, after_id: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[Trip]:
+        """Viajes de un usuario ordenados por id, con paginación keyset opcional (after_id)"""
+        query = (
+            self.db.query(Trip)
+            .options(joinedload(Trip.country))
+            .filter(Trip.user_id == user_id)
+        )
+        if after_id is not None:
+            query = query.filter(Trip.id > after_id)
+        query = query.order_by(Trip.id)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    def attach_comment_previews(self, trips: List[Trip], limit: int) -> List[Trip]:
+        """
+        Rellena trip.comments_preview con los primeros `limit` comentarios de cada viaje
+        y trip.comments_has_more si hay más (una sola query para todos los viajes).
+        """
+        comments = first_n_per_parent(self.db, Comment, Comment.trip_id, (t.id for t in trips), limit + 1)
+        attach_preview(trips, "comments", comments, limit)
+        return trips
+
+    def get_ids_by_user(self, user_id: int) -> List[int]:
+        rows = self.db.query(Trip.id).filter(Trip.user_id == user_id).all()
+        return [row.id for row in rows]
+
+    def get_by_ids(self, trip_ids: Iterable[int]) -> List[Trip]:
+        ids = list(trip_ids)
+        if not ids:
+            return []
+        return (
+            self.db.query(Trip)
+            .options(joinedload(Trip.country))
+            .filter(Trip.id.in_(ids))
+            .all()
+        )
+
+    def get_existing_ids(self, trip_ids: Iterable[int]) -> Set[int]:
+        """Devuelve el subconjunto de IDs de viaje que existen (una única query IN)"""
+        ids = set(trip_ids)
+        if not ids:
+            return set()
+        rows = self.db.query(Trip.id).filter(Trip.id.in_(ids)).all()
+        return {row.id for row in rows}
+
+    def get_existing_start_dates(
+        self, user_ids: Iterable[int], start_dates: Iterable[date]
+    ) -> Set[Tuple[int, date]]:
+        """
+        Devuelve los pares (user_id, start_date) ya ocupados por viajes existentes.
+        Sustituye a N llamadas a get_by_start_date_and_user en operaciones batch.
+        """
+        users = set(user_ids)
+        dates = set(start_dates)
+        if not users or not dates:
+            return set()
+        rows = (
+            self.db.query(Trip.user_id, Trip.start_date)
+            .filter(Trip.user_id.in_(users), Trip.start_date.in_(dates))
+            .all()
+        )
+        return {(row.user_id, row.start_date) for row in rows}
+
     def get_by_start_date_and_user(self, start_date: str, user_id: int) -> Optional[Trip]:
         return (
             self.db.query(Trip)
@@ -51,11 +134,35 @@ class TripRepository:
         self.db.add(trip)
         return trip
 
+    def bulk_create(self, trips: List[Trip]) -> List[Trip]:
+        """Inserción masiva de viajes (el commit lo hace el servicio)"""
+        self.db.add_all(trips)
+        return trips
+
     def update(self, trip: Trip, trip_data: dict) -> Trip:
         for key, value in trip_data.items():
             if value is not None:
                 setattr(trip, key, value)
         return trip
 
+    def adjust_comment_count(self, trip_id: int, delta: int) -> None:
+        """Ajusta comment_count con un UPDATE atómico (col = col + delta)"""
+        if delta:
+            self.db.query(Trip).filter(Trip.id == trip_id).update(
+                {Trip.comment_count: Trip.comment_count + delta}
+            )
+
+    def reconcile_comment_counts(self) -> int:
+        """
+        Recalcula comment_count desde la tabla comment.
+        Solo actualiza los viajes con desviación. Retorna el número de viajes corregidos.
+        """
+        comments = select(func.count(Comment.id)).where(Comment.trip_id == Trip.id).scalar_subquery()
+        return (
+            self.db.query(Trip)
+            .filter(Trip.comment_count != comments)
+            .update({Trip.comment_count: comments}, synchronize_session=False)
+        )
+
     def delete(self, trip: Trip) -> None:
         self.db.delete(trip)
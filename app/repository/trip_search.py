@@ -0,0 +1,242 @@
+'''
+Búsqueda de viajes: filtros por país, rango de fechas y texto, con
+paginación keyset por (created_at, id) descendente.
+
+Cada filtro presente es un camino de acceso con su índice:
+    country      country_id = :id          idx_trip_country_created
+    start_date   start_date <= :end        idx_trip_start_end
+    end_date     end_date >= :start        idx_trip_end_start
+    text         MATCH(name, description)  ft_trip_name_description (solo MySQL)
+    recent       ninguno (recorre por fecha) idx_trip_created
+
+Un viaje solapa el rango [start, end] si start_date <= end y end_date >= start.
+Cada mitad es un rango sobre su propio índice. En un rango de fechas reciente,
+end_date >= start suele ser el selectivo; en uno antiguo, start_date <= end.
+
+Planificador: con más de un candidato se cuenta en una sola query cuántas
+filas devuelve cada uno por su índice, con tope TRIP_SEARCH_PROBE_LIMIT (COUNT
+sobre una subconsulta con LIMIT, así el coste de cada sonda está acotado). Se
+elige el que devuelve menos filas. Si todos llegan al tope, ninguno es
+selectivo: se usa uno que ya entrega las filas en el orden de la página
+(country, o si no recent) y la página termina tras limit + 1 filas, sin
+ordenar. La elección se recuerda TRIP_SEARCH_PLAN_TTL segundos por combinación
+de filtros (las páginas siguientes no vuelven a sondear).
+
+El camino elegido se aplica así en la query de la página:
+- MySQL: USE INDEX (índice).
+- SQLite (no admite hints de SQLAlchemy): el resto de condiciones se
+  escriben con el + unario (+col), que no cambia el valor pero impide que
+  SQLite use un índice para ese término.
+- Otros motores (PostgreSQL): sin hints. Su optimizador decide con sus
+  propias estadísticas sobre los mismos índices.
+'''
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+from app.core.config import settings
+from app.db.models.trip import Trip
+from app.repository.pagination import newest_first_page
+
+# Índice de cada camino de acceso
+PLAN_INDEXES = {
+    "country": "idx_trip_country_created",
+    "start_date": "idx_trip_start_end",
+    "end_date": "idx_trip_end_start",
+    "text": "ft_trip_name_description",
+    "recent": "idx_trip_created",
+}
+
+# Palabras de la búsqueda de texto que se usan como máximo
+MAX_SEARCH_TERMS = 8
+# innodb_ft_min_token_size: las palabras más cortas no están en el índice
+# FULLTEXT y se buscan con LIKE
+FULLTEXT_MIN_TERM = 3
+
+def search_terms(text: Optional[str]) -> Tuple[str, ...]:
+    """Palabras de una búsqueda de texto (sin operadores ni signos), sin repetir"""
+    words = re.findall(r"\w+", (text or "").lower())
+    return tuple(dict.fromkeys(words))[:MAX_SEARCH_TERMS]
+
+@dataclass(frozen=True)
+class TripSearchFilters:
+    country_id: Optional[int] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    terms: Tuple[str, ...] = ()
+
+class _PlanCache:
+    """Caché LRU con TTL de planes (filtros -> camino de acceso). Thread-safe"""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._plans: "OrderedDict[Hashable, Tuple[float, str]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            cached = self._plans.get(key)
+            if cached is None:
+                return None
+            if time.monotonic() >= cached[0]:
+                del self._plans[key]
+                return None
+            self._plans.move_to_end(key)
+            return cached[1]
+
+    def put(self, key: Hashable, plan: str) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._plans[key] = (time.monotonic() + self.ttl, plan)
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._plans.clear()
+
+plan_cache = _PlanCache(ttl=settings.TRIP_SEARCH_PLAN_TTL, max_entries=settings.TRIP_SEARCH_PLAN_CACHE_SIZE)
+
+def _no_index(column: Any) -> Any:
+    """+col: mismo valor, pero SQLite ya no puede usar un índice para ese término"""
+    return UnaryExpression(column, operator=operators.custom_op("+"), type_=column.type)
+
+class TripSearchRepository:
+    def __init__(self, db: Session):
+        self.db = db
+        self.dialect = db.get_bind().dialect.name
+
+    def search(
+        self, filters: TripSearchFilters, before: Optional[Tuple[datetime, int]], limit: int
+    ) -> Tuple[List[Trip], Optional[str], str]:
+        '''
+        Página de viajes que cumplen `filters`, más recientes primero, empezando
+        justo después de `before`.
+        Retorna (viajes con country cargado, cursor siguiente o None, camino usado).
+        '''
+        plan = self.plan(filters)
+        query = (
+            self.db.query(Trip)
+            .options(joinedload(Trip.country))
+            .filter(*self._conditions(filters, plan))
+        )
+        query = self._force_index(query, plan)
+        # En SQLite ni el orden ni la condición del cursor deben llevar a
+        # idx_trip_created, salvo en los caminos que ya recorren por fecha
+        position = None
+        if self.dialect == "sqlite" and plan not in ("country", "recent"):
+            position = _no_index(Trip.created_at)
+        rows, next_before = newest_first_page(query, Trip.created_at, Trip.id, before, limit, position_column=position)
+        return rows, next_before, plan
+
+    def plan(self, filters: TripSearchFilters) -> str:
+        """Camino de acceso para `filters` (ver el docstring del módulo)"""
+        candidates = self._candidates(filters)
+        if not candidates:
+            return "recent"
+        if candidates == ["country"]:
+            # Es selectivo y ya da el orden de la página: no hace falta sondear
+            return "country"
+
+        cached = plan_cache.get(filters)
+        if cached is not None:
+            return cached
+
+        counts = self.estimate(filters, candidates)
+        best = min(candidates, key=lambda path: counts[path])
+        if counts[best] >= settings.TRIP_SEARCH_PROBE_LIMIT:
+            best = "country" if "country" in candidates else "recent"
+        plan_cache.put(filters, best)
+        return best
+
+    def estimate(self, filters: TripSearchFilters, candidates: List[str]) -> Dict[str, int]:
+        """Filas de cada camino (hasta TRIP_SEARCH_PROBE_LIMIT), en una sola query"""
+        cap = settings.TRIP_SEARCH_PROBE_LIMIT
+        probes = []
+        for path in candidates:
+            rows = select(Trip.id).where(self._access_condition(filters, path)).limit(cap)
+            rows = self._force_index(rows, path).subquery()
+            probes.append(select(func.count()).select_from(rows).scalar_subquery().label(path))
+        counts = self.db.execute(select(*probes)).one()
+        return dict(zip(candidates, counts))
+
+    def _candidates(self, filters: TripSearchFilters) -> List[str]:
+        paths = []
+        if filters.country_id is not None:
+            paths.append("country")
+        if filters.end_date is not None:
+            paths.append("start_date")
+        if filters.start_date is not None:
+            paths.append("end_date")
+        if self.dialect == "mysql" and self._fulltext_terms(filters.terms):
+            paths.append("text")
+        return paths
+
+    def _access_condition(self, filters: TripSearchFilters, path: str) -> Any:
+        """Condición que recorre el índice del camino `path`"""
+        if path == "country":
+            return Trip.country_id == filters.country_id
+        if path == "start_date":
+            return Trip.start_date <= filters.end_date
+        if path == "end_date":
+            return Trip.end_date >= filters.start_date
+        return self._fulltext_match(self._fulltext_terms(filters.terms))
+
+    def _conditions(self, filters: TripSearchFilters, plan: str) -> List[Any]:
+        """Todas las condiciones; en SQLite solo la del camino elegido puede usar índice"""
+        def column(path: str, col: Any) -> Any:
+            return _no_index(col) if self.dialect == "sqlite" and path != plan else col
+
+        conditions = []
+        if filters.country_id is not None:
+            conditions.append(column("country", Trip.country_id) == filters.country_id)
+        if filters.end_date is not None:
+            conditions.append(column("start_date", Trip.start_date) <= filters.end_date)
+        if filters.start_date is not None:
+            conditions.append(column("end_date", Trip.end_date) >= filters.start_date)
+        if filters.terms:
+            conditions.append(self._text_condition(filters.terms))
+        return conditions
+
+    def _text_condition(self, terms: Tuple[str, ...]) -> Any:
+        '''
+        Todas las palabras deben aparecer en name o description.
+        MySQL: MATCH ... AGAINST en modo booleano (+palabra* = obligatoria, por
+        prefijo) sobre el índice FULLTEXT; las palabras cortas, con LIKE.
+        Otros motores: LIKE por palabra (sin índice: filtra las filas que
+        entrega el camino elegido).
+        '''
+        fulltext = self._fulltext_terms(terms)
+        like_terms = [term for term in terms if term not in fulltext]
+        conditions = [
+            or_(Trip.name.icontains(term, autoescape=True), Trip.description.icontains(term, autoescape=True))
+            for term in like_terms
+        ]
+        if fulltext:
+            conditions.append(self._fulltext_match(fulltext))
+        return and_(*conditions)
+
+    def _fulltext_terms(self, terms: Tuple[str, ...]) -> Tuple[str, ...]:
+        if self.dialect != "mysql":
+            return ()
+        return tuple(term for term in terms if len(term) >= FULLTEXT_MIN_TERM)
+
+    def _fulltext_match(self, terms: Tuple[str, ...]) -> Any:
+        against = " ".join(f"+{term}*" for term in terms)
+        return match(Trip.name, Trip.description, against=against).in_boolean_mode()
+
+    def _force_index(self, query: Any, plan: str) -> Any:
+        """USE INDEX del camino elegido (solo MySQL; el resto de motores ignora el hint)"""
+        return query.with_hint(Trip, f"USE INDEX ({PLAN_INDEXES[plan]})", "mysql")
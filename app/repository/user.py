@@ -1,13 +1,18 @@
+from sqlalchemy import select, func
 from sqlalchemy.orm import Session, joinedload
 from app.db.models.user import User
-from typing import List, Optional
+from app.db.models.trip import Trip
+from app.db.models.comment import Comment
+from app.repository.pagination import first_n_per_parent, attach_preview
+from typing import Iterable, List, Optional, Set
 
 class UserRepository:
     '''
     Repositorio de usuarios - Capa de acceso a datos.
     
-    Todas las consultas usan joinedload para cargar trips y comments
-    de forma eficiente (eager loading) y evitar el problema N+1.
+    Las consultas NO cargan las colecciones trips y comments completas:
+    attach_previews añade solo los primeros N elementos de cada una
+    (función de ventana, una query por colección para todos los usuarios).
     '''
     def __init__(self, db: Session):
         self.db = db
@@ -15,7 +20,6 @@ class UserRepository:
     def get_all(self, skip: int = 0, limit: int = 100) -> List[User]:
         return (
             self.db.query(User)
-            .options(joinedload(User.trips), joinedload(User.comments))
             .offset(skip)
             .limit(limit)
             .all()
@@ -24,7 +28,6 @@ class UserRepository:
     def get_by_email(self, email: str) -> Optional[User]:
         return (
             self.db.query(User)
-            .options(joinedload(User.trips), joinedload(User.comments))
             .filter(User.email == email)
             .first()
         )
@@ -32,7 +35,6 @@ class UserRepository:
     def get_by_username(self, username: str) -> Optional[User]:
         return (
             self.db.query(User)
-            .options(joinedload(User.trips), joinedload(User.comments))
             .filter(User.username == username)
             .first()
         )
@@ -40,7 +42,6 @@ class UserRepository:
     def get_by_id(self, user_id: int) -> Optional[User]:
         return (
             self.db.query(User)
-            .options(joinedload(User.trips), joinedload(User.comments))
             .filter(User.id == user_id)
             .first()
         )
@@ -56,6 +57,31 @@ class UserRepository:
             .first()
         )
 
+    def attach_previews(self, users: List[User], limit: int) -> List[User]:
+        """
+        Rellena trips_preview/comments_preview (y sus flags *_has_more)
+        con los primeros `limit` elementos de cada colección.
+        """
+        user_ids = [u.id for u in users]
+        trips = first_n_per_parent(
+            self.db, Trip, Trip.user_id, user_ids, limit + 1, joinedload(Trip.country)
+        )
+        comments = first_n_per_parent(self.db, Comment, Comment.user_id, user_ids, limit + 1)
+        attach_preview(users, "trips", trips, limit)
+        attach_preview(users, "comments", comments, limit)
+        return users
+
+    def get_existing_ids(self, user_ids: Iterable[int]) -> Set[int]:
+        """
+        Devuelve el subconjunto de IDs que existen en la BD con una única query IN (...).
+        Útil para validar foreign keys de operaciones batch sin un SELECT por fila.
+        """
+        ids = set(user_ids)
+        if not ids:
+            return set()
+        rows = self.db.query(User.id).filter(User.id.in_(ids)).all()
+        return {row.id for row in rows}
+
     def create(self, user: User) -> User:
         # Nota: No hacemos commit aquí, lo maneja el servicio con el decorador @transactional
         self.db.add(user)
@@ -74,5 +100,31 @@ class UserRepository:
         # El commit lo hace el decorador
         return user
 
+    def adjust_counters(self, user_id: int, trip_delta: int = 0, comment_delta: int = 0) -> None:
+        """
+        Ajusta los contadores desnormalizados con un UPDATE atómico (col = col + delta).
+        No hace commit: forma parte de la transacción del servicio.
+        """
+        values = {}
+        if trip_delta:
+            values[User.trip_count] = User.trip_count + trip_delta
+        if comment_delta:
+            values[User.comment_count] = User.comment_count + comment_delta
+        if values:
+            self.db.query(User).filter(User.id == user_id).update(values)
+
+    def reconcile_counters(self) -> int:
+        """
+        Recalcula trip_count y comment_count desde las tablas reales.
+        Solo actualiza las filas con desviación. Retorna el número de usuarios corregidos.
+        """
+        trips = select(func.count(Trip.id)).where(Trip.user_id == User.id).scalar_subquery()
+        comments = select(func.count(Comment.id)).where(Comment.user_id == User.id).scalar_subquery()
+        return (
+            self.db.query(User)
+            .filter((User.trip_count != trips) | (User.comment_count != comments))
+            .update({User.trip_count: trips, User.comment_count: comments}, synchronize_session=False)
+        )
+
     def delete(self, user: User) -> None:
         self.db.delete(user)
@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+
+# ============================================================================
+# SCHEMAS COMUNES PARA OPERACIONES BATCH
+# ============================================================================
+
+class BatchItemError(BaseModel):
+    """Error de un elemento concreto dentro de una operación batch"""
+    code: str
+    message: str
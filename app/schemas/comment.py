@@ -1,5 +1,7 @@
 from pydantic import BaseModel, ConfigDict, field_validator
+from datetime import datetime
 from typing import Optional
+from app.schemas.batch import BatchItemError
 
 # ============================================================================
 # SCHEMAS BÁSICOS (sin relaciones) - Para usar dentro de otros schemas
@@ -56,5 +58,31 @@ class CommentOut(BaseModel):
     user_id: int
     trip_id: int
     content: str
+    created_at: datetime
     
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class CommentFeedOut(BaseModel):
+    """Página del feed de comentarios de un viaje (más recientes primero)"""
+    items: list[CommentOut]
+    # Cursor para ?before= de la siguiente página (None si no hay más)
+    next_before: Optional[str] = None
+    has_more: bool = False
+
+# ============================================================================
+# SCHEMAS BATCH - Para POST /comment/batch
+# ============================================================================
+
+class CommentBatchItemResult(BaseModel):
+    """Resultado de un comentario dentro del batch (index = posición en la petición)"""
+    index: int
+    success: bool
+    comment: Optional[CommentOut] = None
+    error: Optional[BatchItemError] = None
+
+class CommentBatchOut(BaseModel):
+    """Respuesta de la creación masiva de comentarios"""
+    total: int
+    created: int
+    failed: int
+    results: list[CommentBatchItemResult]
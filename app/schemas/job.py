@@ -0,0 +1,38 @@
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict, computed_field
+from typing import Any, Optional
+
+# ============================================================================
+# SCHEMAS DE SALIDA (Out)
+# ============================================================================
+
+class JobOut(BaseModel):
+    """Estado y progreso de un trabajo en segundo plano"""
+    id: str
+    type: str
+    status: str
+    params: Optional[dict] = None
+    progress_current: int = 0
+    progress_total: Optional[int] = None
+    message: Optional[str] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    cancel_requested: bool = False
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+    @computed_field
+    @property
+    def progress_percent(self) -> Optional[float]:
+        if not self.progress_total:
+            return None
+        return round(100 * self.progress_current / self.progress_total, 1)
+
+class JobAccepted(BaseModel):
+    """Respuesta 202 al encolar un trabajo"""
+    job_id: str
+    status: str
+    status_url: str
@@ -1,8 +1,9 @@
 from datetime import date
-from pydantic import BaseModel, ConfigDict, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 from typing import Optional
 from app.schemas.country import CountryBasic
 from app.schemas.comment import CommentBasic
+from app.schemas.batch import BatchItemError
 
 # ============================================================================
 # SCHEMAS BÁSICOS (sin relaciones) - Para usar dentro de otros schemas
@@ -101,6 +102,57 @@ class TripOut(BaseModel):
     start_date: date
     end_date: date
     country: CountryBasic  # Info básica del país
-    comments: list[CommentBasic] = []  # Lista de comentarios (básicos, sin anidación profunda)
+    comment_count: int = 0
+    # Primeros N comentarios (NESTED_COLLECTION_LIMIT). Se leen de Trip.comments_preview,
+    # nunca de la relación completa. Si hay más, comments_next apunta a la siguiente página
+    comments: list[CommentBasic] = Field(default_factory=list, validation_alias="comments_preview")
+    comments_has_more: bool = False
+    comments_next: Optional[str] = None
     
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+    @model_validator(mode="after")
+    def build_comments_next(self) -> "TripOut":
+        if self.comments_has_more and self.comments:
+            self.comments_next = (
+                f"/api/v1/comment/trip/{self.id}"
+                f"?after_id={self.comments[-1].id}&limit={len(self.comments)}"
+            )
+        return self
+
+class TripSummaryOut(BaseModel):
+    """Schema ligero para listados tipo feed: sin comentarios, solo su contador"""
+    id: int
+    user_id: int
+    name: str
+    start_date: date
+    end_date: date
+    country: CountryBasic
+    comment_count: int = 0
+    
+    model_config = ConfigDict(from_attributes=True)
+
+class TripSearchOut(BaseModel):
+    """Página de resultados de GET /trip/search (más recientes primero)"""
+    items: list[TripSummaryOut]
+    # Cursor para ?before= de la siguiente página (None si no hay más)
+    next_before: Optional[str] = None
+    has_more: bool = False
+
+# ============================================================================
+# SCHEMAS BATCH - Para POST /trip/batch
+# ============================================================================
+
+class TripBatchItemResult(BaseModel):
+    """Resultado de un viaje dentro del batch (index = posición en la petición)"""
+    index: int
+    success: bool
+    trip: Optional[TripOut] = None
+    error: Optional[BatchItemError] = None
+
+class TripBatchOut(BaseModel):
+    """Respuesta de la creación masiva de viajes"""
+    total: int
+    created: int
+    failed: int
+    results: list[TripBatchItemResult]
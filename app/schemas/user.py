@@ -1,4 +1,5 @@
-from pydantic import BaseModel, EmailStr, ConfigDict, field_validator
+from pydantic import BaseModel, EmailStr, ConfigDict, Field, field_validator, model_validator
+from datetime import datetime
 from typing import Optional, Literal
 from app.schemas.trip import TripBasic
 from app.schemas.comment import CommentBasic
@@ -110,13 +111,55 @@ class UserOut(BaseModel):
     username: str
     role: str  # Incluir role en la respuesta
     image_url: Optional[str] = None
-    trips: list[TripBasic] = []  # Solo info básica de viajes (sin comments anidados)
-    comments: list[CommentBasic] = []  # Solo info básica de comentarios (sin viajes anidados)
-    # NO incluimos comments del usuario para evitar redundancia
-    # Hay endpoint específico para los comentarios del usuario: /comment/user/{user_id}
+    trip_count: int = 0
+    comment_count: int = 0
+    # Colecciones acotadas a NESTED_COLLECTION_LIMIT elementos (se leen de los atributos
+    # *_preview que rellena UserRepository). Si hay más, *_next apunta a la siguiente página:
+    # /trip/user/{user_id} y /comment/user/{user_id}
+    trips: list[TripBasic] = Field(default_factory=list, validation_alias="trips_preview")
+    trips_has_more: bool = False
+    trips_next: Optional[str] = None
+    comments: list[CommentBasic] = Field(default_factory=list, validation_alias="comments_preview")
+    comments_has_more: bool = False
+    comments_next: Optional[str] = None
     
     model_config = ConfigDict(from_attributes=True)
 
+    @model_validator(mode="after")
+    def build_next_links(self) -> "UserOut":
+        if self.trips_has_more and self.trips:
+            self.trips_next = (
+                f"/api/v1/trip/user/{self.id}"
+                f"?after_id={self.trips[-1].id}&limit={len(self.trips)}"
+            )
+        if self.comments_has_more and self.comments:
+            self.comments_next = (
+                f"/api/v1/comment/user/{self.id}"
+                f"?after_id={self.comments[-1].id}&limit={len(self.comments)}"
+            )
+        return self
+
+# ============================================================================
+# TIMELINE - GET /v1/users/{user_id}/timeline
+# ============================================================================
+
+class TimelineItemOut(BaseModel):
+    """Elemento del timeline: un viaje (text = nombre) o un comentario (text = contenido)"""
+    kind: Literal["trip", "comment"]
+    id: int
+    created_at: datetime
+    text: str
+    trip_id: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+class TimelineOut(BaseModel):
+    """Página del timeline, más recientes primero"""
+    items: list[TimelineItemOut]
+    # Cursor para ?before= de la siguiente página (None si no hay más)
+    next_before: Optional[str] = None
+    has_more: bool = False
+
 # ============================================================================
 # SCHEMA PARA TOKEN JWT
 # ============================================================================
@@ -1,17 +1,27 @@
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict
+from typing import Callable, List, Optional, Dict
+from contextlib import aclosing
 from app.db.models.city import City
 from app.schemas.city import CityCreate, CityUpdate
 from app.core.exceptions import AppError
 from app.core.constants import ErrorCode
-from app.core.decorators import transactional
+from app.core.decorators import transactional, read_only
+from app.core.hashing import content_hash, changed_fields
 from app.repository.city import CityRepository
 from app.repository.country import CountryRepository
 from app.service.external_api import ExternalAPIService
+from app.service.ingestion import IngestionService, WriteBatcher
+from app.service.resilience import CircuitOpenError
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Campos de GeoNames (más el país) que forman el hash de contenido de cada ciudad
+CITY_HASH_FIELDS = ("name", "latitude", "longitude", "population", "geoname_id", "country_id")
+
+# Parámetros de la población masiva que deben coincidir para retomar una ejecución
+CITY_INGESTION_KEY_FIELDS = ("limit_per_country", "min_population")
+
 class CityService:
 
     '''
@@ -26,15 +36,19 @@ class CityService:
         self.db = db
         self.repo = CityRepository(db)
 
+    @read_only
     def get_all(self, skip: int = 0, limit: int = 100) -> List[City]:
         return self.repo.get_all(skip=skip, limit=limit)
 
+    @read_only
     def get_by_name(self, name: str) -> Optional[City]:
         return self.repo.get_by_name(name)
 
+    @read_only
     def get_by_id(self, city_id: int) -> Optional[City]:
         return self.repo.get_by_id(city_id)
         
+    @read_only
     def get_by_country_code(self, country_code: str) -> List[City]:
         return self.repo.get_by_country_code(country_code)
 
@@ -57,12 +71,17 @@ class CityService:
         self, 
         country_code: str, 
         limit: Optional[int] = None,
-        min_population: int = 10000
+        min_population: int = 10000,
+        force_refresh: bool = False
     ) -> Dict[str, int]:
         """
         Pobla la tabla de ciudades desde GeoNames API para un país específico.
+        Las ciudades cuyo content_hash no cambia se cuentan como "unchanged" y no se escriben.
+        
+        Los cambios se confirman cada INGEST_COMMIT_SIZE escrituras (WriteBatcher):
+        si falla a mitad, lo confirmado se queda y el reintento lo ve "unchanged".
         """
-        stats = {"created": 0, "updated": 0, "errors": 0}
+        stats = {"created": 0, "updated": 0, "unchanged": 0, "errors": 0}
         
         try:
             # Verificar que el país existe en la base de datos
@@ -80,19 +99,6 @@ class CityService:
                     f"País con código {country_code} no encontrado en la base de datos. Poble los países primero."
                 )
             
-            # Obtener datos de la API externa
-            external_api = ExternalAPIService()
-            # Usar siempre alpha2 para GeoNames
-            api_code = country.code_alpha2 if country.code_alpha2 else country_code 
-            
-            cities_data = await external_api.fetch_cities_by_country(
-                api_code, 
-                max_rows=limit,
-                min_population=min_population
-            )
-            
-            logger.info(f"Obtenidas {len(cities_data)} ciudades de GeoNames API para {country_code}")
-            
             # OPTIMIZACIÓN: Cargar todas las ciudades existentes del país en memoria
             # Esto evita hacer una query SELECT por cada ciudad (N+1 problema)
             existing_cities = self.repo.get_by_country_id(country.id)
@@ -101,41 +107,67 @@ class CityService:
             existing_by_geoname = {c.geoname_id: c for c in existing_cities if c.geoname_id}
             existing_by_name = {c.name: c for c in existing_cities}
             
-            for city_data in cities_data:
-                try:
-                    # Añadir country_id a los datos
-                    city_data["country_id"] = country.id
-                    
-                    # Verificar existencia en memoria
-                    existing_city = None
-                    
-                    # 1. Por GeoName ID
-                    if city_data.get("geoname_id"):
-                        existing_city = existing_by_geoname.get(city_data["geoname_id"])
-                    
-                    # 2. Fallback: Por nombre (si no se encontró por ID)
-                    if not existing_city:
-                        existing_city = existing_by_name.get(city_data["name"])
-                    
-                    if existing_city:
-                        # Actualizar ciudad existente
-                        self.repo.update(existing_city, city_data)
-                        stats["updated"] += 1
-                    else:
-                        # Crear nueva ciudad
-                        new_city = City(**city_data)
-                        self.repo.create(new_city)
-                        # Actualizar índices en memoria por si hay duplicados en el mismo batch de la API
-                        if new_city.geoname_id:
-                            existing_by_geoname[new_city.geoname_id] = new_city
-                        existing_by_name[new_city.name] = new_city
-                        
-                        stats["created"] += 1
-                        
-                except Exception as e:
-                    stats["errors"] += 1
-                    logger.error(f"Error procesando ciudad {city_data.get('name', 'unknown')}: {str(e)}")
+            # Obtener datos de la API externa en streaming: cada ciudad se procesa
+            # según llega y los cambios se envían a la BD cada INGEST_BATCH_SIZE registros
+            external_api = ExternalAPIService(force_refresh=force_refresh)
+            # Usar siempre alpha2 para GeoNames
+            api_code = country.code_alpha2 if country.code_alpha2 else country_code 
+            cities_stream = external_api.stream_cities_by_country(
+                api_code, 
+                max_rows=limit,
+                min_population=min_population
+            )
+            received = 0
+            batcher = WriteBatcher(self.db)
+            
+            async with aclosing(cities_stream):
+                async for city_data in cities_stream:
+                    received += 1
+                    try:
+                        # Añadir country_id a los datos
+                        city_data["country_id"] = country.id
+
+                        # Verificar existencia en memoria
+                        existing_city = None
+
+                        # 1. Por GeoName ID
+                        if city_data.get("geoname_id"):
+                            existing_city = existing_by_geoname.get(city_data["geoname_id"])
+
+                        # 2. Fallback: Por nombre (si no se encontró por ID)
+                        if not existing_city:
+                            existing_city = existing_by_name.get(city_data["name"])
+
+                        new_hash = content_hash(city_data, CITY_HASH_FIELDS)
+
+                        if existing_city:
+                            if existing_city.content_hash == new_hash:
+                                stats["unchanged"] += 1
+                                continue
+
+                            # Actualizar solo los campos que difieren (y guardar el nuevo hash)
+                            changes = changed_fields(existing_city, city_data, CITY_HASH_FIELDS)
+                            self.repo.update(existing_city, {**changes, "content_hash": new_hash})
+                            stats["updated" if changes else "unchanged"] += 1
+                        else:
+                            # Crear nueva ciudad
+                            new_city = City(**city_data, content_hash=new_hash)
+                            self.repo.create(new_city)
+                            # Actualizar índices en memoria por si hay duplicados en el mismo batch de la API
+                            if new_city.geoname_id:
+                                existing_by_geoname[new_city.geoname_id] = new_city
+                            existing_by_name[new_city.name] = new_city
+
+                            stats["created"] += 1
+
+                    except Exception as e:
+                        stats["errors"] += 1
+                        logger.error(f"Error procesando ciudad {city_data.get('name', 'unknown')}: {str(e)}")
+                        continue
+                    # Fuera del try: un fallo al confirmar el tramo aborta el país
+                    batcher.add()
             
+            logger.info(f"Recibidas {received} ciudades de GeoNames API para {country_code}")
             logger.info(f"Población de ciudades para {country_code} completada: {stats}")
             return stats
             
@@ -145,53 +177,115 @@ class CityService:
             logger.error(f"Error fatal al poblar ciudades de {country_code}: {str(e)}")
             raise AppError(500, ErrorCode.INTERNAL_SERVER_ERROR, f"Error al poblar ciudades: {str(e)}")
 
-    @transactional
     async def populate_all_countries_cities(
         self, 
         limit_per_country: Optional[int] = None,
-        min_population: int = 10000
+        min_population: int = 10000,
+        force_refresh: bool = False,
+        progress: Optional[Callable[..., None]] = None,
+        resume: bool = True,
+        job_id: Optional[str] = None
     ) -> Dict[str, any]:
         """
         Pobla ciudades para todos los países en la base de datos.
+        
+        Operación larga: se ejecuta como trabajo en segundo plano (ver app/service/jobs.py).
+        `progress(actual, total, mensaje)` se llama tras cada país y puede lanzar
+        JobCancelled para interrumpir el proceso.
+        
+        Sin @transactional a este nivel: cada país es una transacción propia
+        (populate_from_api, con commits por tramos) y al terminarlo se confirma
+        su checkpoint (IngestionCheckpoint). Si la ejecución se interrumpe, la
+        siguiente con los mismos parámetros (y resume=True) salta los países ya
+        terminados sin volver a pedirlos a GeoNames.
         """
         total_stats = {
             "created": 0, 
             "updated": 0, 
+            "unchanged": 0,
             "errors": 0,
             "countries_processed": 0,
-            "countries_failed": 0
+            "countries_failed": 0,
+            "countries_resumed": 0
         }
         
+        ingestion = IngestionService(self.db)
+        run = ingestion.start(
+            "populate_cities",
+            {"limit_per_country": limit_per_country, "min_population": min_population, "force_refresh": force_refresh},
+            CITY_INGESTION_KEY_FIELDS,
+            job_id=job_id,
+            resume=resume
+        )
+        run_id = run.id
+        total_stats["run_id"] = run_id
+        done = ingestion.completed(run_id)
+        
         # Obtener todos los países
         country_repo = CountryRepository(self.db)
         countries = country_repo.get_all(limit=None)  # No limit to get all countries
         
-        logger.info(f"Iniciando población masiva de ciudades para {len(countries)} países")
+        logger.info(
+            f"Iniciando población masiva de ciudades para {len(countries)} países "
+            f"(ejecución {run_id}, {len(done)} ya terminados)"
+        )
         
-        for country in countries:
-            if not country.code_alpha2:
-                continue
-            
-            try:
-                # Poblar ciudades para este país
-                # Reducimos el logging para no saturar
-                stats = await self.populate_from_api(
-                    country.code_alpha2,
-                    limit=limit_per_country,
-                    min_population=min_population
-                )
+        try:
+            for index, country in enumerate(countries):
+                if progress:
+                    progress(index, len(countries), f"Procesando {country.name}")
+
+                if not country.code_alpha2:
+                    continue
                 
-                total_stats["created"] += stats["created"]
-                total_stats["updated"] += stats["updated"]
-                total_stats["errors"] += stats["errors"]
-                total_stats["countries_processed"] += 1
+                if country.code_alpha2 in done:
+                    # Terminado en un intento anterior de esta ejecución
+                    self._add_country_stats(total_stats, done[country.code_alpha2])
+                    total_stats["countries_resumed"] += 1
+                    continue
                 
-            except Exception as e:
-                logger.error(f"Error procesando país {country.name}: {str(e)}")
-                total_stats["countries_failed"] += 1
+                try:
+                    # Reducimos el logging para no saturar
+                    stats = await self.populate_from_api(
+                        country.code_alpha2,
+                        limit=limit_per_country,
+                        min_population=min_population,
+                        force_refresh=force_refresh
+                    )
+                    self._add_country_stats(total_stats, stats)
+                    ingestion.checkpoint(run_id, country.code_alpha2, "done", stats=stats)
+                    
+                except CircuitOpenError as e:
+                    # GeoNames no responde: no seguimos golpeándolo con el resto de países
+                    remaining = len(countries) - index
+                    logger.error(f"Población masiva interrumpida en {country.name}: {e.message}")
+                    total_stats["countries_failed"] += remaining
+                    total_stats["aborted"] = e.message
+                    break
+                except Exception as e:
+                    error = e.message if isinstance(e, AppError) else str(e)
+                    logger.error(f"Error procesando país {country.name}: {error}")
+                    total_stats["countries_failed"] += 1
+                    # Se reintenta al retomar la ejecución
+                    ingestion.checkpoint(run_id, country.code_alpha2, "failed", error=error)
+        except AppError as e:
+            # Cancelación (JobCancelled) u otro error que corta la ejecución: queda retomable
+            status = "cancelled" if e.code == ErrorCode.JOB_CANCELLED else "failed"
+            ingestion.finish(run_id, status, stats=total_stats, error=e.message)
+            raise
         
+        failed = total_stats["countries_failed"] > 0
+        ingestion.finish(run_id, "failed" if failed else "completed", stats=total_stats)
+        if progress:
+            progress(len(countries), len(countries), "Completado")
         return total_stats
 
+    @staticmethod
+    def _add_country_stats(total_stats: Dict[str, any], stats: Dict[str, int]) -> None:
+        for key in ("created", "updated", "unchanged", "errors"):
+            total_stats[key] += stats.get(key, 0)
+        total_stats["countries_processed"] += 1
+
     @transactional
     def update(self, city_id: int, city_in: CityUpdate) -> City:
         city = self.repo.get_by_id(city_id)
@@ -211,6 +305,8 @@ class CityService:
              if existing_city and existing_city.id != city_id:
                   raise AppError(409, ErrorCode.CITY_ALREADY_EXISTS, "La ciudad ya existe en este país")
             
+        # Una edición manual invalida el hash: el próximo refresco volverá a comparar la fila
+        city.content_hash = None
         return self.repo.update(city, city_data)
 
     @transactional
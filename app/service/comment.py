@@ -1,13 +1,17 @@
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Set, Tuple
+from collections import Counter
 from app.db.models.comment import Comment
 from app.schemas.comment import CommentCreate, CommentUpdate
 from app.core.exceptions import AppError
 from app.core.constants import ErrorCode
-from app.core.decorators import transactional
+from app.core.decorators import transactional, read_only
+from app.core.config import settings
 from app.repository.comment import CommentRepository
 from app.repository.user import UserRepository
 from app.repository.trip import TripRepository
+from app.repository.pagination import decode_cursor
+from app.service.trip import trip_reads
 
 class CommentService:
     '''
@@ -23,17 +27,45 @@ class CommentService:
         self.user_repo = UserRepository(db)
         self.trip_repo = TripRepository(db)
 
+    @read_only
     def get_all(self, skip: int = 0, limit: int = 100) -> List[Comment]:
         return self.repo.get_all(skip=skip, limit=limit)
 
+    @read_only
     def get_by_id(self, comment_id: int) -> Optional[Comment]:
         return self.repo.get_by_id(comment_id)
 
-    def get_by_trip_id(self, trip_id: int) -> List[Comment]:
-        return self.repo.get_by_trip_id(trip_id)
+    @read_only
+    def get_by_trip_id(
+        self, trip_id: int, after_id: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[Comment]:
+        limit = min(max(limit or settings.FEED_PAGE_SIZE, 1), settings.FEED_MAX_PAGE_SIZE)
+        return self.repo.get_by_trip_id(trip_id, after_id=after_id, limit=limit)
 
-    def get_by_user_id(self, user_id: int) -> List[Comment]:
-        return self.repo.get_by_user_id(user_id)
+    @read_only
+    def get_trip_feed(
+        self, trip_id: int, before: Optional[str] = None, limit: Optional[int] = None
+    ) -> Tuple[List[Comment], Optional[str]]:
+        '''
+        Página del feed de un viaje, más recientes primero.
+        `before` es el cursor next_before de la página anterior.
+        Retorna (comentarios, cursor de la siguiente página o None).
+        '''
+        position = None
+        if before:
+            try:
+                position = decode_cursor(before)
+            except ValueError:
+                raise AppError(400, ErrorCode.INVALID_CURSOR, "El cursor de paginación no es válido", {"before": before})
+        limit = min(max(limit or settings.FEED_PAGE_SIZE, 1), settings.FEED_MAX_PAGE_SIZE)
+        return self.repo.get_trip_feed(trip_id, position, limit)
+
+    @read_only
+    def get_by_user_id(
+        self, user_id: int, after_id: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[Comment]:
+        limit = min(max(limit or settings.FEED_PAGE_SIZE, 1), settings.FEED_MAX_PAGE_SIZE)
+        return self.repo.get_by_user_id(user_id, after_id=after_id, limit=limit)
 
     def validate_comment_length(self, content: str) -> None:
         """Valida longitud del contenido del comentario"""
@@ -62,7 +94,96 @@ class CommentService:
         
         # Crear comentario después de validaciones
         comment = Comment(**comment_in.model_dump())
-        return self.repo.create(comment)
+        self.repo.create(comment)
+        
+        # Mantener contadores desnormalizados en la misma transacción
+        self.trip_repo.adjust_comment_count(comment_in.trip_id, 1)
+        trip_reads.forget_on_commit(self.db, comment_in.trip_id)
+        self.user_repo.adjust_counters(comment_in.user_id, comment_delta=1)
+        return comment
+
+    def create_batch(self, comments_in: List[CommentCreate]) -> dict:
+        '''
+        Crea varios comentarios en una única transacción.
+        
+        Las foreign keys (user_id, trip_id) se validan con una query IN (...)
+        por tabla. Los elementos inválidos se reportan individualmente.
+        '''
+        if not comments_in:
+            raise AppError(400, ErrorCode.BATCH_EMPTY, "El batch no contiene comentarios")
+        if len(comments_in) > settings.BATCH_MAX_ITEMS:
+            raise AppError(
+                400,
+                ErrorCode.BATCH_TOO_LARGE,
+                f"El batch no puede tener más de {settings.BATCH_MAX_ITEMS} comentarios",
+                details={"received": len(comments_in), "max_items": settings.BATCH_MAX_ITEMS}
+            )
+
+        results = self._insert_batch(comments_in)
+
+        # Recargar los comentarios creados en una sola query
+        created_ids = [r["comment_id"] for r in results if r["success"]]
+        comments_by_id = {c.id: c for c in self.repo.get_by_ids(created_ids)}
+        for result in results:
+            comment_id = result.pop("comment_id", None)
+            if result["success"]:
+                result["comment"] = comments_by_id.get(comment_id)
+
+        return {
+            "total": len(results),
+            "created": len(created_ids),
+            "failed": len(results) - len(created_ids),
+            "results": results
+        }
+
+    @transactional
+    def _insert_batch(self, comments_in: List[CommentCreate]) -> List[dict]:
+        existing_users = self.user_repo.get_existing_ids(c.user_id for c in comments_in)
+        existing_trips = self.trip_repo.get_existing_ids(c.trip_id for c in comments_in)
+
+        results = []
+        new_comments = []
+        for index, comment_in in enumerate(comments_in):
+            try:
+                self._validate_batch_item(comment_in, existing_users, existing_trips)
+            except AppError as e:
+                results.append({
+                    "index": index,
+                    "success": False,
+                    "error": {"code": e.code, "message": e.message}
+                })
+                continue
+
+            comment = Comment(**comment_in.model_dump())
+            new_comments.append(comment)
+            results.append({"index": index, "success": True, "comment": comment})
+
+        self.repo.bulk_create(new_comments)
+        for trip_id, total in Counter(c.trip_id for c in new_comments).items():
+            self.trip_repo.adjust_comment_count(trip_id, total)
+            trip_reads.forget_on_commit(self.db, trip_id)
+        for user_id, total in Counter(c.user_id for c in new_comments).items():
+            self.user_repo.adjust_counters(user_id, comment_delta=total)
+        self.db.flush()
+        for result in results:
+            if result["success"]:
+                result["comment_id"] = result.pop("comment").id
+        return results
+
+    def _validate_batch_item(
+        self,
+        comment_in: CommentCreate,
+        existing_users: Set[int],
+        existing_trips: Set[int]
+    ) -> None:
+        """Mismas validaciones que create(), pero contra los IDs precargados del batch"""
+        self.validate_comment_length(comment_in.content)
+
+        if comment_in.user_id not in existing_users:
+            raise AppError(404, ErrorCode.USER_NOT_FOUND, f"El usuario con ID {comment_in.user_id} no existe")
+
+        if comment_in.trip_id not in existing_trips:
+            raise AppError(404, ErrorCode.TRIP_NOT_FOUND, f"El viaje con ID {comment_in.trip_id} no existe")
 
     @transactional
     def update(self, comment_id: int, comment_in: CommentUpdate) -> Comment:
@@ -76,6 +197,7 @@ class CommentService:
         # Validar longitud si se está actualizando
         if 'content' in comment_data and comment_data['content'] is not None:
             self.validate_comment_length(comment_data['content'])
+        trip_reads.forget_on_commit(self.db, comment.trip_id)
         
         return self.repo.update(comment, comment_data)
 
@@ -85,4 +207,7 @@ class CommentService:
         if not comment:
             raise AppError(404, ErrorCode.COMMENT_NOT_FOUND, "El comentario no existe")
 
+        self.trip_repo.adjust_comment_count(comment.trip_id, -1)
+        self.user_repo.adjust_counters(comment.user_id, comment_delta=-1)
+        trip_reads.forget_on_commit(self.db, comment.trip_id)
         self.repo.delete(comment)
\ No newline at end of file
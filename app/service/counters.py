@@ -0,0 +1,31 @@
+from sqlalchemy.orm import Session
+from typing import Dict
+from app.core.decorators import transactional
+from app.repository.trip import TripRepository
+from app.repository.user import UserRepository
+import logging
+
+logger = logging.getLogger(__name__)
+
+class CounterService:
+    '''
+    Servicio de mantenimiento de contadores desnormalizados.
+    
+    Trip.comment_count, User.trip_count y User.comment_count se actualizan
+    en las transacciones de TripService y CommentService. Este servicio
+    corrige cualquier desviación (borrados manuales, datos previos a los
+    contadores, errores) recalculándolos desde las tablas reales.
+    '''
+    def __init__(self, db: Session):
+        self.db = db
+        self.trip_repo = TripRepository(db)
+        self.user_repo = UserRepository(db)
+
+    @transactional
+    def reconcile(self) -> Dict[str, int]:
+        stats = {
+            "trips_fixed": self.trip_repo.reconcile_comment_counts(),
+            "users_fixed": self.user_repo.reconcile_counters()
+        }
+        logger.info(f"Reconciliación de contadores completada: {stats}")
+        return stats
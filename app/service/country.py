@@ -1,27 +1,39 @@
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict
+from contextlib import aclosing
 from app.db.models.country import Country
 from app.schemas.country import CountryCreate, CountryUpdate
 from app.core.exceptions import AppError
 from app.core.constants import ErrorCode
-from app.core.decorators import transactional
+from app.core.decorators import transactional, read_only
+from app.core.hashing import content_hash, changed_fields
 from app.repository.country import CountryRepository
 from app.service.external_api import ExternalAPIService
+from app.service.ingestion import WriteBatcher
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Campos de REST Countries que forman el hash de contenido de cada país
+COUNTRY_HASH_FIELDS = (
+    "name", "code_alpha2", "code_alpha3", "capital",
+    "region", "subregion", "population", "flag_url"
+)
+
 class CountryService:
     def __init__(self, db: Session):
         self.db = db
         self.repo = CountryRepository(db)
 
+    @read_only
     def get_all(self, skip: int = 0, limit: int = 100) -> List[Country]:
         return self.repo.get_all(skip=skip, limit=limit)
 
+    @read_only
     def get_by_id(self, country_id: int) -> Optional[Country]:
         return self.repo.get_by_id(country_id)
 
+    @read_only
     def get_by_name(self, name: str) -> Optional[Country]:
         return self.repo.get_by_name(name)
 
@@ -43,52 +55,76 @@ class CountryService:
         return self.repo.create(country)
         
     @transactional
-    async def populate_from_api(self) -> Dict[str, int]:
+    async def populate_from_api(self, force_refresh: bool = False) -> Dict[str, int]:
         """
         Pobla la tabla de países desde REST Countries API.
         
+        Refresco incremental: cada registro se compara por content_hash con el
+        guardado en la fila; si coincide se salta sin tocar la BD. Los cambios
+        se confirman por tramos (WriteBatcher, INGEST_COMMIT_SIZE).
+        
         Returns:
-            Diccionario con estadísticas: {"created": int, "updated": int, "errors": int}
+            Diccionario con estadísticas: {"created": int, "updated": int, "unchanged": int, "errors": int}
         """
-        stats = {"created": 0, "updated": 0, "errors": 0}
+        stats = {"created": 0, "updated": 0, "unchanged": 0, "errors": 0}
         
         try:
-            # Obtener datos de la API externa
-            external_api = ExternalAPIService()
-            countries_data = await external_api.fetch_all_countries()
+            # OPTIMIZACIÓN: Cargar todos los países en memoria (una query en lugar de hasta 3 por país)
+            existing_countries = self.repo.get_all(limit=None)
+            by_alpha2 = {c.code_alpha2: c for c in existing_countries if c.code_alpha2}
+            by_alpha3 = {c.code_alpha3: c for c in existing_countries if c.code_alpha3}
+            by_name = {c.name: c for c in existing_countries}
             
-            logger.info(f"Obtenidos {len(countries_data)} países de REST Countries API")
+            # Obtener datos de la API externa en streaming (país a país, sin cargar la respuesta entera)
+            external_api = ExternalAPIService(force_refresh=force_refresh)
+            received = 0
+            batcher = WriteBatcher(self.db)
             
-            for country_data in countries_data:
-                try:
-                    # Verificar si el país ya existe por código alpha-2 o alpha-3
-                    existing_country = None
-                    if country_data.get("code_alpha2"):
-                        existing_country = self.repo.get_by_code_alpha2(country_data["code_alpha2"])
-                    
-                    if not existing_country and country_data.get("code_alpha3"):
-                        existing_country = self.repo.get_by_code_alpha3(country_data["code_alpha3"])
-                    
-                    if not existing_country:
-                        existing_country = self.repo.get_by_name(country_data["name"])
-                    
-                    if existing_country:
-                        # Actualizar país existente
-                        self.repo.update(existing_country, country_data)
-                        stats["updated"] += 1
-                    else:
-                        # Crear nuevo país
-                        new_country = Country(**country_data)
-                        self.repo.create(new_country)
-                        stats["created"] += 1
-                        
-                except Exception as e:
-                    stats["errors"] += 1
-                    logger.error(f"Error procesando país {country_data.get('name', 'unknown')}: {str(e)}")
+            async with aclosing(external_api.stream_all_countries()) as countries_stream:
+                async for country_data in countries_stream:
+                    received += 1
+                    try:
+                        # Verificar si el país ya existe por código alpha-2, alpha-3 o nombre
+                        existing_country = (
+                            by_alpha2.get((country_data.get("code_alpha2") or "").upper())
+                            or by_alpha3.get((country_data.get("code_alpha3") or "").upper())
+                            or by_name.get(country_data["name"])
+                        )
+
+                        new_hash = content_hash(country_data, COUNTRY_HASH_FIELDS)
+
+                        if existing_country:
+                            if existing_country.content_hash == new_hash:
+                                stats["unchanged"] += 1
+                                continue
+
+                            # Actualizar solo los campos que difieren (y guardar el nuevo hash)
+                            changes = changed_fields(existing_country, country_data, COUNTRY_HASH_FIELDS)
+                            self.repo.update(existing_country, {**changes, "content_hash": new_hash})
+                            stats["updated" if changes else "unchanged"] += 1
+                        else:
+                            # Crear nuevo país
+                            new_country = Country(**country_data, content_hash=new_hash)
+                            self.repo.create(new_country)
+                            if new_country.code_alpha2:
+                                by_alpha2[new_country.code_alpha2] = new_country
+                            if new_country.code_alpha3:
+                                by_alpha3[new_country.code_alpha3] = new_country
+                            by_name[new_country.name] = new_country
+                            stats["created"] += 1
+
+                    except Exception as e:
+                        stats["errors"] += 1
+                        logger.error(f"Error procesando país {country_data.get('name', 'unknown')}: {str(e)}")
+                        continue
+                    batcher.add()
             
+            logger.info(f"Obtenidos {received} países de REST Countries API")
             logger.info(f"Población de países completada: {stats}")
             return stats
             
+        except AppError:
+            raise
         except Exception as e:
             logger.error(f"Error fatal al poblar países: {str(e)}")
             raise AppError(500, ErrorCode.INTERNAL_SERVER_ERROR, f"Error al poblar países: {str(e)}")
@@ -114,6 +150,8 @@ class CountryService:
              if existing and existing.id != country_id:
                  raise AppError(409, ErrorCode.COUNTRY_ALREADY_EXISTS, f"El código alpha-2 {country_data['code_alpha2']} ya existe")
 
+        # Una edición manual invalida el hash: el próximo refresco volverá a comparar la fila
+        country.content_hash = None
         return self.repo.update(country, country_data)
 
     @transactional
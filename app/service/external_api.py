@@ -1,108 +1,241 @@
-import httpx
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+import time
+from contextlib import aclosing
+from typing import TYPE_CHECKING, AsyncIterator, Callable, List, Dict, Any, Optional
 from app.core.config import settings
+from app.service.http_cache import HttpCache, CachedResponse
+from app.service.json_stream import JsonArrayStream
+from app.service.resilience import resilient_get, default_timeout
 from app.core.exceptions import AppError
 from app.core.constants import ErrorCode
 
+if TYPE_CHECKING:
+    # httpx se importa en _client()/al capturar errores: no se paga al arrancar la app
+    import httpx
+
 logger = logging.getLogger(__name__)
 
+# Códigos de error de GeoNames (respondidos con HTTP 200) que son transitorios:
+# 13 = database timeout, 22 = server overloaded
+GEONAMES_TRANSIENT_STATUS = (13, 22)
+
+def _geonames_transient(response: "httpx.Response") -> bool:
+    # Los errores de GeoNames son cuerpos diminutos: no se parsea el JSON de las respuestas grandes
+    if len(response.content) > 512 or b'"status"' not in response.content:
+        return False
+    try:
+        return response.json().get("status", {}).get("value") in GEONAMES_TRANSIENT_STATUS
+    except ValueError:
+        return False
+
+def _request_error() -> type:
+    import httpx
+    return httpx.RequestError
+
 class ExternalAPIService:
     """
     Servicio para integrar con APIs externas (REST Countries y GeoNames).
-    
+
     Responsabilidades:
     - Obtener datos de países desde REST Countries API
     - Obtener datos de ciudades desde GeoNames API
     - Manejo de errores HTTP y timeouts
     - Parseo y validación de respuestas
+    - Caché en disco de las respuestas (ver app/service/http_cache.py)
+
+    Las respuestas se procesan en streaming: stream_all_countries() y
+    stream_cities_by_country() son generadores asíncronos que producen cada
+    registro normalizado según llega (ver app/service/json_stream.py), así que
+    la memoria no depende del tamaño de la respuesta. fetch_* construyen la
+    lista completa a partir de ellos. Quien los recorra y pueda salir antes del
+    final (límite, error) debe usar contextlib.aclosing: así la respuesta HTTP
+    o el fichero de la caché se cierran al salir y no cuando actúe el recolector.
+
+    Todas las peticiones pasan por _stream_json(). Con force_refresh=True se
+    ignora la caché y se descarga de nuevo (la respuesta nueva sí se guarda).
+    Las peticiones reales usan reintentos y circuit breaker (app/service/resilience.py).
+    `transport` permite inyectar un transporte httpx (p. ej. un stub con fallos).
     """
-    
-    def __init__(self):
+
+    def __init__(self, force_refresh: bool = False, transport: Optional["httpx.AsyncBaseTransport"] = None):
         self.rest_countries_url = settings.REST_COUNTRIES_URL
         self.geonames_url = settings.GEONAMES_URL
         self.geonames_username = settings.GEONAMES_USERNAME
-        
+        self.force_refresh = force_refresh
+        self.transport = transport
+        self.cache = HttpCache() if settings.HTTP_CACHE_ENABLED else None
+
         # Validación de configuración crítica
         if not self.geonames_username and settings.ENVIRONMENT != "test":
              logger.warning("GEONAMES_USERNAME no está configurado. Las peticiones a GeoNames fallarán.")
-    
-    async def fetch_all_countries(self) -> List[Dict[str, Any]]:
+
+    def _client(self) -> "httpx.AsyncClient":
+        import httpx
+        return httpx.AsyncClient(timeout=default_timeout(), transport=self.transport)
+
+    async def _stream_json(
+        self,
+        url: str,
+        params: Dict[str, Any],
+        parser: JsonArrayStream,
+        source: str,
+        retry_if: Optional[Callable[["httpx.Response"], bool]] = None
+    ) -> AsyncIterator[Any]:
+        """
+        GET en streaming con caché en disco. Produce los elementos del array JSON
+        que extrae `parser` según llegan los bytes.
+
+        1. Entrada fresca (TTL) y sin force_refresh: se lee del disco sin petición HTTP.
+        2. Entrada caducada: GET condicional; si el origen responde 304 se lee del disco.
+        3. Respuesta 200: el cuerpo se escribe en la caché a la vez que se parsea y
+           solo se guarda si se leyó completo y no es un error de la API.
+        """
+        key = HttpCache.key_for(url, params) if self.cache else None
+        entry = await asyncio.to_thread(self.cache.get, key) if self.cache else None
+
+        if entry and not self.force_refresh and entry.is_fresh(self.cache.ttl):
+            logger.info(f"HTTP cache HIT: {url}")
+            async with aclosing(self._stream_cached(key, parser)) as items:
+                async for item in items:
+                    yield item
+            return
+
+        headers = entry.validator_headers() if entry and not self.force_refresh else {}
+        async with self._client() as client:
+            response = await resilient_get(client, url, params, headers, retry_if=retry_if, stream=True)
+            try:
+                if response.status_code == 304 and entry:
+                    logger.info(f"HTTP cache REVALIDATED: {url}")
+                    await asyncio.to_thread(self.cache.touch, key, entry)
+                    async with aclosing(self._stream_cached(key, parser)) as items:
+                        async for item in items:
+                            yield item
+                    return
+
+                if response.status_code != 200:
+                    await response.aread()
+                    logger.error(f"Error fetching {source}: {response.status_code} - {response.text[:500]}")
+                    raise AppError(
+                        502,
+                        ErrorCode.INTERNAL_SERVER_ERROR,
+                        f"Error al obtener datos de {source}: {response.status_code}"
+                    )
+
+                writer = None
+                if self.cache:
+                    writer = await asyncio.to_thread(self.cache.writer, key, CachedResponse(
+                        url=url,
+                        stored_at=time.time(),
+                        etag=response.headers.get("ETag"),
+                        last_modified=response.headers.get("Last-Modified"),
+                        content_type=response.headers.get("Content-Type")
+                    ))
+                try:
+                    async for chunk in response.aiter_bytes():
+                        if writer:
+                            await asyncio.to_thread(writer.write, chunk)
+                        for item in parser.feed(chunk):
+                            yield item
+                    for item in parser.close():
+                        yield item
+                except BaseException:
+                    # Cuerpo incompleto, JSON inválido o el consumidor dejó de leer
+                    if writer:
+                        await asyncio.to_thread(writer.discard)
+                    raise
+                if writer:
+                    # Los errores de GeoNames llegan con HTTP 200: no se cachean
+                    await asyncio.to_thread(writer.discard if "status" in parser.extras else writer.commit)
+            finally:
+                await response.aclose()
+
+    async def _stream_cached(self, key: str, parser: JsonArrayStream) -> AsyncIterator[Any]:
+        chunks = self.cache.iter_body(key)
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+                for item in parser.feed(chunk):
+                    yield item
+            for item in parser.close():
+                yield item
+        finally:
+            # Si el consumidor deja de leer antes del final, el fichero gzip se
+            # cierra aquí y no cuando el recolector libere el generador
+            chunks.close()
+
+    async def stream_all_countries(self) -> AsyncIterator[Dict[str, Any]]:
         """
-        Obtiene todos los países desde REST Countries API.
-        
-        Returns:
-            Lista de diccionarios con información de países normalizada
-        
+        Obtiene todos los países desde REST Countries API, uno a uno.
+
+        Yields:
+            Diccionarios con información de países normalizada
+
         Raises:
             AppError: Si hay error en la petición HTTP o al procesar datos
         """
         url = f"{self.rest_countries_url}/all"
-        
+
         # Solo solicitamos los campos necesarios para optimizar la respuesta
         # Nota: La API v3.1 soporta filtrado por campos
         params = {"fields": "name,cca2,cca3,capital,region,subregion,population,flags"}
-        
+
+        count = 0
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                logger.info(f"Fetching countries from: {url}")
-                response = await client.get(url, params=params)
-                
-                if response.status_code != 200:
-                    logger.error(f"Error fetching countries: {response.status_code} - {response.text}")
-                    raise AppError(
-                        502, 
-                        ErrorCode.INTERNAL_SERVER_ERROR, 
-                        f"Error al obtener países de REST Countries API: {response.status_code}"
-                    )
-                
-                countries_data = response.json()
-                logger.info(f"Successfully fetched {len(countries_data)} countries")
-                
-                return self._parse_countries(countries_data)
-                
-        except httpx.RequestError as e:
+            logger.info(f"Fetching countries from: {url}")
+            async with aclosing(self._stream_json(url, params, JsonArrayStream(), "REST Countries API")) as items:
+                async for item in items:
+                    country = self._parse_country(item)
+                    if country:
+                        count += 1
+                        yield country
+            logger.info(f"Successfully fetched {count} countries")
+
+        except AppError:
+            raise
+        except _request_error() as e:
             logger.error(f"Connection error with REST Countries API: {str(e)}")
             raise AppError(
-                503, 
-                ErrorCode.INTERNAL_SERVER_ERROR, 
+                503,
+                ErrorCode.INTERNAL_SERVER_ERROR,
                 f"Error de conexión con REST Countries API: {str(e)}"
             )
-        except Exception as e:
-            # Capturar errores de parseo o inesperados
-            logger.error(f"Unexpected error in fetch_all_countries: {str(e)}")
+        except ValueError as e:
+            logger.error(f"Invalid JSON from REST Countries API: {str(e)}")
             raise AppError(
-                500,
+                502,
                 ErrorCode.INTERNAL_SERVER_ERROR,
-                f"Error inesperado al procesar países: {str(e)}"
+                f"Respuesta inválida de REST Countries API: {str(e)}"
             )
-    
-    async def fetch_cities_by_country(
-        self, 
-        country_code: str, 
+
+    async def stream_cities_by_country(
+        self,
+        country_code: str,
         max_rows: Optional[int] = None,
         min_population: int = 1000
-    ) -> List[Dict[str, Any]]:
+    ) -> AsyncIterator[Dict[str, Any]]:
         """
-        Obtiene ciudades de un país desde GeoNames API.
-        
+        Obtiene ciudades de un país desde GeoNames API, una a una.
+
         Args:
             country_code: Código ISO 3166-1 alpha-2 del país (ej: "ES")
             max_rows: Número máximo de ciudades a obtener. Si es None, usa el default de la API.
             min_population: Población mínima para incluir la ciudad
-            
-        Returns:
-            Lista de diccionarios con información de ciudades normalizada
+
+        Yields:
+            Diccionarios con información de ciudades normalizada
         """
         if not self.geonames_username:
             raise AppError(
-                500, 
-                ErrorCode.INTERNAL_SERVER_ERROR, 
+                500,
+                ErrorCode.INTERNAL_SERVER_ERROR,
                 "GeoNames username no configurado"
             )
 
         url = f"{self.geonames_url}/searchJSON"
-        
+
         # Configuración para buscar ciudades importantes
         params = {
             "country": country_code.upper(),
@@ -112,112 +245,120 @@ class ExternalAPIService:
             "style": "FULL",           # Obtener todos los detalles
             "lang": "en"               # Nombres en inglés (o local)
         }
-        
+
         if max_rows is not None:
             params["maxRows"] = max_rows
-        
+
         # Opcional: Filtrar por tipo de ciudad para evitar aldeas muy pequeñas
         # featureCode podría usarse (PPLA, PPLC, etc) pero featureClass P + orden por población es efectivo
-        
+
+        parser = JsonArrayStream(key="geonames")
+        count = 0
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                logger.info(f"Fetching cities for {country_code} from GeoNames")
-                response = await client.get(url, params=params)
-                
-                if response.status_code != 200:
-                    logger.error(f"Error fetching cities: {response.status_code} - {response.text}")
-                    raise AppError(
-                        502,
-                        ErrorCode.INTERNAL_SERVER_ERROR,
-                        f"Error al obtener ciudades de GeoNames API: {response.status_code}"
-                    )
-                
-                data = response.json()
-                
-                # Verificar errores específicos de la API de GeoNames
-                if "status" in data:
-                    error_msg = data["status"].get("message", "Unknown error")
-                    logger.error(f"GeoNames API Error: {error_msg}")
-                    raise AppError(
-                        502,
-                        ErrorCode.INTERNAL_SERVER_ERROR,
-                        f"GeoNames API Error: {error_msg}"
-                    )
-                
-                cities_data = data.get("geonames", [])
-                logger.info(f"Successfully fetched {len(cities_data)} cities for {country_code}")
-                
-                return self._parse_cities(cities_data, min_population)
-                
-        except httpx.RequestError as e:
+            logger.info(f"Fetching cities for {country_code} from GeoNames")
+            items = self._stream_json(url, params, parser, "GeoNames API", retry_if=_geonames_transient)
+            async with aclosing(items):
+                async for item in items:
+                    city = self._parse_city(item, min_population)
+                    if city:
+                        count += 1
+                        yield city
+
+            # Verificar errores específicos de la API de GeoNames
+            if "status" in parser.extras:
+                error_msg = parser.extras["status"].get("message", "Unknown error")
+                logger.error(f"GeoNames API Error: {error_msg}")
+                raise AppError(
+                    502,
+                    ErrorCode.INTERNAL_SERVER_ERROR,
+                    f"GeoNames API Error: {error_msg}"
+                )
+
+            logger.info(f"Successfully fetched {count} cities for {country_code}")
+
+        except AppError:
+            raise
+        except _request_error() as e:
             logger.error(f"Connection error with GeoNames API: {str(e)}")
             raise AppError(
                 503,
                 ErrorCode.INTERNAL_SERVER_ERROR,
                 f"Error de conexión con GeoNames API: {str(e)}"
             )
-    
-    def _parse_countries(self, raw_data: List[Dict]) -> List[Dict]:
-        """Normalize REST Countries data to our schema format"""
-        parsed_countries = []
-        
-        for item in raw_data:
-            try:
-                # Extraer nombre común
-                name = item.get("name", {}).get("common")
-                if not name:
-                    continue
-                    
-                # Extraer capital (lista -> string)
-                capital_list = item.get("capital", [])
-                capital = capital_list[0] if capital_list else None
-                
-                # Extraer URL de bandera (png)
-                flag_url = item.get("flags", {}).get("png")
-                
-                parsed_countries.append({
-                    "name": name,
-                    "code_alpha2": item.get("cca2"),
-                    "code_alpha3": item.get("cca3"),
-                    "capital": capital,
-                    "region": item.get("region"),
-                    "subregion": item.get("subregion"),
-                    "population": item.get("population"),
-                    "flag_url": flag_url
-                })
-            except Exception as e:
-                # Log error but continue processing other countries
-                logger.warning(f"Error parsing country item: {str(e)}")
-                continue
-                
-        return parsed_countries
-
-    def _parse_cities(self, raw_data: List[Dict], min_population: int) -> List[Dict]:
-        """Normalize GeoNames data to our schema format"""
-        parsed_cities = []
-        
-        for item in raw_data:
-            try:
-                population = item.get("population", 0)
-                
-                # Filtrar ciudades que no cumplan el mínimo de población
-                # (aunque la API filtre, es bueno asegurar)
-                if population < min_population:
-                    continue
-                
-                # Validar campos esenciales
-                if not item.get("name") or not item.get("lat") or not item.get("lng"):
-                    continue
-
-                parsed_cities.append({
-                    "name": item.get("name"),
-                    "latitude": float(item.get("lat")),
-                    "longitude": float(item.get("lng")),
-                    "population": population,
-                    "geoname_id": item.get("geonameId")
-                })
-            except Exception as e:
-                logger.warning(f"Error parsing city item {item.get('name', 'unknown')}: {str(e)}")
-                continue
-                
-        return parsed_cities
+        except ValueError as e:
+            logger.error(f"Invalid JSON from GeoNames API: {str(e)}")
+            raise AppError(
+                502,
+                ErrorCode.INTERNAL_SERVER_ERROR,
+                f"Respuesta inválida de GeoNames API: {str(e)}"
+            )
+
+    async def fetch_all_countries(self) -> List[Dict[str, Any]]:
+        """Lista completa de países (para volúmenes grandes usar stream_all_countries)"""
+        return [country async for country in self.stream_all_countries()]
+
+    async def fetch_cities_by_country(
+        self,
+        country_code: str,
+        max_rows: Optional[int] = None,
+        min_population: int = 1000
+    ) -> List[Dict[str, Any]]:
+        """Lista completa de ciudades (para volúmenes grandes usar stream_cities_by_country)"""
+        return [
+            city async for city in self.stream_cities_by_country(country_code, max_rows, min_population)
+        ]
+
+    def _parse_country(self, item: Dict) -> Optional[Dict]:
+        """Normalize a REST Countries item to our schema format (None if it is not usable)"""
+        try:
+            # Extraer nombre común
+            name = item.get("name", {}).get("common")
+            if not name:
+                return None
+
+            # Extraer capital (lista -> string)
+            capital_list = item.get("capital", [])
+            capital = capital_list[0] if capital_list else None
+
+            # Extraer URL de bandera (png)
+            flag_url = item.get("flags", {}).get("png")
+
+            return {
+                "name": name,
+                "code_alpha2": item.get("cca2"),
+                "code_alpha3": item.get("cca3"),
+                "capital": capital,
+                "region": item.get("region"),
+                "subregion": item.get("subregion"),
+                "population": item.get("population"),
+                "flag_url": flag_url
+            }
+        except Exception as e:
+            # Log error but continue processing other countries
+            logger.warning(f"Error parsing country item: {str(e)}")
+            return None
+
+    def _parse_city(self, item: Dict, min_population: int) -> Optional[Dict]:
+        """Normalize a GeoNames item to our schema format (None if filtered out or invalid)"""
+        try:
+            population = item.get("population", 0)
+
+            # Filtrar ciudades que no cumplan el mínimo de población
+            # (aunque la API filtre, es bueno asegurar)
+            if population < min_population:
+                return None
+
+            # Validar campos esenciales
+            if not item.get("name") or not item.get("lat") or not item.get("lng"):
+                return None
+
+            return {
+                "name": item.get("name"),
+                "latitude": float(item.get("lat")),
+                "longitude": float(item.get("lng")),
+                "population": population,
+                "geoname_id": item.get("geonameId")
+            }
+        except Exception as e:
+            logger.warning(f"Error parsing city item {item.get('name', 'unknown')}: {str(e)}")
+            return None
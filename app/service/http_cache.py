@@ -0,0 +1,157 @@
+'''
+Caché en disco de respuestas HTTP de APIs externas (REST Countries, GeoNames).
+
+- Clave: SHA-256 de método + URL + parámetros ordenados (los parámetros no se
+  guardan en claro: GeoNames lleva el username en la query).
+- Cada entrada son dos ficheros: <clave>.json (metadatos: ETag, Last-Modified,
+  marca de tiempo) y <clave>.body.gz (cuerpo comprimido con gzip). El cuerpo se
+  escribe por trozos mientras se descarga (CacheWriter) y se lee también por
+  trozos, así que nunca se carga entero en memoria.
+- Las escrituras van a ficheros temporales que se renombran al terminar (atómico).
+- Mientras la entrada no supera HTTP_CACHE_TTL se sirve sin tocar la red.
+  Después se revalida con GET condicional (If-None-Match / If-Modified-Since):
+  un 304 renueva la entrada sin volver a descargar el cuerpo.
+'''
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterator, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+BODY_CHUNK_SIZE = 64 * 1024
+
+@dataclass
+class CachedResponse:
+    url: str
+    stored_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_type: Optional[str] = None
+
+    def is_fresh(self, ttl: int) -> bool:
+        return (time.time() - self.stored_at) < ttl
+
+    def validator_headers(self) -> Dict[str, str]:
+        """Cabeceras para un GET condicional contra el servidor de origen"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+class CacheWriter:
+    '''
+    Escribe el cuerpo de una respuesta mientras se descarga ("tee" a disco).
+    Solo commit() publica la entrada; discard() (o no llamar a commit) la descarta.
+    '''
+    def __init__(self, cache: "HttpCache", key: str, entry: CachedResponse):
+        self.cache = cache
+        self.key = key
+        self.entry = entry
+        directory = os.path.dirname(cache._body_path(key))
+        os.makedirs(directory, exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        self._raw = os.fdopen(fd, "wb")
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode="wb")
+
+    def write(self, chunk: bytes) -> None:
+        self._gzip.write(chunk)
+
+    def commit(self) -> None:
+        self._gzip.close()
+        self._raw.close()
+        os.replace(self._tmp_path, self.cache._body_path(self.key))
+        self.cache.set_meta(self.key, self.entry)
+
+    def discard(self) -> None:
+        self._gzip.close()
+        self._raw.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+class HttpCache:
+    def __init__(self, directory: Optional[str] = None, ttl: Optional[int] = None):
+        self.directory = directory or settings.HTTP_CACHE_DIR
+        self.ttl = settings.HTTP_CACHE_TTL if ttl is None else ttl
+
+    @staticmethod
+    def key_for(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        canonical = json.dumps(
+            {"method": "GET", "url": url, "params": sorted((params or {}).items())},
+            default=str,
+            separators=(",", ":")
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _base_path(self, key: str) -> str:
+        # Dos niveles de directorio para no acumular miles de ficheros en uno solo
+        return os.path.join(self.directory, key[:2], key)
+
+    def _meta_path(self, key: str) -> str:
+        return self._base_path(key) + ".json"
+
+    def _body_path(self, key: str) -> str:
+        return self._base_path(key) + ".body.gz"
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Metadatos de la entrada (el cuerpo se lee con iter_body)"""
+        path = self._meta_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = CachedResponse(**json.load(f))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError) as e:
+            # Entrada corrupta o de un formato antiguo: se ignora y se sobrescribirá
+            logger.warning(f"Entrada de caché inválida {path}: {str(e)}")
+            return None
+        if not os.path.exists(self._body_path(key)):
+            return None
+        return entry
+
+    def iter_body(self, key: str, chunk_size: int = BODY_CHUNK_SIZE) -> Iterator[bytes]:
+        """Cuerpo descomprimido por trozos"""
+        with gzip.open(self._body_path(key), "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def writer(self, key: str, entry: CachedResponse) -> CacheWriter:
+        return CacheWriter(self, key, entry)
+
+    def set_meta(self, key: str, entry: CachedResponse) -> None:
+        path = self._meta_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(asdict(entry), f)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def touch(self, key: str, entry: CachedResponse) -> CachedResponse:
+        """Renueva la entrada tras un 304 (el cuerpo sigue siendo válido)"""
+        entry.stored_at = time.time()
+        self.set_meta(key, entry)
+        return entry
+
+    def delete(self, key: str) -> None:
+        for path in (self._meta_path(key), self._body_path(key)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
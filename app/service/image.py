@@ -1,46 +1,216 @@
-import cloudinary
-import cloudinary.uploader
-from fastapi import UploadFile, HTTPException, status
+import asyncio
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+from fastapi import UploadFile
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.core.config import settings
-
-# Configure Cloudinary
-cloudinary.config( 
-  cloud_name = settings.CLOUDINARY_CLOUD_NAME, 
-  api_key = settings.CLOUDINARY_API_KEY, 
-  api_secret = settings.CLOUDINARY_API_SECRET,
-  secure = True
+from app.core.decorators import transactional
+from app.db.models.image import ImageBlob
+from app.repository.image import ImageBlobRepository
+from app.core.exceptions import AppError
+from app.core.constants import ErrorCode
+from app.service.storage import EXTENSIONS, get_storage
+from app.service.image_processing import (
+    InvalidImageError, sniff_image_type, process_image, get_process_pool, shutdown_process_pool
 )
 
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 64 * 1024
+
 class ImageService:
+    '''
+    Subida de imágenes de perfil.
     
-    @staticmethod
-    def upload_image(file: UploadFile) -> str:
-        """
-        Uploads an image to Cloudinary and returns the secure URL.
-        Validates the file type before uploading.
-        """
+    Antes de subir, el formato se verifica por magic bytes y (si
+    IMAGE_PROCESSING_ENABLED) la imagen se reduce, se le quitan los metadatos
+    EXIF y se transcodifica a WebP en un pool de procesos (CPU-bound).
+    
+    La subida al backend (Cloudinary o local) es bloqueante, así que se ejecuta
+    en un ThreadPoolExecutor propio de IMAGE_UPLOAD_WORKERS hilos: no ocupa el
+    threadpool de peticiones de FastAPI y el endpoint async solo espera el futuro.
+    Si ya hay IMAGE_UPLOAD_MAX_PENDING subidas en curso o en cola se responde 503.
+    
+    El tamaño máximo se aplica mientras llega el cuerpo (BodySizeLimitMiddleware)
+    y se vuelve a comprobar aquí sobre el fichero recibido.
+    
+    Deduplicación: el fichero se lee por trozos calculando su SHA-256; si la
+    tabla image_blobs ya tiene ese hash (con la misma variante de procesado) se
+    reutiliza la URL sin procesar ni subir la imagen otra vez.
+    '''
+    
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_UPLOAD_WORKERS,
+                    thread_name_prefix="image-upload"
+                )
+            return self._executor
+
+    def shutdown(self) -> None:
+        """Libera los executors (lifespan de la app)"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+        shutdown_process_pool()
+
+    def validate(self, file: UploadFile) -> None:
         # Validate content type
-        if file.content_type not in ["image/jpeg", "image/png", "image/jpg", "image/webp"]:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="File type not supported. Please upload a valid image (jpeg, png, webp)."
+        if file.content_type not in EXTENSIONS:
+            raise AppError(
+                400,
+                ErrorCode.IMAGE_TYPE_NOT_SUPPORTED,
+                "Tipo de archivo no soportado. Sube una imagen válida (jpeg, png, webp)."
+            )
+        
+        if file.size is not None and file.size > settings.IMAGE_MAX_BYTES:
+            raise AppError(
+                413,
+                ErrorCode.PAYLOAD_TOO_LARGE,
+                f"La imagen supera el tamaño máximo ({settings.IMAGE_MAX_BYTES} bytes)",
+                {"max_bytes": settings.IMAGE_MAX_BYTES}
             )
+
+    async def _read(self, file: UploadFile) -> Tuple[bytes, str]:
+        """Lee el fichero por trozos calculando su SHA-256. Retorna (bytes, hash hex)"""
+        hasher = hashlib.sha256()
+        data = bytearray()
+        while True:
+            chunk = await file.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            data.extend(chunk)
+            if len(data) > settings.IMAGE_MAX_BYTES:
+                raise AppError(
+                    413,
+                    ErrorCode.PAYLOAD_TOO_LARGE,
+                    f"La imagen supera el tamaño máximo ({settings.IMAGE_MAX_BYTES} bytes)",
+                    {"max_bytes": settings.IMAGE_MAX_BYTES}
+                )
+        return bytes(data), hasher.hexdigest()
+
+    @staticmethod
+    def variant() -> str:
+        """Identifica el procesado aplicado: cambia si cambia la configuración"""
+        if not settings.IMAGE_PROCESSING_ENABLED:
+            return "original"
+        return f"webp-{settings.IMAGE_MAX_WIDTH}x{settings.IMAGE_MAX_HEIGHT}-q{settings.IMAGE_WEBP_QUALITY}"
+
+    async def _process(self, data: bytes, content_type: str) -> Tuple[bytes, str]:
+        """Reduce, limpia EXIF y convierte a WebP en el pool de procesos. Retorna (bytes, content_type)"""
+        if not settings.IMAGE_PROCESSING_ENABLED:
+            return data, content_type
         
+        loop = asyncio.get_running_loop()
         try:
-            # Upload to Cloudinary
-            # The file.file object is a SpooledTemporaryFile which Cloudinary accepts
-            upload_result = cloudinary.uploader.upload(
-                file.file,
-                folder="aurevia_profiles",  # Optional: organize in a folder
-                resource_type="image"
+            processed = await loop.run_in_executor(
+                get_process_pool(settings.IMAGE_PROCESS_WORKERS),
+                process_image,
+                data,
+                settings.IMAGE_MAX_WIDTH,
+                settings.IMAGE_MAX_HEIGHT,
+                settings.IMAGE_WEBP_QUALITY
             )
-            
-            return upload_result.get("secure_url")
-            
+        except InvalidImageError as e:
+            logger.warning(f"Imagen no decodificable: {str(e)}")
+            raise AppError(400, ErrorCode.IMAGE_INVALID, "La imagen está dañada o no se puede procesar")
+        except BrokenProcessPool:
+            # Un proceso hijo murió: se descarta el pool para recrearlo en la próxima subida
+            shutdown_process_pool()
+            raise AppError(500, ErrorCode.IMAGE_UPLOAD_FAILED, "Error interno procesando la imagen")
+        
+        logger.info(f"Imagen procesada: {len(data)} -> {len(processed)} bytes (webp)")
+        return processed, "image/webp"
+
+    def _upload(self, data: bytes, content_type: str, folder: str, name: str) -> str:
+        try:
+            return get_storage().save(io.BytesIO(data), content_type, folder, name=name)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def _store(self, data: bytes, content_type: str, folder: str, name: str) -> str:
+        """Sube en el executor dedicado (acotado por IMAGE_UPLOAD_MAX_PENDING)"""
+        with self._lock:
+            if self._pending >= settings.IMAGE_UPLOAD_MAX_PENDING:
+                raise AppError(
+                    503,
+                    ErrorCode.UPLOAD_QUEUE_FULL,
+                    "Hay demasiadas subidas de imágenes en curso. Inténtalo de nuevo en unos segundos."
+                )
+            self._pending += 1
+        
+        try:
+            future = self._get_executor().submit(self._upload, data, content_type, folder, name)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        
+        try:
+            return await asyncio.wrap_future(future)
+        except AppError:
+            raise
         except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Image upload failed: {str(e)}"
-            )
+            logger.error(f"Error subiendo imagen: {str(e)}")
+            raise AppError(500, ErrorCode.IMAGE_UPLOAD_FAILED, f"Error al subir la imagen: {str(e)}")
+
+    @transactional
+    def _remember(self, db: Session, blob: ImageBlob) -> ImageBlob:
+        repo = ImageBlobRepository(db)
+        try:
+            with db.begin_nested():
+                repo.create(blob)
+        except IntegrityError:
+            # Otra subida concurrente de la misma imagen llegó antes: se usa su registro
+            return repo.get_by_hash(blob.content_hash, blob.variant)
+        return blob
+
+    async def upload_image(self, file: UploadFile, db: Session, folder: str = "aurevia_profiles") -> str:
+        """
+        Valida, procesa y sube la imagen (o reutiliza una idéntica ya subida).
+        Retorna la URL pública.
+        """
+        self.validate(file)
+        data, content_hash = await self._read(file)
+        
+        content_type = sniff_image_type(data[:16])
+        if content_type is None:
+            raise AppError(400, ErrorCode.IMAGE_INVALID, "El archivo no es una imagen jpeg, png o webp válida")
+        
+        variant = self.variant()
+        repo = ImageBlobRepository(db)
+        existing = await run_in_threadpool(repo.get_by_hash, content_hash, variant)
+        if existing:
+            logger.info(f"Imagen duplicada ({content_hash[:12]}): se reutiliza {existing.url}")
+            return existing.url
+        
+        processed, stored_type = await self._process(data, content_type)
+        url = await self._store(processed, stored_type, folder, name=f"{content_hash[:40]}-{variant}")
+        
+        blob = ImageBlob(
+            content_hash=content_hash,
+            variant=variant,
+            url=url,
+            content_type=stored_type,
+            size_bytes=len(processed)
+        )
+        blob = await run_in_threadpool(self._remember, db, blob)
+        return blob.url
 
 image_service = ImageService()
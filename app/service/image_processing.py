@@ -0,0 +1,84 @@
+'''
+Procesado local de imágenes antes de subirlas.
+
+- Detecta el formato real por los "magic bytes" (no se fía de content_type).
+- Aplica la orientación EXIF y elimina todos los metadatos (EXIF, GPS, ICC...).
+- Reduce a IMAGE_MAX_WIDTH x IMAGE_MAX_HEIGHT manteniendo la proporción.
+- Transcodifica a WebP.
+
+process_image es CPU-bound, así que se ejecuta en un ProcessPoolExecutor
+(contexto "spawn"). Este módulo no importa nada de la app a nivel de módulo
+para que los procesos hijos arranquen rápido; Pillow se importa dentro.
+'''
+
+import io
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+# Firmas de los formatos aceptados
+_JPEG_MAGIC = b"\xff\xd8\xff"
+_PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+
+# Límite de píxeles descomprimidos (protección contra "decompression bombs")
+MAX_IMAGE_PIXELS = 50_000_000
+
+class InvalidImageError(ValueError):
+    """El contenido no es una imagen válida o soportada"""
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Tipo MIME según los primeros bytes del fichero (None si no es jpeg/png/webp)"""
+    if head.startswith(_JPEG_MAGIC):
+        return "image/jpeg"
+    if head.startswith(_PNG_MAGIC):
+        return "image/png"
+    if len(head) >= 12 and head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+def process_image(data: bytes, max_width: int, max_height: int, quality: int) -> bytes:
+    '''
+    Devuelve la imagen como WebP, reducida y sin metadatos.
+    Lanza InvalidImageError si Pillow no puede decodificarla.
+    '''
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.load()
+            # Rotar según EXIF antes de descartar los metadatos
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
+
+            has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+            img = img.convert("RGBA" if has_alpha else "RGB")
+
+            out = io.BytesIO()
+            # Sin exif=/icc_profile=: el WebP resultante no lleva metadatos
+            img.save(out, "WEBP", quality=quality, method=4)
+            return out.getvalue()
+    except (Image.DecompressionBombError, Image.UnidentifiedImageError, OSError, SyntaxError) as e:
+        raise InvalidImageError(str(e)) from e
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def get_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Pool de procesos compartido, creado en el primer uso"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+def shutdown_process_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
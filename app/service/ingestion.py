@@ -0,0 +1,108 @@
+'''
+Soporte común de las ingestas masivas desde APIs externas.
+
+- WriteBatcher: cuenta las escrituras de una ingesta y envía los cambios a la
+  BD cada INGEST_BATCH_SIZE registros (flush) y los confirma cada
+  INGEST_COMMIT_SIZE (commit). Un fallo tardío solo deshace el último tramo;
+  lo ya confirmado no se repite porque el siguiente refresco lo ve
+  "unchanged" por content_hash.
+- IngestionService: ejecuciones (IngestionRun) y checkpoints por unidad
+  (IngestionCheckpoint). Una ejecución interrumpida se retoma saltando las
+  unidades ya terminadas, sin volver a pedirlas a la API externa.
+'''
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+from sqlalchemy.orm import Session
+from app.db.models.ingestion import IngestionRun
+from app.core.config import settings
+from app.core.decorators import transactional, commit_chunk
+from app.core.hashing import content_hash
+from app.repository.ingestion import IngestionRepository
+
+class WriteBatcher:
+    '''
+    Uso:
+        batcher = WriteBatcher(self.db)
+        for record in stream:
+            ...                 # create/update
+            batcher.add()
+        # el commit final lo hace el @transactional del método
+    '''
+    def __init__(self, db: Session, flush_every: Optional[int] = None, commit_every: Optional[int] = None):
+        self.db = db
+        self.flush_every = max(1, flush_every or settings.INGEST_BATCH_SIZE)
+        self.commit_every = max(self.flush_every, commit_every or settings.INGEST_COMMIT_SIZE)
+        self.pending = 0       # escrituras sin flush
+        self.uncommitted = 0   # escrituras con flush pero sin commit
+        self.commits = 0
+
+    def add(self, count: int = 1) -> None:
+        self.pending += count
+        if self.pending < self.flush_every:
+            return
+        self.uncommitted += self.pending
+        self.pending = 0
+        if self.uncommitted >= self.commit_every:
+            if commit_chunk(self.db):
+                self.commits += 1
+            self.uncommitted = 0
+        else:
+            self.db.flush()
+
+class IngestionService:
+    '''
+    Servicio de ejecuciones de ingesta.
+
+    Responsabilidades:
+    - Crear una ejecución o retomar la última sin terminar con los mismos parámetros
+    - Guardar el checkpoint de cada unidad (confirmado en cuanto termina)
+    - Cerrar la ejecución con su estado y estadísticas
+    '''
+    def __init__(self, db: Session):
+        self.db = db
+        self.repo = IngestionRepository(db)
+
+    @transactional
+    def start(
+        self,
+        kind: str,
+        params: Dict[str, Any],
+        key_fields: Iterable[str],
+        job_id: Optional[str] = None,
+        resume: bool = True
+    ) -> IngestionRun:
+        '''
+        Ejecución para `kind` con `params`. Con resume, retoma la última
+        interrumpida (failed/cancelled) cuyos `key_fields` coinciden y que avanzó
+        hace menos de INGEST_RESUME_MAX_AGE_HOURS (más antigua, sus datos ya no
+        son recientes). Una ejecución "running" es de otro trabajo y no se toca.
+        '''
+        params_key = content_hash(params, key_fields)
+        if resume:
+            since = datetime.now() - timedelta(hours=settings.INGEST_RESUME_MAX_AGE_HOURS)
+            run = self.repo.get_resumable(kind, params_key, since)
+            # Si otro trabajo la reclama entre la lectura y el UPDATE, se empieza una nueva
+            if run is not None and self.repo.claim(run.id, job_id):
+                self.db.refresh(run)
+                return run
+        return self.repo.create(IngestionRun(kind=kind, params=params, params_key=params_key, job_id=job_id))
+
+    def completed(self, run_id: int) -> Dict[str, Any]:
+        """Unidades ya terminadas de la ejecución: {key: stats}"""
+        return {
+            key: checkpoint.stats or {}
+            for key, checkpoint in self.repo.get_checkpoints(run_id).items()
+            if checkpoint.status == "done"
+        }
+
+    @transactional
+    def checkpoint(self, run_id: int, key: str, status: str, stats: Any = None, error: Optional[str] = None) -> None:
+        self.repo.save_checkpoint(run_id, key, status, stats=stats, error=error)
+        self.repo.touch(run_id)
+
+    @transactional
+    def finish(self, run_id: int, status: str, stats: Any = None, error: Optional[str] = None) -> None:
+        run = self.repo.get_by_id(run_id)
+        if run:
+            self.repo.mark_finished(run, status, stats=stats, error=error)
@@ -0,0 +1,321 @@
+'''
+Trabajos en segundo plano (background jobs) dentro del proceso.
+
+Pensado para operaciones largas como poblar las ciudades de todos los países,
+que no deben ejecutarse dentro de la petición HTTP.
+
+- Los trabajos se persisten en la tabla `jobs` (estado, progreso, resultado).
+- JobRunner los ejecuta en un ThreadPoolExecutor dedicado; cada trabajo corre
+  en su propio event loop (asyncio.run) y con su propia sesión de BD, así que
+  no ocupa ni el threadpool de peticiones ni el event loop principal.
+- El código del trabajo reporta progreso con JobContext.progress(), que además
+  comprueba si se pidió la cancelación (lanza JobCancelled).
+- Cada worker renueva heartbeat_at de sus trabajos en cola o en curso. Si el
+  proceso muere, dejan de latir: al arrancar, recover_stale_jobs() los pasa a
+  failed para que no queden pending/running para siempre y se puedan relanzar
+  (la ingesta de ciudades se retoma desde sus checkpoints).
+'''
+
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.db.models.job import Job
+from app.db.session import SessionLocal
+from app.schemas.job import JobOut
+from app.core.config import settings
+from app.core.exceptions import AppError
+from app.core.constants import ErrorCode
+from app.core.decorators import transactional
+from app.repository.job import JobRepository
+from app.repository.ingestion import IngestionRepository
+from app.service.city import CityService
+
+logger = logging.getLogger(__name__)
+
+JOB_TERMINAL_STATUSES = ("succeeded", "failed", "cancelled")
+
+class JobCancelled(AppError):
+    """
+    Se lanza desde JobContext.progress() cuando se pidió cancelar el trabajo.
+    Hereda de AppError para que @transactional haga rollback y la propague tal cual.
+    """
+    def __init__(self, job_id: str) -> None:
+        super().__init__(409, ErrorCode.JOB_CANCELLED, f"El trabajo {job_id} fue cancelado")
+
+# ============================================================================
+# REGISTRO DE TIPOS DE TRABAJO
+# ============================================================================
+
+JobHandler = Callable[[Session, dict, "JobContext"], Awaitable[Any]]
+_JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+def register_job(job_type: str):
+    '''
+    Registra una corrutina como tipo de trabajo.
+    
+    Uso:
+        @register_job("populate_cities")
+        async def populate_cities_job(db, params, ctx):
+            ...
+            ctx.progress(done, total)
+            return {"created": ...}   # resultado JSON-serializable
+    '''
+    def decorator(func: JobHandler) -> JobHandler:
+        _JOB_HANDLERS[job_type] = func
+        return func
+    return decorator
+
+# ============================================================================
+# EJECUCIÓN
+# ============================================================================
+
+class JobContext:
+    '''
+    Contexto que recibe cada trabajo para reportar progreso.
+    
+    Usa una sesión propia y de vida corta: el progreso se confirma en la BD
+    aunque la transacción del trabajo siga abierta. Las escrituras se limitan
+    a una cada JOB_PROGRESS_INTERVAL segundos (salvo la final).
+    '''
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self._last_write = 0.0
+
+    def progress(self, current: int, total: Optional[int] = None, message: Optional[str] = None) -> None:
+        now = time.monotonic()
+        is_final = total is not None and current >= total
+        if not is_final and now - self._last_write < settings.JOB_PROGRESS_INTERVAL:
+            return
+        self._last_write = now
+
+        db = SessionLocal()
+        try:
+            repo = JobRepository(db)
+            repo.update_progress(self.job_id, current, total, message)
+            cancel_requested = repo.is_cancel_requested(self.job_id)
+            db.commit()
+        finally:
+            db.close()
+
+        if cancel_requested:
+            raise JobCancelled(self.job_id)
+
+class JobRunner:
+    '''
+    Ejecutor de trabajos en hilos dedicados (JOB_MAX_WORKERS, por defecto 1).
+    El executor y el hilo de latidos se crean de forma perezosa con el primer trabajo.
+    '''
+    def __init__(self, max_workers: int):
+        self._max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        # Trabajos de este worker, en cola o en curso (los que reciben latido)
+        self._active: Set[str] = set()
+        self._heartbeat: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def submit(self, job_id: str) -> None:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers, thread_name_prefix="job-runner"
+                )
+            if self._heartbeat is None:
+                self._stop.clear()
+                self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True)
+                self._heartbeat.start()
+            self._active.add(job_id)
+        self._executor.submit(self._run, job_id)
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._lock:
+            self._stop.set()
+            self._heartbeat = None
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+    def _run(self, job_id: str) -> None:
+        # Event loop propio del hilo: el trabajo nunca bloquea el loop principal
+        try:
+            asyncio.run(self._execute(job_id))
+        finally:
+            with self._lock:
+                self._active.discard(job_id)
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.wait(settings.JOB_HEARTBEAT_INTERVAL):
+            with self._lock:
+                job_ids = list(self._active)
+            if not job_ids:
+                continue
+            db = SessionLocal()
+            try:
+                JobRepository(db).touch(job_ids)
+                db.commit()
+            except Exception:
+                logger.exception("Error renovando el latido de los trabajos")
+            finally:
+                db.close()
+
+    async def _execute(self, job_id: str) -> None:
+        db = SessionLocal()
+        try:
+            repo = JobRepository(db)
+            if not repo.mark_running(job_id):
+                # Cancelado antes de empezar (o ya ejecutado por otro worker)
+                db.commit()
+                return
+            db.commit()
+
+            job = repo.get_by_id(job_id)
+            handler = _JOB_HANDLERS.get(job.type)
+            params = job.params or {}
+            result, error = None, None
+
+            logger.info(f"Job {job_id} ({job.type}) iniciado")
+            try:
+                if handler is None:
+                    raise AppError(400, ErrorCode.JOB_TYPE_UNKNOWN, f"Tipo de trabajo desconocido: {job.type}")
+                result = await handler(db, params, JobContext(job_id))
+                status = "succeeded"
+            except JobCancelled:
+                status = "cancelled"
+            except AppError as e:
+                status, error = "failed", e.message
+            except Exception as e:
+                logger.exception(f"Job {job_id} ({job.type}) falló")
+                status, error = "failed", str(e)
+
+            # Descartar cualquier cambio a medias del trabajo antes de guardar el estado final
+            # (lo que el trabajo ya confirmó por tramos o en checkpoints se mantiene)
+            db.rollback()
+            repo.mark_finished(job_id, status, result=result, error=error)
+            db.commit()
+            logger.info(f"Job {job_id} ({job.type}) terminado: {status}")
+        except Exception:
+            logger.exception(f"Error interno ejecutando el job {job_id}")
+        finally:
+            db.close()
+
+job_runner = JobRunner(settings.JOB_MAX_WORKERS)
+
+# ============================================================================
+# SERVICIO
+# ============================================================================
+
+class JobService:
+    '''
+    Servicio de trabajos en segundo plano.
+    
+    Responsabilidades:
+    - Encolar trabajos (persistir + enviar al JobRunner tras el commit)
+    - Consultar estado y progreso
+    - Solicitar cancelación
+    '''
+    def __init__(self, db: Session):
+        self.db = db
+        self.repo = JobRepository(db)
+
+    def get_all(self, skip: int = 0, limit: int = 50) -> List[Job]:
+        return self.repo.get_all(skip=skip, limit=limit)
+
+    def get_by_id(self, job_id: str) -> Optional[Job]:
+        return self.repo.get_by_id(job_id)
+
+    def enqueue(self, job_type: str, params: Optional[dict] = None, created_by: Optional[int] = None) -> Job:
+        if job_type not in _JOB_HANDLERS:
+            raise AppError(400, ErrorCode.JOB_TYPE_UNKNOWN, f"Tipo de trabajo desconocido: {job_type}")
+
+        job = self._create(job_type, params or {}, created_by)
+        # Solo se envía al runner una vez confirmado: el hilo lo lee con otra sesión
+        job_runner.submit(job.id)
+        return job
+
+    @transactional
+    def _create(self, job_type: str, params: dict, created_by: Optional[int]) -> Job:
+        job = Job(id=str(uuid.uuid4()), type=job_type, status="pending", params=params, created_by=created_by)
+        return self.repo.create(job)
+
+    @transactional
+    def cancel(self, job_id: str) -> Job:
+        job = self.repo.get_by_id(job_id)
+        if not job:
+            raise AppError(404, ErrorCode.JOB_NOT_FOUND, "El trabajo no existe")
+        if job.status in JOB_TERMINAL_STATUSES:
+            return job
+        return self.repo.request_cancel(job)
+
+def recover_stale_jobs() -> int:
+    '''
+    Pasa a failed los trabajos pending/running cuyo worker dejó de latir hace
+    más de JOB_STALE_AFTER segundos (se llama al arrancar, con una sesión propia).
+    Sus ejecuciones de ingesta que seguían "running" pasan también a failed,
+    así el siguiente trabajo con los mismos parámetros las puede retomar.
+    Retorna el número de trabajos recuperados.
+    '''
+    since = datetime.now() - timedelta(seconds=settings.JOB_STALE_AFTER)
+    error = "El worker que ejecutaba el trabajo se detuvo"
+    db = SessionLocal()
+    try:
+        recovered = JobRepository(db).fail_stale(since, error)
+        orphaned_runs = IngestionRepository(db).fail_orphaned(error)
+        db.commit()
+    finally:
+        db.close()
+    if recovered:
+        logger.warning(f"{recovered} trabajos sin latido marcados como failed")
+    if orphaned_runs:
+        logger.warning(f"{orphaned_runs} ejecuciones de ingesta sin trabajo activo marcadas como failed")
+    return recovered
+
+def load_job_snapshot(job_id: str) -> Optional[dict]:
+    """Estado actual del trabajo (dict JSON) leído con una sesión propia"""
+    db = SessionLocal()
+    try:
+        job = JobRepository(db).get_by_id(job_id)
+        return JobOut.model_validate(job).model_dump(mode="json") if job else None
+    finally:
+        db.close()
+
+async def stream_job_events(job_id: str) -> AsyncIterator[str]:
+    '''
+    Server-Sent Events con el progreso del trabajo.
+    Emite un evento por cada cambio de estado y termina al llegar a un estado final.
+    '''
+    last_snapshot = None
+    while True:
+        snapshot = await run_in_threadpool(load_job_snapshot, job_id)
+        if snapshot is None:
+            yield f"event: error\ndata: {json.dumps({'code': ErrorCode.JOB_NOT_FOUND.value})}\n\n"
+            return
+        if snapshot != last_snapshot:
+            yield f"event: progress\ndata: {json.dumps(snapshot)}\n\n"
+            last_snapshot = snapshot
+        if snapshot["status"] in JOB_TERMINAL_STATUSES:
+            return
+        await asyncio.sleep(settings.JOB_STREAM_POLL_INTERVAL)
+
+# ============================================================================
+# TIPOS DE TRABAJO
+# ============================================================================
+
+@register_job("populate_cities")
+async def populate_cities_job(db: Session, params: dict, ctx: JobContext) -> Dict[str, Any]:
+    """Pobla ciudades para todos los países (POST /v1/city/populate sin country_code)"""
+    return await CityService(db).populate_all_countries_cities(
+        limit_per_country=params.get("limit_per_country"),
+        min_population=params.get("min_population", 10000),
+        force_refresh=params.get("force_refresh", False),
+        progress=ctx.progress,
+        resume=params.get("resume", True),
+        job_id=ctx.job_id
+    )
@@ -0,0 +1,164 @@
+'''
+Parser JSON incremental para respuestas grandes de APIs externas.
+
+Extrae uno a uno los elementos de un array JSON a medida que llegan los bytes,
+sin cargar el cuerpo completo ni construir la lista entera en memoria:
+
+- key=None: el documento es el propio array (REST Countries: [ {...}, {...} ]).
+- key="geonames": el array es el valor de esa clave del objeto raíz
+  (GeoNames: {"totalResultsCount": N, "geonames": [ {...} ]}). El resto de
+  claves de primer nivel se guardan en `extras` (p. ej. el "status" de error).
+
+Solo se mantiene en memoria el fragmento aún no parseado (como mucho un
+elemento). Cada elemento se decodifica con json.JSONDecoder.raw_decode.
+'''
+
+import codecs
+import json
+from typing import Any, Dict, List, Optional
+
+_WHITESPACE = " \t\n\r"
+
+# Tamaño máximo de un elemento (o valor de primer nivel) pendiente de parsear.
+# Evita acumular el cuerpo entero si la respuesta no es JSON válido.
+MAX_PENDING_CHARS = 1024 * 1024
+
+class JsonArrayStream:
+    def __init__(self, key: Optional[str] = None):
+        self.key = key
+        self.found = False
+        self.extras: Dict[str, Any] = {}
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._state = "start"
+        self._current_key: Optional[str] = None
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """Añade bytes y devuelve los elementos del array que ya están completos"""
+        self._buf += self._utf8.decode(chunk)
+        return self._drain(final=False)
+
+    def close(self) -> List[Any]:
+        """Fin del cuerpo: devuelve lo pendiente o lanza ValueError si el JSON quedó incompleto"""
+        self._buf += self._utf8.decode(b"", final=True)
+        items = self._drain(final=True)
+        if self._state != "done":
+            raise ValueError("Respuesta JSON incompleta o con formato inesperado")
+        return items
+
+    def _decode(self, final: bool):
+        '''
+        Decodifica un valor en la posición actual.
+        Retorna (valor, fin) o None si faltan datos. Un valor que termina justo al
+        final del buffer solo se acepta con final=True (un número podría seguir).
+        '''
+        try:
+            value, end = self._decoder.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise ValueError(f"JSON inválido en la posición {self._pos}")
+            if len(self._buf) - self._pos > MAX_PENDING_CHARS:
+                raise ValueError("Elemento JSON demasiado grande o mal formado")
+            return None
+        if end >= len(self._buf) and not final:
+            return None
+        return value, end
+
+    def _expect(self, char: str) -> None:
+        if self._buf[self._pos] != char:
+            raise ValueError(f"Se esperaba '{char}' en la posición {self._pos}")
+        self._pos += 1
+
+    def _drain(self, final: bool) -> List[Any]:
+        items: List[Any] = []
+        buf = self._buf
+
+        while True:
+            while self._pos < len(buf) and buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos >= len(buf):
+                break
+            char = buf[self._pos]
+            state = self._state
+
+            if state == "start":
+                if self.key is None:
+                    self._expect("[")
+                    self.found = True
+                    self._state = "array_first"
+                else:
+                    self._expect("{")
+                    self._state = "object_first"
+
+            elif state == "object_first":
+                if char == "}":
+                    self._pos += 1
+                    self._state = "done"
+                else:
+                    self._state = "object_key"
+
+            elif state == "object_key":
+                if char != '"':
+                    raise ValueError(f"Se esperaba una clave en la posición {self._pos}")
+                decoded = self._decode(final)
+                if decoded is None:
+                    break
+                self._current_key, self._pos = decoded
+                self._state = "object_colon"
+
+            elif state == "object_colon":
+                self._expect(":")
+                self._state = "object_value"
+
+            elif state == "object_value":
+                if self._current_key == self.key and char == "[":
+                    self._pos += 1
+                    self.found = True
+                    self._state = "array_first"
+                else:
+                    decoded = self._decode(final)
+                    if decoded is None:
+                        break
+                    self.extras[self._current_key], self._pos = decoded
+                    self._state = "object_separator"
+
+            elif state == "object_separator":
+                if char == ",":
+                    self._pos += 1
+                    self._state = "object_key"
+                else:
+                    self._expect("}")
+                    self._state = "done"
+
+            elif state == "array_first":
+                if char == "]":
+                    self._pos += 1
+                    self._state = "done" if self.key is None else "object_separator"
+                else:
+                    self._state = "array_item"
+
+            elif state == "array_item":
+                decoded = self._decode(final)
+                if decoded is None:
+                    break
+                item, self._pos = decoded
+                items.append(item)
+                self._state = "array_separator"
+
+            elif state == "array_separator":
+                if char == ",":
+                    self._pos += 1
+                    self._state = "array_item"
+                else:
+                    self._expect("]")
+                    self._state = "done" if self.key is None else "object_separator"
+
+            else:  # done
+                raise ValueError(f"Datos inesperados tras el JSON en la posición {self._pos}")
+
+        # Descartar lo ya consumido: solo queda en memoria el fragmento pendiente
+        self._buf = buf[self._pos:]
+        self._pos = 0
+        return items
@@ -0,0 +1,235 @@
+'''
+Resiliencia para las llamadas a APIs externas (REST Countries, GeoNames).
+
+- Reintentos con backoff exponencial y jitter completo ("full jitter") ante
+  errores de red, timeouts y respuestas 429/502/503/504.
+- Se respeta la cabecera Retry-After (segundos o fecha HTTP), acotada a
+  EXTERNAL_API_BACKOFF_MAX.
+- Circuit breaker por host: tras CIRCUIT_BREAKER_FAILURE_THRESHOLD fallos
+  seguidos se abre y las peticiones fallan al instante (503) durante
+  CIRCUIT_BREAKER_RESET_TIMEOUT segundos; después deja pasar una petición de
+  prueba (half_open) que lo cierra o lo vuelve a abrir.
+
+El estado de los breakers es por proceso y se expone en GET /api/health/external.
+'''
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+from app.core.config import settings
+from app.core.exceptions import AppError
+from app.core.constants import ErrorCode
+
+if TYPE_CHECKING:
+    # httpx solo se importa al hacer la primera petición (arranque más rápido)
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+# En modo streaming, retry_if solo se evalúa si el cuerpo es pequeño (Content-Length)
+STREAM_PEEK_MAX_BYTES = 1024
+
+class CircuitOpenError(AppError):
+    """El breaker del host está abierto: no se hace la petición"""
+    def __init__(self, host: str, retry_in: float) -> None:
+        super().__init__(
+            503,
+            ErrorCode.EXTERNAL_API_UNAVAILABLE,
+            f"El servicio externo {host} no está disponible temporalmente",
+            {"host": host, "retry_in_seconds": round(retry_in, 1)}
+        )
+
+# ============================================================================
+# CIRCUIT BREAKER
+# ============================================================================
+
+class CircuitBreaker:
+    '''
+    Breaker clásico de tres estados (closed -> open -> half_open -> closed).
+    Thread-safe: los trabajos en segundo plano corren en otros hilos.
+    '''
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._last_error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def before_request(self) -> None:
+        """Lanza CircuitOpenError si no se permite la petición"""
+        with self._lock:
+            if self._state == self.OPEN:
+                elapsed = time.monotonic() - self._opened_at
+                if elapsed < self.reset_timeout:
+                    raise CircuitOpenError(self.name, self.reset_timeout - elapsed)
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == self.HALF_OPEN:
+                # Solo una petición de prueba a la vez
+                if self._probe_in_flight:
+                    raise CircuitOpenError(self.name, 0)
+                self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self, error: str) -> None:
+        with self._lock:
+            self._failures += 1
+            self._last_error = error
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"Circuit breaker ABIERTO para {self.name}: {error}")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = 0.0
+            if self._state == self.OPEN:
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+            return {
+                "host": self.name,
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "retry_in_seconds": round(retry_in, 1),
+                "last_error": self._last_error
+            }
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(url: str) -> CircuitBreaker:
+    host = urlsplit(url).netloc
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                host,
+                settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                settings.CIRCUIT_BREAKER_RESET_TIMEOUT
+            )
+            _breakers[host] = breaker
+        return breaker
+
+def breaker_snapshots() -> List[Dict[str, Any]]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [b.snapshot() for b in breakers]
+
+# ============================================================================
+# REINTENTOS
+# ============================================================================
+
+def default_timeout() -> "httpx.Timeout":
+    import httpx
+    return httpx.Timeout(
+        settings.EXTERNAL_API_READ_TIMEOUT,
+        connect=settings.EXTERNAL_API_CONNECT_TIMEOUT
+    )
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After en segundos ("120") o como fecha HTTP; None si no es válido"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """
+    Espera antes del reintento `attempt` (0 = primer reintento).
+    Full jitter: uniforme en [0, base * 2^attempt], con tope en BACKOFF_MAX.
+    Si el servidor envía Retry-After se usa ese valor (también con tope).
+    """
+    cap = settings.EXTERNAL_API_BACKOFF_MAX
+    if retry_after is not None:
+        return min(retry_after, cap)
+    return random.uniform(0, min(cap, settings.EXTERNAL_API_BACKOFF_BASE * (2 ** attempt)))
+
+def _is_small(response: "httpx.Response") -> bool:
+    length = response.headers.get("Content-Length")
+    return length is not None and length.isdigit() and int(length) <= STREAM_PEEK_MAX_BYTES
+
+async def resilient_get(
+    client: "httpx.AsyncClient",
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    retry_if: Optional[Callable[["httpx.Response"], bool]] = None,
+    stream: bool = False
+) -> "httpx.Response":
+    '''
+    GET con reintentos y circuit breaker del host.
+    
+    `retry_if(response)` permite marcar como transitorias respuestas 200 que
+    en realidad son errores (GeoNames devuelve 200 con {"status": ...}).
+    Tras agotar los reintentos se devuelve la última respuesta o se relanza
+    el último error de red, para que el llamador lo traduzca a AppError.
+    
+    Con stream=True el cuerpo no se descarga: el llamador lo lee con
+    aiter_bytes() y debe cerrar la respuesta (aclose). Los reintentos solo son
+    posibles antes de empezar a leer el cuerpo.
+    '''
+    import httpx
+
+    breaker = get_breaker(url)
+    max_retries = settings.EXTERNAL_API_MAX_RETRIES
+
+    for attempt in range(max_retries + 1):
+        breaker.before_request()
+        last_attempt = attempt == max_retries
+        try:
+            request = client.build_request("GET", url, params=params, headers=headers)
+            response = await client.send(request, stream=stream)
+        except httpx.TransportError as e:
+            breaker.record_failure(f"{type(e).__name__}: {str(e)}")
+            if last_attempt:
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(f"Error de red con {breaker.name} ({type(e).__name__}), reintento {attempt + 1}/{max_retries} en {delay:.2f}s")
+            await asyncio.sleep(delay)
+            continue
+
+        if stream and retry_if is not None and response.status_code == 200 and _is_small(response):
+            await response.aread()
+        body_available = not stream or response.is_closed
+        transient = response.status_code in RETRYABLE_STATUS_CODES or (
+            response.status_code == 200 and retry_if is not None and body_available and retry_if(response)
+        )
+        if not transient:
+            # 4xx (salvo 429) son errores del llamador, no del servicio: no abren el breaker
+            breaker.record_success()
+            return response
+
+        breaker.record_failure(f"HTTP {response.status_code}")
+        if last_attempt:
+            return response
+        if stream:
+            await response.aclose()
+        delay = backoff_delay(attempt, parse_retry_after(response.headers.get("Retry-After")))
+        logger.warning(f"{breaker.name} respondió {response.status_code}, reintento {attempt + 1}/{max_retries} en {delay:.2f}s")
+        await asyncio.sleep(delay)
@@ -0,0 +1,80 @@
+'''
+Backends de almacenamiento de imágenes.
+
+- CloudinaryStorage: producción (cloudinary.uploader.upload, bloqueante).
+- LocalStorage: guarda en disco bajo IMAGE_LOCAL_DIR y devuelve una URL
+  relativa a IMAGE_LOCAL_BASE_URL (servida por la app). Sirve como backend
+  falso para tests y desarrollo, sin credenciales ni red.
+
+Las llamadas son síncronas: ImageService las ejecuta en su executor propio.
+'''
+
+import os
+import shutil
+import uuid
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Optional
+from app.core.config import settings
+
+EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/jpg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp"
+}
+
+class ImageStorage(ABC):
+    '''
+    Interfaz: guarda la imagen y devuelve su URL pública.
+    `name` (opcional) fija el nombre del objeto; ImageService usa el hash del
+    contenido, así que guardar dos veces la misma imagen no duplica ficheros.
+    '''
+    @abstractmethod
+    def save(self, fileobj: BinaryIO, content_type: str, folder: str, name: Optional[str] = None) -> str:
+        ...
+
+class CloudinaryStorage(ImageStorage):
+    def __init__(self):
+        # Import diferido: solo se configura Cloudinary si es el backend elegido
+        import cloudinary
+        cloudinary.config(
+            cloud_name=settings.CLOUDINARY_CLOUD_NAME,
+            api_key=settings.CLOUDINARY_API_KEY,
+            api_secret=settings.CLOUDINARY_API_SECRET,
+            secure=True
+        )
+
+    def save(self, fileobj: BinaryIO, content_type: str, folder: str, name: Optional[str] = None) -> str:
+        import cloudinary.uploader
+        options = {"folder": folder, "resource_type": "image"}
+        if name:
+            options.update(public_id=name, overwrite=False)
+        upload_result = cloudinary.uploader.upload(fileobj, **options)
+        return upload_result.get("secure_url")
+
+class LocalStorage(ImageStorage):
+    def __init__(self, directory: Optional[str] = None, base_url: Optional[str] = None):
+        self.directory = directory or settings.IMAGE_LOCAL_DIR
+        self.base_url = (base_url or settings.IMAGE_LOCAL_BASE_URL).rstrip("/")
+
+    def save(self, fileobj: BinaryIO, content_type: str, folder: str, name: Optional[str] = None) -> str:
+        filename = f"{name or uuid.uuid4().hex}.{EXTENSIONS.get(content_type, 'bin')}"
+        target_dir = os.path.join(self.directory, folder)
+        os.makedirs(target_dir, exist_ok=True)
+        with open(os.path.join(target_dir, filename), "wb") as out:
+            shutil.copyfileobj(fileobj, out)
+        return f"{self.base_url}/{folder}/{filename}"
+
+_storage: Optional[ImageStorage] = None
+
+def get_storage() -> ImageStorage:
+    """Backend configurado en IMAGE_STORAGE_BACKEND (instancia única por proceso)"""
+    global _storage
+    if _storage is None:
+        _storage = LocalStorage() if settings.IMAGE_STORAGE_BACKEND == "local" else CloudinaryStorage()
+    return _storage
+
+def set_storage(storage: Optional[ImageStorage]) -> None:
+    """Sustituye el backend (tests). None vuelve al configurado."""
+    global _storage
+    _storage = storage
@@ -1,13 +1,24 @@
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Set, Tuple
+from collections import Counter
+from datetime import date
 from app.db.models.trip import Trip
-from app.schemas.trip import TripCreate, TripUpdate
+from app.schemas.trip import TripCreate, TripUpdate, TripOut
 from app.core.exceptions import AppError
 from app.core.constants import ErrorCode
-from app.core.decorators import transactional
+from app.core.decorators import transactional, read_only
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
 from app.repository.trip import TripRepository
 from app.repository.user import UserRepository
 from app.repository.country import CountryRepository
+from app.repository.comment import CommentRepository
+from app.repository.trip_search import TripSearchRepository, TripSearchFilters, search_terms
+from app.repository.pagination import decode_cursor
+
+# GET /v1/trip/id/{trip_id}: peticiones simultáneas del mismo viaje comparten
+# una sola query y la respuesta serializada
+trip_reads = SingleFlight("trip_by_id", ttl=settings.SINGLEFLIGHT_TTL, enabled=settings.SINGLEFLIGHT_ENABLED)
 
 class TripService:
 
@@ -26,15 +37,105 @@ class TripService:
         self.repo = TripRepository(db)
         self.user_repo = UserRepository(db)
         self.country_repo = CountryRepository(db)
+        self.comment_repo = CommentRepository(db)
+        self.search_repo = TripSearchRepository(db)
 
+    @read_only
     def get_all(self, skip: int = 0, limit: int = 100) -> List[Trip]:
-        return self.repo.get_all(skip=skip, limit=limit)
+        trips = self.repo.get_all(skip=skip, limit=limit)
+        return self.repo.attach_comment_previews(trips, settings.NESTED_COLLECTION_LIMIT)
+
+    @read_only
+    def get_all_summaries(self, skip: int = 0, limit: int = 100) -> List[Trip]:
+        return self.repo.get_all_summaries(skip=skip, limit=limit)
+
+    @read_only
+    def get_by_user_id(
+        self, user_id: int, after_id: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[Trip]:
+        limit = min(max(limit or settings.FEED_PAGE_SIZE, 1), settings.FEED_MAX_PAGE_SIZE)
+        return self.repo.get_by_user_id(user_id, after_id=after_id, limit=limit)
 
+    @read_only
     def get_by_name(self, name: str) -> Optional[Trip]:
-        return self.repo.get_by_name(name)
+        return self._with_previews(self.repo.get_by_name(name))
 
+    @read_only
     def get_by_id(self, trip_id: int) -> Optional[Trip]:
-        return self.repo.get_by_id(trip_id)
+        return self._with_previews(self.repo.get_by_id(trip_id))
+
+    @read_only
+    def search(
+        self,
+        country_id: Optional[int] = None,
+        country_code: Optional[str] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        text: Optional[str] = None,
+        before: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Tuple[List[Trip], Optional[str], str]:
+        '''
+        Búsqueda de viajes, más recientes primero (ver app/repository/trip_search.py).
+        
+        - country_id o country_code (ISO alpha-2 o alpha-3): viajes a ese país
+        - start_date / end_date: viajes que solapan ese rango (cualquiera de los dos puede faltar)
+        - text: todas sus palabras en el nombre o la descripción
+        
+        Retorna (viajes, cursor de la siguiente página o None, camino de acceso usado).
+        '''
+        if start_date and end_date:
+            self.validate_trip_dates(start_date, end_date)
+        country_id = self._resolve_search_country(country_id, country_code)
+
+        terms = search_terms(text)
+        if text and not terms:
+            raise AppError(400, ErrorCode.VALIDATION_ERROR, "La búsqueda de texto no contiene ninguna palabra", {"q": text})
+
+        position = None
+        if before:
+            try:
+                position = decode_cursor(before)
+            except ValueError:
+                raise AppError(400, ErrorCode.INVALID_CURSOR, "El cursor de paginación no es válido", {"before": before})
+        limit = min(max(limit or settings.FEED_PAGE_SIZE, 1), settings.FEED_MAX_PAGE_SIZE)
+
+        filters = TripSearchFilters(country_id=country_id, start_date=start_date, end_date=end_date, terms=terms)
+        return self.search_repo.search(filters, position, limit)
+
+    def _resolve_search_country(self, country_id: Optional[int], country_code: Optional[str]) -> Optional[int]:
+        """ID del país filtrado (por ID o por código). 404 si no existe"""
+        if country_code:
+            if len(country_code) == 2:
+                country = self.country_repo.get_by_code_alpha2(country_code)
+            elif len(country_code) == 3:
+                country = self.country_repo.get_by_code_alpha3(country_code)
+            else:
+                raise AppError(400, ErrorCode.VALIDATION_ERROR, "El código de país debe ser ISO alpha-2 o alpha-3", {"country": country_code})
+            if not country:
+                raise AppError(404, ErrorCode.COUNTRY_NOT_FOUND, f"El país con código {country_code} no existe")
+            if country_id is not None and country_id != country.id:
+                raise AppError(
+                    400, ErrorCode.VALIDATION_ERROR, "country_id y country no corresponden al mismo país",
+                    {"country_id": country_id, "country": country_code}
+                )
+            return country.id
+        if country_id is not None and not self.country_repo.get_by_id(country_id):
+            raise AppError(404, ErrorCode.COUNTRY_NOT_FOUND, f"El país con ID {country_id} no existe")
+        return country_id
+
+    def get_by_id_json(self, trip_id: int) -> Optional[bytes]:
+        """TripOut serializado (None si no existe), coalescido por trip_id"""
+        def load() -> Optional[bytes]:
+            trip = self.get_by_id(trip_id)
+            return TripOut.model_validate(trip).model_dump_json().encode() if trip else None
+        return trip_reads.do(trip_id, load)
+
+    def _with_previews(self, trip: Optional[Trip]) -> Optional[Trip]:
+        """Añade la vista acotada de comentarios (TripOut.comments) a un viaje"""
+        if trip:
+            self.repo.attach_comment_previews([trip], settings.NESTED_COLLECTION_LIMIT)
+        return trip
 
     def validate_trip_dates(self, start_date: str, end_date: str) -> None:
         """Valida que start_date sea anterior a end_date"""
@@ -65,15 +166,116 @@ class TripService:
         if self.repo.get_by_start_date_and_user(trip_in.start_date, trip_in.user_id):
             raise AppError(400, ErrorCode.TRIP_ALREADY_EXISTS, "El viaje ya existe para este usuario en esa fecha")
         
-        # 4. Creación
-        return self.repo.create(trip_in)
+        # 4. Creación (y contador desnormalizado del usuario)
+        trip = self.repo.create(trip_in)
+        self.user_repo.adjust_counters(trip_in.user_id, trip_delta=1)
+        return trip
+
+    def create_batch(self, trips_in: List[TripCreate]) -> dict:
+        '''
+        Crea varios viajes en una única transacción.
+        
+        A diferencia de create(), valida el batch completo con una query IN (...)
+        por tabla (users, country, trips) en lugar de varios SELECT por fila.
+        Los elementos inválidos se reportan individualmente y no impiden
+        la inserción del resto.
+        '''
+        if not trips_in:
+            raise AppError(400, ErrorCode.BATCH_EMPTY, "El batch no contiene viajes")
+        if len(trips_in) > settings.BATCH_MAX_ITEMS:
+            raise AppError(
+                400,
+                ErrorCode.BATCH_TOO_LARGE,
+                f"El batch no puede tener más de {settings.BATCH_MAX_ITEMS} viajes",
+                details={"received": len(trips_in), "max_items": settings.BATCH_MAX_ITEMS}
+            )
+
+        results = self._insert_batch(trips_in)
+
+        # Recargar los viajes creados con sus relaciones en una sola query
+        created_ids = [r["trip_id"] for r in results if r["success"]]
+        trips_by_id = {trip.id: trip for trip in self.repo.get_by_ids(created_ids)}
+        for result in results:
+            trip_id = result.pop("trip_id", None)
+            if result["success"]:
+                result["trip"] = trips_by_id.get(trip_id)
+
+        return {
+            "total": len(results),
+            "created": len(created_ids),
+            "failed": len(results) - len(created_ids),
+            "results": results
+        }
 
     @transactional
+    def _insert_batch(self, trips_in: List[TripCreate]) -> List[dict]:
+        # 1. Validaciones de Integridad en bloque (una query por tabla)
+        existing_users = self.user_repo.get_existing_ids(t.user_id for t in trips_in)
+        existing_countries = self.country_repo.get_existing_ids(t.country_id for t in trips_in)
+        taken_dates = self.repo.get_existing_start_dates(
+            (t.user_id for t in trips_in),
+            (t.start_date for t in trips_in)
+        )
+
+        results = []
+        new_trips = []
+        for index, trip_in in enumerate(trips_in):
+            try:
+                self._validate_batch_item(trip_in, existing_users, existing_countries, taken_dates)
+            except AppError as e:
+                results.append({
+                    "index": index,
+                    "success": False,
+                    "error": {"code": e.code, "message": e.message}
+                })
+                continue
+
+            # Reservar la fecha para detectar duplicados dentro del propio batch
+            taken_dates.add((trip_in.user_id, trip_in.start_date))
+            trip = Trip(**trip_in.model_dump())
+            new_trips.append(trip)
+            results.append({"index": index, "success": True, "trip": trip})
+
+        # 2. Inserción en bloque. El flush genera los IDs antes del commit
+        self.repo.bulk_create(new_trips)
+        for user_id, total in Counter(trip.user_id for trip in new_trips).items():
+            self.user_repo.adjust_counters(user_id, trip_delta=total)
+        self.db.flush()
+        for result in results:
+            if result["success"]:
+                result["trip_id"] = result.pop("trip").id
+        return results
+
+    def _validate_batch_item(
+        self,
+        trip_in: TripCreate,
+        existing_users: Set[int],
+        existing_countries: Set[int],
+        taken_dates: Set[Tuple[int, date]]
+    ) -> None:
+        """Mismas validaciones que create(), pero contra los datos precargados del batch"""
+        self.validate_trip_dates(trip_in.start_date, trip_in.end_date)
+
+        if trip_in.user_id not in existing_users:
+            raise AppError(404, ErrorCode.USER_NOT_FOUND, f"El usuario con ID {trip_in.user_id} no existe")
+
+        if trip_in.country_id not in existing_countries:
+            raise AppError(404, ErrorCode.COUNTRY_NOT_FOUND, f"El país con ID {trip_in.country_id} no existe")
+
+        if (trip_in.user_id, trip_in.start_date) in taken_dates:
+            raise AppError(400, ErrorCode.TRIP_ALREADY_EXISTS, "El viaje ya existe para este usuario en esa fecha")
+
     def update(self, trip_id: int, trip_in: TripUpdate) -> Trip:
+        # Las previews se cargan tras el commit para no serializar objetos expirados
+        return self._with_previews(self._update(trip_id, trip_in))
+
+    @transactional
+    def _update(self, trip_id: int, trip_in: TripUpdate) -> Trip:
         trip = self.repo.get_by_id(trip_id)
         
         if not trip:
             raise AppError(404, ErrorCode.TRIP_NOT_FOUND, "El viaje no existe")
+        trip_reads.forget_on_commit(self.db, trip_id)
         
         # Convertir a dict solo con campos no-None
         trip_data = trip_in.model_dump(exclude_unset=True)
@@ -92,4 +294,11 @@ class TripService:
         if not trip:
             raise AppError(404, ErrorCode.TRIP_NOT_FOUND, "El viaje no existe")
         
+        trip_reads.forget_on_commit(self.db, trip_id)
+        
+        # Los comentarios del viaje se borran en cascada: descontarlos a sus autores
+        for user_id, total in self.comment_repo.count_by_user_for_trips([trip_id]).items():
+            self.user_repo.adjust_counters(user_id, comment_delta=-total)
+        self.user_repo.adjust_counters(trip.user_id, trip_delta=-1)
+        
         self.repo.delete(trip)
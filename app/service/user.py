@@ -1,11 +1,16 @@
 from sqlalchemy.orm import Session
-from typing import cast, List, Optional
+from typing import cast, Any, List, Optional, Tuple
 from app.db.models.user import User
 from app.auth.security import verify_password, hash_password
 from app.core.exceptions import AppError
 from app.core.constants import ErrorCode
-from app.core.decorators import transactional
+from app.core.decorators import transactional, read_only
+from app.core.config import settings
 from app.repository.user import UserRepository
+from app.repository.trip import TripRepository
+from app.repository.comment import CommentRepository
+from app.repository.timeline import TimelineRepository
+from app.repository.pagination import decode_kind_cursor
 from app.auth.jwt import decode_refresh_token, create_access_token, create_refresh_token
 import jwt
 from fastapi import status
@@ -23,23 +28,59 @@ class UserService:
     def __init__(self, db: Session):
         self.db = db
         self.repo = UserRepository(db)
+        self.trip_repo = TripRepository(db)
+        self.comment_repo = CommentRepository(db)
 
+    @read_only
     def get_all(self, skip: int = 0, limit: int = 100) -> List[User]:
-        return self.repo.get_all(skip=skip, limit=limit)
+        users = self.repo.get_all(skip=skip, limit=limit)
+        return self.repo.attach_previews(users, settings.NESTED_COLLECTION_LIMIT)
 
+    @read_only
     def get_by_email(self, email: str) -> Optional[User]:
-        return self.repo.get_by_email(email)
+        return self._with_previews(self.repo.get_by_email(email))
 
+    @read_only
     def get_by_username(self, username: str) -> Optional[User]:
-        return self.repo.get_by_username(username)
+        return self._with_previews(self.repo.get_by_username(username))
 
+    @read_only
     def get_by_id(self, user_id: int) -> Optional[User]:
-        return self.repo.get_by_id(user_id)
+        return self._with_previews(self.repo.get_by_id(user_id))
+
+    def _with_previews(self, user: Optional[User]) -> Optional[User]:
+        """Añade las vistas acotadas de trips y comments (UserOut) a un usuario"""
+        if user:
+            self.repo.attach_previews([user], settings.NESTED_COLLECTION_LIMIT)
+        return user
     
+    @read_only
     def get_by_id_light(self, user_id: int) -> Optional[User]:
         """Versión ligera sin relaciones para validaciones rápidas"""
         return self.repo.get_by_id_light(user_id)
 
+    @read_only
+    def get_timeline(
+        self, user_id: int, before: Optional[str] = None, limit: Optional[int] = None
+    ) -> Tuple[List[Any], Optional[str]]:
+        '''
+        Viajes y comentarios del usuario mezclados por fecha, más recientes primero.
+        `before` es el cursor next_before de la página anterior.
+        Retorna (elementos, cursor de la siguiente página o None).
+        '''
+        position = None
+        if before:
+            try:
+                position = decode_kind_cursor(before)
+            except ValueError:
+                raise AppError(400, ErrorCode.INVALID_CURSOR, "El cursor de paginación no es válido", {"before": before})
+        limit = min(max(limit or settings.FEED_PAGE_SIZE, 1), settings.FEED_MAX_PAGE_SIZE)
+        items, next_before = TimelineRepository(self.db).get_user_timeline(user_id, position, limit)
+        # Solo una página vacía necesita distinguir "sin actividad" de "no existe"
+        if not items and not self.repo.get_existing_ids([user_id]):
+            raise AppError(404, ErrorCode.USER_NOT_FOUND, "El usuario no existe")
+        return items, next_before
+
     @transactional
     def create(self, *, email: str, username: str, password: str, role: str = "user") -> User:
         '''
@@ -117,12 +158,16 @@ class UserService:
             "user": user
         }
 
-    @transactional
     def update(self, user_id: int, user_data: dict) -> User:
         '''
         Actualiza un usuario validando duplicados en email y username.
         Si se actualiza la contraseña, la hashea automáticamente.
         '''
+        # Las previews se cargan tras el commit para no serializar objetos expirados
+        return self._with_previews(self._update(user_id, user_data))
+
+    @transactional
+    def _update(self, user_id: int, user_data: dict) -> User:
         user = self.repo.get_by_id(user_id)
         if not user:
             raise AppError(404, ErrorCode.USER_NOT_FOUND, "El usuario no existe")
@@ -205,4 +250,17 @@ class UserService:
         if not user:
             raise AppError(404, ErrorCode.USER_NOT_FOUND, "El usuario no existe")
 
+        # El borrado en cascada elimina comentarios de OTROS usuarios (en los viajes
+        # de este usuario) y comentarios de este usuario en viajes ajenos:
+        # descontarlos de los contadores afectados
+        own_trip_ids = self.trip_repo.get_ids_by_user(user_id)
+        for author_id, total in self.comment_repo.count_by_user_for_trips(own_trip_ids).items():
+            if author_id != user_id:
+                self.repo.adjust_counters(author_id, comment_delta=-total)
+        
+        own_trips = set(own_trip_ids)
+        for trip_id, total in self.comment_repo.count_by_trip_for_user(user_id).items():
+            if trip_id not in own_trips:
+                self.trip_repo.adjust_comment_count(trip_id, -total)
+
         self.repo.delete(user)
\ No newline at end of file
@@ -0,0 +1,58 @@
+'''
+Despliegue multiproceso: gunicorn (gestor de procesos) + workers de uvicorn.
+
+    gunicorn app.main:app -c gunicorn.conf.py
+
+- Workers: WEB_CONCURRENCY o, por defecto, uno por CPU.
+- preload_app: la aplicación se importa una vez en el maestro y los workers
+  se crean con fork, compartiendo la memoria de solo lectura (módulos,
+  esquema OpenAPI, claves RSA; ver app/core/warmup.py:preload).
+- Cada worker calienta su pool de conexiones en el lifespan antes de aceptar
+  tráfico (app/core/warmup.py:warm_up).
+
+Reinicio sin cortar peticiones (ver README, "Despliegue con varios workers"):
+- kill -HUP <maestro>: workers nuevos con la configuración releída; los
+  antiguos terminan sus peticiones (hasta graceful_timeout) y salen. Con
+  preload_app los workers nuevos usan el código ya cargado en el maestro.
+- Código nuevo: kill -USR2 <maestro> arranca un maestro nuevo (con el código
+  nuevo, pid en <pidfile>.2) junto al antiguo; cuando sus workers responden,
+  kill -WINCH y después kill -QUIT al maestro antiguo.
+'''
+
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "True").lower() in ("true", "1", "yes")
+pidfile = os.getenv("GUNICORN_PIDFILE") or None
+
+# Parada ordenada: tiempo para terminar las peticiones en curso tras SIGTERM/HUP
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# Reciclado de workers (0 = desactivado); el jitter evita que reinicien todos a la vez
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+def when_ready(server):
+    """Maestro listo (sockets abiertos), antes de crear los workers"""
+    if server.cfg.preload_app:
+        from app.core.warmup import preload
+        preload(server.app.wsgi())
+        server.log.info("Aplicación precargada en el maestro")
+
+def post_fork(server, worker):
+    """
+    Cada worker descarta las conexiones heredadas del maestro sin cerrarlas
+    (close=False): el socket sigue siendo del maestro y no debe compartirse.
+    """
+    from app.db.session import dispose_engines
+    dispose_engines(close=False)
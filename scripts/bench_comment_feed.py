@@ -0,0 +1,220 @@
+'''
+Feed de comentarios de un viaje con muchos comentarios: keyset frente a OFFSET.
+
+En proceso, contra la BD configurada (.env). Sin --trip-id crea un usuario,
+un país y un viaje de prueba con --comments comentarios (1.000.000 por
+defecto, insertados por lotes) y los borra al terminar salvo con --keep.
+
+Para cada profundidad (número de página de --limit comentarios) mide la
+mediana de --repeat ejecuciones de:
+    offset     ORDER BY created_at DESC, id DESC LIMIT n OFFSET página*n
+    keyset     CommentRepository.get_trip_feed (?before=cursor), lo que
+               ejecuta GET /v1/comment/trip/{id}/feed
+
+y muestra el plan de la query keyset (EXPLAIN). OFFSET recorre y descarta
+todas las filas anteriores, así que crece con la profundidad; keyset entra
+en el índice idx_comment_trip_created justo en la posición del cursor.
+
+Uso:
+    python -m scripts.bench_comment_feed
+    python -m scripts.bench_comment_feed --comments 200000 --depths 0 10 1000 --keep
+    python -m scripts.bench_comment_feed --trip-id 42
+
+Con una BD creada antes de este índice: --create-index lo crea si falta.
+'''
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Tuple
+
+SEED_BATCH = 10000
+
+def _median_ms(func: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+def ensure_index(engine, create: bool) -> bool:
+    from sqlalchemy import inspect
+    from app.db.models.comment import Comment
+
+    names = {ix["name"] for ix in inspect(engine).get_indexes(Comment.__tablename__)}
+    if "idx_comment_trip_created" in names:
+        return True
+    if not create:
+        return False
+    index = next(ix for ix in Comment.__table__.indexes if ix.name == "idx_comment_trip_created")
+    start = time.perf_counter()
+    index.create(bind=engine)
+    print(f"Índice idx_comment_trip_created creado en {time.perf_counter() - start:.1f} s")
+    return True
+
+def seed(engine, comments: int) -> Tuple[int, int, int]:
+    '''
+    Crea usuario, país y viaje de prueba y `comments` comentarios con fechas
+    crecientes a lo largo de un año (con repeticiones: el id desempata).
+    Retorna (user_id, country_id, trip_id).
+    '''
+    from sqlalchemy import insert
+    from app.db.session import SessionLocal
+    from app.db.models.user import User
+    from app.db.models.country import Country
+    from app.db.models.trip import Trip
+    from app.db.models.comment import Comment
+
+    tag = f"bench{int(time.time())}"
+    db = SessionLocal()
+    try:
+        user = User(email=f"{tag}@bench.local", username=tag, hashed_password="x", trip_count=1, comment_count=comments)
+        country = Country(name=f"Bench {tag}")
+        db.add_all([user, country])
+        db.flush()
+        trip = Trip(
+            name=f"Bench {tag}", description="Viaje de benchmark del feed",
+            start_date=datetime(2024, 1, 1).date(), end_date=datetime(2024, 1, 2).date(),
+            user_id=user.id, country_id=country.id, comment_count=comments
+        )
+        db.add(trip)
+        db.commit()
+        ids = (user.id, country.id, trip.id)
+    finally:
+        db.close()
+
+    rng = random.Random(0)
+    created_at = datetime(2024, 1, 1)
+    step = 365 * 24 * 3600 / max(comments, 1)
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        for offset in range(0, comments, SEED_BATCH):
+            rows = []
+            for _ in range(min(SEED_BATCH, comments - offset)):
+                created_at += timedelta(seconds=rng.random() * 2 * step)
+                rows.append({
+                    "content": "Comentario de benchmark",
+                    "created_at": created_at.replace(microsecond=0),
+                    "user_id": ids[0],
+                    "trip_id": ids[2]
+                })
+            conn.execute(insert(Comment), rows)
+    print(f"{comments} comentarios insertados en {time.perf_counter() - start:.1f} s")
+    return ids
+
+def cleanup(engine, user_id: int, country_id: int, trip_id: int) -> None:
+    from sqlalchemy import delete, select
+    from app.db.models.user import User
+    from app.db.models.country import Country
+    from app.db.models.trip import Trip
+    from app.db.models.comment import Comment
+
+    # Por lotes: un DELETE de un millón de filas en una sola transacción bloquea demasiado
+    while True:
+        with engine.begin() as conn:
+            ids = conn.execute(
+                select(Comment.id).where(Comment.trip_id == trip_id).limit(SEED_BATCH)
+            ).scalars().all()
+            if not ids:
+                break
+            conn.execute(delete(Comment).where(Comment.id.in_(ids)))
+    with engine.begin() as conn:
+        conn.execute(delete(Trip).where(Trip.id == trip_id))
+        conn.execute(delete(User).where(User.id == user_id))
+        conn.execute(delete(Country).where(Country.id == country_id))
+
+def explain(engine, trip_id: int, cursor: Tuple[datetime, int], limit: int) -> List[str]:
+    from sqlalchemy import text
+
+    prefix = {"sqlite": "EXPLAIN QUERY PLAN", "mysql": "EXPLAIN", "mariadb": "EXPLAIN"}.get(engine.dialect.name, "EXPLAIN")
+    sql = text(
+        f"{prefix} SELECT * FROM comment WHERE trip_id = :trip_id"
+        " AND created_at <= :created_at AND (created_at < :created_at OR id < :id)"
+        " ORDER BY created_at DESC, id DESC LIMIT :limit"
+    )
+    with engine.connect() as conn:
+        rows = conn.execute(sql, {"trip_id": trip_id, "created_at": cursor[0], "id": cursor[1], "limit": limit + 1})
+        return [" | ".join(str(v) for v in row) for row in rows]
+
+def run(args) -> None:
+    from app.db.session import SessionLocal, engine
+    from app.db.models.comment import Comment
+    from app.repository.comment import CommentRepository
+    from app.repository.pagination import decode_cursor
+
+    if not ensure_index(engine, args.create_index):
+        print("AVISO: falta el índice idx_comment_trip_created (usar --create-index)")
+
+    created = None
+    trip_id = args.trip_id
+    if trip_id is None:
+        created = seed(engine, args.comments)
+        trip_id = created[2]
+
+    db = SessionLocal()
+    try:
+        total = db.query(Comment).filter(Comment.trip_id == trip_id).count()
+        repo = CommentRepository(db)
+        print(f"Viaje {trip_id}: {total} comentarios · página de {args.limit} · mediana de {args.repeat}")
+        print("página      offset ms   keyset ms")
+
+        for depth in args.depths:
+            skip = depth * args.limit
+            if skip >= total:
+                print(f"{depth:<10}  (más allá del último comentario)")
+                continue
+            # Cursor = última fila de la página anterior (no se mide)
+            before: Optional[Tuple[datetime, int]] = None
+            if skip:
+                last = (
+                    db.query(Comment.created_at, Comment.id)
+                    .filter(Comment.trip_id == trip_id)
+                    .order_by(Comment.created_at.desc(), Comment.id.desc())
+                    .offset(skip - 1).limit(1).one()
+                )
+                before = (last.created_at, last.id)
+
+            def offset_page():
+                return (
+                    db.query(Comment).filter(Comment.trip_id == trip_id)
+                    .order_by(Comment.created_at.desc(), Comment.id.desc())
+                    .offset(skip).limit(args.limit).all()
+                )
+
+            def keyset_page():
+                return repo.get_trip_feed(trip_id, before, args.limit)
+
+            # Las dos estrategias deben devolver la misma página
+            assert [c.id for c in offset_page()] == [c.id for c in keyset_page()[0]]
+            offset_ms = _median_ms(offset_page, args.repeat)
+            keyset_ms = _median_ms(keyset_page, args.repeat)
+            db.expunge_all()
+            print(f"{depth:<10}  {offset_ms:9.2f}   {keyset_ms:9.2f}")
+
+        _, cursor = repo.get_trip_feed(trip_id, None, args.limit)
+        if cursor:
+            print("\nPlan de la query keyset:")
+            for line in explain(engine, trip_id, decode_cursor(cursor), args.limit):
+                print(f"  {line}")
+    finally:
+        db.close()
+        if created and not args.keep:
+            cleanup(engine, *created)
+            print("Datos de prueba borrados")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trip-id", type=int, default=None, help="viaje existente (no se siembra ni se borra)")
+    parser.add_argument("--comments", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--depths", type=int, nargs="+", default=[0, 10, 100, 1000, 10000, 49000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="no borrar los datos sembrados")
+    parser.add_argument("--create-index", action="store_true")
+    run(parser.parse_args())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+'''
+Rendimiento de las respuestas de error más frecuentes (404 y 401).
+
+Llama a la aplicación ASGI directamente, en proceso y sin red, así que mide
+solo el coste de la aplicación por petición: middlewares, dependencias,
+excepciones, manejador de errores y serialización. Es lo que domina la CPU
+cuando un escáner o un bot genera sobre todo errores.
+
+Casos:
+    health       GET /api/health (200, referencia)
+    404-route    GET a una ruta que no existe (not_found_handler)
+    404-app      GET /api/v1/trip/id/0: AppError lanzado por el endpoint
+                 (requiere BD; se omite si no está disponible)
+    401-token    GET /api/v1/auth/ con un token inválido
+                 (get_current_user + app_error_handler)
+
+Uso:
+    python -m scripts.bench_errors
+    python -m scripts.bench_errors --requests 20000 --concurrency 50 --cases 404-route 401-token
+
+Conviene ejecutarlo con LOG_LEVEL/niveles por defecto: el coste del logging
+de los errores forma parte de lo que se mide.
+'''
+
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Tuple
+
+CASES: Dict[str, Tuple[str, List[Tuple[bytes, bytes]]]] = {
+    "health": ("/api/health", []),
+    "404-route": ("/wp-login.php", []),
+    "404-app": ("/api/v1/trip/id/0", []),
+    "401-token": ("/api/v1/auth/", [(b"authorization", b"Bearer not.a.valid-token")]),
+}
+
+def _scope(path: str, headers: List[Tuple[bytes, bytes]]) -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")] + headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+async def _call(app, path: str, headers) -> int:
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(_scope(path, headers), receive, send)
+    return status
+
+async def run_case(app, name: str, requests: int, concurrency: int) -> Dict:
+    path, headers = CASES[name]
+    statuses: Dict[int, int] = {}
+    remaining = requests
+
+    async def client() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            status = await _call(app, path, headers)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    # Calentamiento (imports perezosos, cachés)
+    for _ in range(50):
+        await _call(app, path, headers)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {"case": name, "req_s": requests / elapsed, "us_per_req": elapsed / requests * 1e6, "statuses": statuses}
+
+async def main_async(args) -> None:
+    from app.main import app
+
+    print(f"{args.requests} peticiones por caso, concurrencia {args.concurrency}")
+    print("caso          req/s    µs/petición  estados")
+    for name in args.cases:
+        try:
+            r = await run_case(app, name, args.requests, args.concurrency)
+        except Exception as e:
+            print(f"{name:<12} omitido ({type(e).__name__}: {e})")
+            continue
+        print(f"{name:<12} {r['req_s']:7.0f}  {r['us_per_req']:11.1f}  {r['statuses']}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=["health", "404-route", "401-token"])
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    main()
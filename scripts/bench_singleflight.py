@@ -0,0 +1,114 @@
+'''
+Thundering herd sobre GET /v1/trip/id/{trip_id} con y sin single-flight.
+
+En proceso, contra la BD configurada (.env): --clients hilos esperan en una
+barrera y piden a la vez el mismo viaje con TripService.get_by_id_json(),
+cada uno con su propia sesión (igual que una petición). Se repite --rounds
+veces en cada modo y se cuentan las queries SQL que llegan a la BD.
+
+Modos:
+    off        sin coalescencia: cada petición ejecuta sus queries
+    on         single-flight (SINGLEFLIGHT_TTL=0): una ejecución por ráfaga
+    on+ttl     single-flight + resultado reutilizado --ttl segundos
+
+Uso:
+    python -m scripts.bench_singleflight --trip-id 1
+    python -m scripts.bench_singleflight --trip-id 1 --clients 40 --rounds 20 --ttl 1
+
+--clients 40 equivale al threadpool por defecto de los endpoints síncronos
+(anyio). Con más hilos que conexiones en el pool (DB_POOL_SIZE +
+DB_MAX_OVERFLOW), el modo "off" espera conexiones libres.
+'''
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+def _percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+def run_mode(mode: str, args) -> Dict:
+    from sqlalchemy import event
+    from app.db.session import SessionLocal, engine, replicas
+    from app.service.trip import TripService, trip_reads
+
+    trip_reads.enabled = mode != "off"
+    trip_reads.ttl = args.ttl if mode == "on+ttl" else 0.0
+    trip_reads.clear()
+    trip_reads.stats.update(dict.fromkeys(trip_reads.stats, 0))
+
+    queries = 0
+    lock = threading.Lock()
+
+    def count(*_):
+        nonlocal queries
+        with lock:
+            queries += 1
+
+    engines = [engine] + [r.engine for r in replicas.replicas]
+    for e in engines:
+        event.listen(e, "before_cursor_execute", count)
+
+    latencies: List[float] = []
+    sizes = set()
+    barrier = threading.Barrier(args.clients)
+
+    def request() -> None:
+        barrier.wait()
+        start = time.perf_counter()
+        db = SessionLocal()
+        try:
+            body = TripService(db).get_by_id_json(args.trip_id)
+        finally:
+            db.close()
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            sizes.add(len(body) if body else 0)
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            for _ in range(args.rounds):
+                for future in [pool.submit(request) for _ in range(args.clients)]:
+                    future.result()
+    finally:
+        for e in engines:
+            event.remove(e, "before_cursor_execute", count)
+    total = time.perf_counter() - started
+
+    if sizes == {0}:
+        raise SystemExit(f"El viaje {args.trip_id} no existe")
+    requests = args.clients * args.rounds
+    return {
+        "mode": mode,
+        "req_s": requests / total,
+        "p50": _percentile(latencies, 0.50) * 1000,
+        "p99": _percentile(latencies, 0.99) * 1000,
+        "queries_per_request": queries / requests,
+        "stats": trip_reads.snapshot(),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trip-id", type=int, required=True)
+    parser.add_argument("--clients", type=int, default=40)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--ttl", type=float, default=1.0)
+    args = parser.parse_args()
+
+    print(f"GET trip {args.trip_id} · {args.clients} peticiones simultáneas x {args.rounds} ráfagas")
+    print("modo      req/s     p50 ms   p99 ms   queries/petición  ejecuciones  compartidas  aciertos ttl")
+    for mode in ("off", "on", "on+ttl"):
+        r = run_mode(mode, args)
+        s = r["stats"]
+        print(
+            f"{mode:<8} {r['req_s']:7.0f}  {r['p50']:8.1f} {r['p99']:8.1f}  {r['queries_per_request']:16.2f}"
+            f"  {s['executions']:11}  {s['shared']:11}  {s['cache_hits']:12}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+'''
+Escalado de throughput con el número de workers (gunicorn.conf.py).
+
+Para cada número de workers (1, 2, 4, ... hasta --max-workers) arranca
+gunicorn en un puerto local, espera a que responda, lanza carga durante
+--duration segundos y lo para con SIGTERM (parada ordenada). La carga se
+genera desde --clients procesos, cada uno con su propio bucle asyncio y
+--concurrency peticiones en vuelo, para que el cliente no sea el cuello de
+botella.
+
+Uso:
+    python -m scripts.bench_workers
+    python -m scripts.bench_workers --max-workers 8 --duration 15 --path /api/v1/country/
+    python -m scripts.bench_workers --workers 1,2,3,4
+
+Notas:
+- Para resultados representativos: DB_ECHO=False y el mismo host que producción.
+- Si el cliente corre en la misma máquina compite por CPU con los workers:
+  la eficiencia a partir de cpu_count / 2 workers se subestima.
+'''
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+GUNICORN_CONF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gunicorn.conf.py")
+
+def _worker_counts(max_workers: int) -> List[int]:
+    counts = []
+    n = 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    counts.append(max_workers)
+    return counts
+
+def _percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+async def _load(url: str, concurrency: int, duration: float) -> Dict:
+    import httpx
+
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def user(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await client.get(url)
+                if response.status_code >= 500:
+                    errors += 1
+                    continue
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        await asyncio.gather(*(user(client) for _ in range(concurrency)))
+    return {"latencies": latencies, "errors": errors}
+
+def _client_process(args) -> Dict:
+    url, concurrency, duration = args
+    return asyncio.run(_load(url, concurrency, duration))
+
+def _wait_ready(url: str, process: subprocess.Popen, timeout: float) -> None:
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"gunicorn terminó al arrancar (código {process.returncode})")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"gunicorn no respondió en {timeout:.0f}s")
+
+def run(workers: int, args) -> Dict:
+    bind = f"127.0.0.1:{args.port}"
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(workers),
+        "GUNICORN_BIND": bind,
+        "GUNICORN_LOG_LEVEL": "warning",
+        "DB_ECHO": os.getenv("DB_ECHO", "False"),
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", args.app, "-c", GUNICORN_CONF],
+        env=env
+    )
+    url = f"http://{bind}{args.path}"
+    try:
+        _wait_ready(url, process, timeout=60)
+        # Peticiones de calentamiento (conexiones keep-alive, primeras rutas)
+        _client_process((url, args.concurrency, 1.0))
+
+        with multiprocessing.Pool(args.clients) as pool:
+            start = time.perf_counter()
+            results = pool.map(_client_process, [(url, args.concurrency, args.duration)] * args.clients)
+            elapsed = time.perf_counter() - start
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=60)
+
+    latencies = [lat for r in results for lat in r["latencies"]]
+    return {
+        "workers": workers,
+        "rps": len(latencies) / elapsed,
+        "p50": _percentile(latencies, 0.50) * 1000,
+        "p99": _percentile(latencies, 0.99) * 1000,
+        "errors": sum(r["errors"] for r in results),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default="app.main:app")
+    parser.add_argument("--path", default="/api/health")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--workers", help="Lista explícita, p. ej. 1,2,4")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=max(1, multiprocessing.cpu_count() // 2))
+    parser.add_argument("--concurrency", type=int, default=32, help="Peticiones en vuelo por proceso cliente")
+    args = parser.parse_args()
+
+    counts = [int(n) for n in args.workers.split(",")] if args.workers else _worker_counts(args.max_workers)
+    print(f"GET {args.path} · {args.clients} clientes x {args.concurrency} concurrentes · {args.duration:.0f}s por prueba")
+
+    results = []
+    for workers in counts:
+        result = run(workers, args)
+        results.append(result)
+        print(f"  {workers:>3} workers: {result['rps']:9.0f} req/s  p50 {result['p50']:6.1f} ms  p99 {result['p99']:6.1f} ms  errores {result['errors']}")
+
+    base = results[0]["rps"] / results[0]["workers"]
+    print("\nworkers  req/s      speedup  eficiencia")
+    for result in results:
+        speedup = result["rps"] / results[0]["rps"]
+        efficiency = result["rps"] / (base * result["workers"])
+        print(f"{result['workers']:>7}  {result['rps']:9.0f}  {speedup:7.2f}x  {efficiency:9.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+'''
+Presupuesto de tiempo de importación de la aplicación.
+
+Importa el módulo (app.main por defecto) en un proceso nuevo con
+`python -X importtime`, suma el tiempo acumulado y falla (exit 1) si supera el
+presupuesto o si se cargó alguno de los módulos pesados que deben importarse
+de forma diferida (solo cuando se usan por primera vez).
+
+Uso:
+    python -m scripts.check_import_time
+    python -m scripts.check_import_time --budget-ms 800 --top 15
+    IMPORT_TIME_BUDGET_MS=800 python -m scripts.check_import_time
+
+Para medir solo el código propio, conviene ejecutarlo dos veces (la primera
+compila los .pyc) y comparar con el mismo intérprete y máquina.
+'''
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+DEFAULT_BUDGET_MS = 1500
+
+# Módulos que no deben cargarse al arrancar: se importan dentro de las funciones que los usan
+LAZY_MODULES = (
+    "httpx",             # app/service/external_api.py, app/service/resilience.py
+    "cloudinary",        # app/service/storage.py (CloudinaryStorage)
+    "PIL",               # app/service/image_processing.py
+    "starlette.staticfiles",  # app/main.py (solo si se monta /media)
+)
+
+def measure(module: str) -> Tuple[float, List[Tuple[str, int, int]]]:
+    """Importa `module` en un subproceso. Retorna (ms totales, [(módulo, self_us, cumulative_us)])"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": ""}
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr[-4000:])
+        raise SystemExit(f"No se pudo importar {module}")
+
+    rows: List[Tuple[str, int, int]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+
+    total_us = next((cum for name, _, cum in rows if name == module), 0)
+    return total_us / 1000, rows
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_MS", DEFAULT_BUDGET_MS)))
+    parser.add_argument("--top", type=int, default=10, help="Módulos más lentos a mostrar")
+    args = parser.parse_args()
+
+    total_ms, rows = measure(args.module)
+
+    # Paquetes de primer nivel ordenados por tiempo acumulado (sin contar los anidados dos veces)
+    top_level: Dict[str, int] = {}
+    for name, _, cumulative in rows:
+        root = name.split(".")[0]
+        top_level[root] = max(top_level.get(root, 0), cumulative)
+
+    print(f"{args.module}: {total_ms:.0f} ms (presupuesto {args.budget_ms:.0f} ms)")
+    print("\nPaquetes más lentos:")
+    for root, cumulative in sorted(top_level.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {root}")
+
+    print("\nMódulos propios (tiempo propio):")
+    own = [row for row in rows if row[0].split(".")[0] == args.module.split(".")[0]]
+    for name, self_us, _ in sorted(own, key=lambda row: row[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {name}")
+
+    loaded = {name for name, _, _ in rows}
+    eager = [m for m in LAZY_MODULES if m in loaded]
+
+    failed = False
+    if eager:
+        print(f"\nERROR: módulos que deberían importarse de forma diferida: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"\nERROR: {total_ms:.0f} ms supera el presupuesto de {args.budget_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
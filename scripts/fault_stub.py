@@ -0,0 +1,101 @@
+'''
+Stub local de REST Countries / GeoNames con inyección de fallos.
+
+Sirve para probar reintentos, backoff y circuit breaker sin depender de
+los servicios reales (ni gastar la cuota de GeoNames).
+
+Como servidor:
+    FAULT_ERROR_RATE=0.5 uvicorn scripts.fault_stub:app --port 8099
+    REST_COUNTRIES_URL=http://localhost:8099/v3.1 GEONAMES_URL=http://localhost:8099 uvicorn app.main:app
+
+En proceso (sin red), inyectando el transporte en ExternalAPIService:
+    python -m scripts.fault_stub
+
+Variables:
+    FAULT_ERROR_RATE   Probabilidad de responder con error (0.0 - 1.0)
+    FAULT_STATUS       Código de error a devolver (503 por defecto; 429 añade Retry-After)
+    FAULT_RETRY_AFTER  Valor de Retry-After para 429/503 (segundos)
+    FAULT_DELAY        Latencia añadida a cada respuesta (segundos)
+    FAULT_GEONAMES     Código "status.value" de GeoNames a devolver con HTTP 200 (p. ej. 22)
+'''
+
+import asyncio
+import os
+import random
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Fault stub")
+
+stats = {"requests": 0, "faults": 0}
+
+def _config():
+    return {
+        "error_rate": float(os.getenv("FAULT_ERROR_RATE", "0.3")),
+        "status": int(os.getenv("FAULT_STATUS", "503")),
+        "retry_after": os.getenv("FAULT_RETRY_AFTER", "1"),
+        "delay": float(os.getenv("FAULT_DELAY", "0")),
+        "geonames": os.getenv("FAULT_GEONAMES")
+    }
+
+async def _maybe_fail(geonames: bool = False):
+    cfg = _config()
+    stats["requests"] += 1
+    if cfg["delay"]:
+        await asyncio.sleep(cfg["delay"])
+    if random.random() >= cfg["error_rate"]:
+        return None
+    stats["faults"] += 1
+    if geonames and cfg["geonames"]:
+        return JSONResponse({"status": {"message": "injected fault", "value": int(cfg["geonames"])}})
+    headers = {"Retry-After": cfg["retry_after"]} if cfg["status"] in (429, 503) else {}
+    return JSONResponse({"error": "injected fault"}, status_code=cfg["status"], headers=headers)
+
+@app.get("/v3.1/all")
+async def countries():
+    fault = await _maybe_fail()
+    if fault:
+        return fault
+    return [
+        {"name": {"common": "Spain"}, "cca2": "ES", "cca3": "ESP", "capital": ["Madrid"],
+         "region": "Europe", "subregion": "Southern Europe", "population": 47351567,
+         "flags": {"png": "https://flagcdn.com/w320/es.png"}},
+        {"name": {"common": "France"}, "cca2": "FR", "cca3": "FRA", "capital": ["Paris"],
+         "region": "Europe", "subregion": "Western Europe", "population": 67391582,
+         "flags": {"png": "https://flagcdn.com/w320/fr.png"}}
+    ]
+
+@app.get("/searchJSON")
+async def cities(country: str, maxRows: int = 10):
+    fault = await _maybe_fail(geonames=True)
+    if fault:
+        return fault
+    return {"geonames": [
+        {"name": f"{country} City {i}", "lat": str(40 + i / 10), "lng": str(-3 - i / 10),
+         "population": 100000 - i, "geonameId": 1000 * (ord(country[0]) + ord(country[1])) + i}
+        for i in range(maxRows)
+    ]}
+
+async def _demo():
+    import httpx
+    from app.core.config import settings
+    from app.service.external_api import ExternalAPIService
+    from app.service.resilience import breaker_snapshots
+
+    settings.HTTP_CACHE_ENABLED = False
+    settings.GEONAMES_USERNAME = settings.GEONAMES_USERNAME or "demo"
+    settings.EXTERNAL_API_BACKOFF_BASE = 0.05
+    settings.EXTERNAL_API_BACKOFF_MAX = 0.2
+
+    service = ExternalAPIService(transport=httpx.ASGITransport(app=app))
+    for code in ("ES", "FR", "IT", "PT", "DE", "GB"):
+        try:
+            cities = await service.fetch_cities_by_country(code, max_rows=5)
+            print(f"{code}: {len(cities)} ciudades")
+        except Exception as e:
+            print(f"{code}: ERROR {e}")
+    print("stub:", stats)
+    print("breakers:", breaker_snapshots())
+
+if __name__ == "__main__":
+    asyncio.run(_demo())